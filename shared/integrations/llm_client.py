@@ -0,0 +1,509 @@
+"""
+LLM Client for Trivya Platform
+
+This module turns RAG prompts into answers through an OpenAI-compatible
+chat completions endpoint. It adds bounded concurrency, a prompt-hash
+response cache on disk, per-tenant token accounting, timeouts and retries.
+Model settings come from the variant's feature flags.
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from shared.core_functions.logger import get_logger
+
+try:
+    from openai import OpenAI
+except ImportError:
+    OpenAI = None
+
+
+class LLMClientError(Exception):
+    """Custom exception for LLM Client errors"""
+    pass
+
+
+class LLMClient:
+    """
+    Gateway client for LLM completions.
+
+    Uses the ``openai`` SDK when it is installed and falls back to a plain
+    HTTP call against the same chat completions API otherwise. Pointing
+    ``base_url`` at a StubLLMServer makes it usable in tests and benchmarks.
+    """
+
+    DEFAULT_MODEL = "gpt-3.5-turbo"
+    DEFAULT_MAX_TOKENS = 256
+    DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+    def __init__(
+        self,
+        config: Optional[Any] = None,
+        logger: Optional[Any] = None,
+        variant: str = "mini_trivya",
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 4,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        retry_backoff: float = 0.5,
+        cache_dir: Optional[str] = None,
+        temperature: float = 0.0
+    ):
+        """
+        Initialize the LLM Client.
+
+        Args:
+            config: Optional configuration object (feature flags and env)
+            logger: Optional logger instance
+            variant: Feature flag variant providing 'model' and 'max_tokens'
+            api_key: API key (defaults to AI_OPENAI_API_KEY / OPENAI_API_KEY)
+            base_url: API base URL (defaults to LLM_BASE_URL or OpenAI)
+            max_concurrency: Maximum in-flight requests across all callers
+            timeout: Per-request timeout in seconds
+            max_retries: Retries after the first failed attempt
+            retry_backoff: Base delay in seconds for exponential backoff
+            cache_dir: Directory for the response cache (disabled if None)
+            temperature: Sampling temperature sent with every request
+        """
+        self.config = config
+        self.logger = logger or (get_logger(config).get_logger("LLMClient") if config else None)
+
+        flags = config.get_feature_flags(variant) if config else {}
+        if not isinstance(flags, dict):
+            flags = {}
+        env = getattr(config, "env", None) or {}
+        if not isinstance(env, dict):
+            env = {}
+
+        self.model = flags.get("model", self.DEFAULT_MODEL)
+        self.max_tokens = flags.get("max_tokens", self.DEFAULT_MAX_TOKENS)
+        self.api_key = api_key or env.get("AI_OPENAI_API_KEY") or env.get("OPENAI_API_KEY")
+        self.base_url = (base_url or env.get("LLM_BASE_URL") or self.DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.temperature = temperature
+        self.max_concurrency = max_concurrency
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._usage: Dict[str, Dict[str, int]] = {}
+        self._usage_lock = threading.Lock()
+        self._sdk_client = None
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.logger:
+            self.logger.info(
+                "LLM Client initialized",
+                extra={
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "max_concurrency": max_concurrency,
+                    "cache_enabled": self.cache_dir is not None
+                }
+            )
+
+    def complete(
+        self,
+        prompt: str,
+        tenant_id: str = "default",
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Get a completion for a single prompt.
+
+        Args:
+            prompt: Prompt text (e.g. RAGPipeline.query()["prompt"])
+            tenant_id: Tenant charged for the tokens
+            max_tokens: Override for the flag-configured max_tokens
+            use_cache: Whether to read and write the response cache
+
+        Returns:
+            Dictionary with 'text', 'model', 'cached', 'usage' and 'latency_ms'
+
+        Raises:
+            LLMClientError: If every attempt fails
+        """
+        max_tokens = max_tokens or self.max_tokens
+        key = self.cache_key(prompt, max_tokens)
+        start = time.perf_counter()
+
+        if use_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._account(tenant_id, cached.get("usage", {}), cache_hit=True)
+                return {
+                    **cached,
+                    "cached": True,
+                    "latency_ms": round((time.perf_counter() - start) * 1000.0, 3)
+                }
+
+        with self._semaphore:
+            text, usage = self._call_with_retries(prompt, max_tokens)
+
+        self._account(tenant_id, usage)
+        result = {"text": text, "model": self.model, "usage": usage}
+        if use_cache:
+            self._cache_put(key, result)
+
+        return {
+            **result,
+            "cached": False,
+            "latency_ms": round((time.perf_counter() - start) * 1000.0, 3)
+        }
+
+    def complete_batch(
+        self,
+        prompts: List[str],
+        tenant_id: str = "default",
+        max_tokens: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Complete a batch of prompts concurrently.
+
+        Identical prompts in the batch are sent once. Concurrency is still
+        bounded by max_concurrency, shared with all other callers.
+
+        Args:
+            prompts: Prompt texts
+            tenant_id: Tenant charged for the tokens
+            max_tokens: Override for the flag-configured max_tokens
+
+        Returns:
+            Results in the same order as ``prompts``; failed prompts get an
+            'error' key instead of 'text'
+        """
+        unique = list(dict.fromkeys(prompts))
+        if not unique:
+            return []
+
+        def _run(prompt: str) -> Dict[str, Any]:
+            try:
+                return self.complete(prompt, tenant_id=tenant_id, max_tokens=max_tokens)
+            except LLMClientError as e:
+                return {"error": str(e), "model": self.model, "cached": False}
+
+        with ThreadPoolExecutor(max_workers=min(len(unique), self.max_concurrency)) as executor:
+            results = dict(zip(unique, executor.map(_run, unique)))
+
+        return [results[prompt] for prompt in prompts]
+
+    def answer(
+        self,
+        rag_result: Dict[str, Any],
+        tenant_id: str = "default"
+    ) -> Dict[str, Any]:
+        """
+        Turn a RAGPipeline.query() result into an answer.
+
+        Args:
+            rag_result: Result dictionary containing a 'prompt'
+            tenant_id: Tenant charged for the tokens
+
+        Returns:
+            Completion result with the original 'query' attached. Results
+            already answered extractively are returned without an LLM call.
+        """
+        if rag_result.get("answer_type") == "extractive":
+            return {
+                "text": rag_result["answer"]["text"],
+                "model": "extractive",
+                "cached": False,
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0},
+                "latency_ms": 0.0,
+                "query": rag_result.get("query")
+            }
+        result = self.complete(rag_result["prompt"], tenant_id=tenant_id)
+        result["query"] = rag_result.get("query")
+        return result
+
+    def stream(
+        self,
+        prompt: str,
+        tenant_id: str = "default",
+        max_tokens: Optional[int] = None,
+        use_cache: bool = True
+    ) -> Iterator[str]:
+        """
+        Stream a completion as text fragments.
+
+        Cached responses are yielded as a single fragment. Failures before the
+        first fragment are retried like complete(); a failure mid-stream is
+        raised, since already yielded text cannot be taken back.
+
+        Args:
+            prompt: Prompt text
+            tenant_id: Tenant charged for the tokens
+            max_tokens: Override for the flag-configured max_tokens
+            use_cache: Whether to read and write the response cache
+
+        Yields:
+            Answer text fragments in order
+
+        Raises:
+            LLMClientError: If the request fails
+        """
+        max_tokens = max_tokens or self.max_tokens
+        key = self.cache_key(prompt, max_tokens)
+
+        if use_cache:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._account(tenant_id, cached.get("usage", {}), cache_hit=True)
+                yield cached.get("text", "")
+                return
+
+        with self._semaphore:
+            fragments: List[str] = []
+            usage: Dict[str, int] = {}
+            for attempt in range(self.max_retries + 1):
+                try:
+                    for kind, value in self._stream_send(prompt, max_tokens):
+                        if kind == "usage":
+                            usage = value
+                            continue
+                        fragments.append(value)
+                        yield value
+                    break
+                except Exception as e:
+                    if fragments or attempt >= self.max_retries:
+                        error_msg = f"LLM stream failed: {str(e)}"
+                        if self.logger:
+                            self.logger.error(error_msg)
+                        raise LLMClientError(error_msg) from e
+                    time.sleep(self.retry_backoff * (2 ** attempt) * (0.5 + random.random() / 2))
+
+        text = "".join(fragments)
+        if not usage:
+            # Endpoint did not report usage for the stream; estimate it
+            usage = {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(text.split())
+            }
+        self._account(tenant_id, usage)
+        if use_cache:
+            self._cache_put(key, {"text": text, "model": self.model, "usage": usage})
+
+    def get_usage(self, tenant_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get token accounting, for one tenant or all of them.
+
+        Returns:
+            Counters: requests, cache_hits, prompt_tokens, completion_tokens,
+            total_tokens
+        """
+        with self._usage_lock:
+            if tenant_id is not None:
+                return dict(self._usage.get(tenant_id, self._empty_usage()))
+            return {tenant: dict(usage) for tenant, usage in self._usage.items()}
+
+    def cache_key(self, prompt: str, max_tokens: Optional[int] = None) -> str:
+        """Hash of everything that influences the response."""
+        payload = json.dumps(
+            [self.model, max_tokens or self.max_tokens, self.temperature, prompt],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _cache_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            if self.logger:
+                self.logger.warning(f"Ignoring unreadable cache entry {path}: {str(e)}")
+            return None
+
+    def _cache_put(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            # Atomic rename so concurrent readers never see a partial file
+            os.replace(tmp_path, path)
+        except OSError as e:
+            if self.logger:
+                self.logger.warning(f"Failed to write cache entry {path}: {str(e)}")
+
+    @staticmethod
+    def _empty_usage() -> Dict[str, int]:
+        return {
+            "requests": 0,
+            "cache_hits": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "total_tokens": 0
+        }
+
+    def _account(self, tenant_id: str, usage: Dict[str, Any], cache_hit: bool = False) -> None:
+        """Charge a tenant; cache hits are counted but cost no tokens."""
+        with self._usage_lock:
+            totals = self._usage.setdefault(tenant_id, self._empty_usage())
+            totals["requests"] += 1
+            if cache_hit:
+                totals["cache_hits"] += 1
+                return
+            prompt_tokens = int(usage.get("prompt_tokens", 0) or 0)
+            completion_tokens = int(usage.get("completion_tokens", 0) or 0)
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["total_tokens"] += prompt_tokens + completion_tokens
+
+    def _call_with_retries(self, prompt: str, max_tokens: int) -> Tuple[str, Dict[str, int]]:
+        """Send a request, retrying with exponential backoff and jitter."""
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._send(prompt, max_tokens)
+            except Exception as e:
+                last_error = e
+                if attempt < self.max_retries:
+                    delay = self.retry_backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+                    if self.logger:
+                        self.logger.warning(
+                            f"LLM request failed, retrying: {str(e)}",
+                            extra={"attempt": attempt + 1, "delay": round(delay, 3)}
+                        )
+                    time.sleep(delay)
+
+        error_msg = f"LLM request failed after {self.max_retries + 1} attempts: {str(last_error)}"
+        if self.logger:
+            self.logger.error(error_msg)
+        raise LLMClientError(error_msg) from last_error
+
+    def _send(self, prompt: str, max_tokens: int) -> Tuple[str, Dict[str, int]]:
+        """Perform one chat completion request."""
+        messages = [{"role": "user", "content": prompt}]
+
+        if OpenAI is not None:
+            if self._sdk_client is None:
+                self._sdk_client = OpenAI(
+                    api_key=self.api_key or "not-set",
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=0
+                )
+            response = self._sdk_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=self.temperature
+            )
+            usage = response.usage
+            return response.choices[0].message.content or "", {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0
+            }
+
+        body = json.dumps({
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": self.temperature
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=body,
+            headers=headers,
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+
+        usage = payload.get("usage") or {}
+        return payload["choices"][0]["message"]["content"] or "", {
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0)
+        }
+
+    def _stream_send(self, prompt: str, max_tokens: int) -> Iterator[Tuple[str, Any]]:
+        """Perform one streaming request, yielding ("text", str) or ("usage", dict)."""
+        messages = [{"role": "user", "content": prompt}]
+
+        if OpenAI is not None:
+            if self._sdk_client is None:
+                self._sdk_client = OpenAI(
+                    api_key=self.api_key or "not-set",
+                    base_url=self.base_url,
+                    timeout=self.timeout,
+                    max_retries=0
+                )
+            chunks = self._sdk_client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=self.temperature,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield "text", chunk.choices[0].delta.content
+                if getattr(chunk, "usage", None):
+                    yield "usage", {
+                        "prompt_tokens": chunk.usage.prompt_tokens or 0,
+                        "completion_tokens": chunk.usage.completion_tokens or 0
+                    }
+            return
+
+        body = json.dumps({
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": self.temperature,
+            "stream": True,
+            "stream_options": {"include_usage": True}
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=body,
+            headers=headers,
+            method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            for raw_line in response:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                choices = chunk.get("choices") or []
+                if choices and (choices[0].get("delta") or {}).get("content"):
+                    yield "text", choices[0]["delta"]["content"]
+                if chunk.get("usage"):
+                    yield "usage", {
+                        "prompt_tokens": chunk["usage"].get("prompt_tokens", 0),
+                        "completion_tokens": chunk["usage"].get("completion_tokens", 0)
+                    }
@@ -0,0 +1,173 @@
+"""
+Stub LLM Server for Trivya Platform
+
+This module provides a local OpenAI-compatible chat completions endpoint
+for tests and benchmarks, so LLMClient can be exercised without network
+access or API keys.
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+class StubLLMServer:
+    """
+    Local stand-in for the chat completions API.
+
+    Answers every request with a deterministic echo of the prompt. An
+    artificial ``latency`` and a number of initial failures (``fail_first``)
+    can be configured to exercise timeouts and retries.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        fail_first: int = 0,
+        token_latency: float = 0.0
+    ):
+        """
+        Initialize the stub server (call start() to begin serving).
+
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            latency: Seconds to wait before answering each request
+            fail_first: Number of initial requests answered with HTTP 500
+            token_latency: Seconds between chunks of a streamed answer
+        """
+        self.latency = latency
+        self.fail_first = fail_first
+        self.token_latency = token_latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> str:
+        """Start serving in a background thread and return the base URL."""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        """Stop serving and release the socket."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubLLMServer":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @staticmethod
+    def answer_for(prompt: str) -> str:
+        """Deterministic answer returned for a prompt."""
+        last_line = prompt.strip().splitlines()[-1] if prompt.strip() else ""
+        return f"Stub answer to: {last_line}"
+
+    def _next_request(self) -> int:
+        with self._lock:
+            self.request_count += 1
+            return self.request_count
+
+    def _make_handler(self):
+        stub = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                number = stub._next_request()
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                if not self.path.endswith("/chat/completions") or number <= stub.fail_first:
+                    self.send_response(404 if number > stub.fail_first else 500)
+                    self.end_headers()
+                    return
+
+                prompt = "\n".join(
+                    message.get("content", "") for message in request.get("messages", [])
+                )
+                answer = stub.answer_for(prompt)
+                if request.get("stream"):
+                    self._stream(request, prompt, answer, number)
+                    return
+                payload = {
+                    "id": f"stub-{number}",
+                    "object": "chat.completion",
+                    "model": request.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": answer},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(prompt.split()),
+                        "completion_tokens": len(answer.split()),
+                        "total_tokens": len(prompt.split()) + len(answer.split())
+                    }
+                }
+                body = json.dumps(payload).encode("utf-8")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client gave up (e.g. timeout tests); nothing to do
+                    pass
+
+            def _stream(self, request, prompt, answer, number):
+                """Send the answer as server-sent events, one word per chunk."""
+                words = answer.split(" ")
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for index, word in enumerate(words):
+                        if stub.token_latency:
+                            time.sleep(stub.token_latency)
+                        delta = word if index == 0 else f" {word}"
+                        chunk = {
+                            "id": f"stub-{number}",
+                            "object": "chat.completion.chunk",
+                            "choices": [{"index": 0, "delta": {"content": delta}}]
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    if (request.get("stream_options") or {}).get("include_usage"):
+                        usage_chunk = {
+                            "id": f"stub-{number}",
+                            "object": "chat.completion.chunk",
+                            "choices": [],
+                            "usage": {
+                                "prompt_tokens": len(prompt.split()),
+                                "completion_tokens": len(words),
+                                "total_tokens": len(prompt.split()) + len(words)
+                            }
+                        }
+                        self.wfile.write(f"data: {json.dumps(usage_chunk)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return _Handler
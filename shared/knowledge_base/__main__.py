@@ -0,0 +1,319 @@
+"""
+Knowledge Base Command-Line Tool for Trivya Platform
+
+Runs bulk knowledge base operations without starting the web app:
+
+    python -m shared.knowledge_base ingest ./exports/helpcenter
+    python -m shared.knowledge_base sync ./exports/helpcenter
+    python -m shared.knowledge_base export kb.jsonl
+    python -m shared.knowledge_base import kb.jsonl --journal kb.journal
+    python -m shared.knowledge_base stats
+    python -m shared.knowledge_base query "How do I reset my password?"
+    python -m shared.knowledge_base bench --queries queries.txt --concurrency 4
+
+Every command goes through KnowledgeBaseManager's streaming and batched
+paths and reports throughput or latency; --json prints the full result.
+Logs go to stderr so stdout only carries command output (e.g. `export -`).
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
+
+from shared.knowledge_base.kb_manager import KnowledgeBaseManager, KnowledgeBaseError
+from shared.knowledge_base.rag_pipeline import LatencyHistogram
+
+
+def log_to_stderr() -> None:
+    """Point the platform's console log handlers at stderr, keeping stdout for command output."""
+    for handler in logging.getLogger("trivya").handlers:
+        if isinstance(handler, logging.StreamHandler) and handler.stream is sys.stdout:
+            handler.setStream(sys.stderr)
+
+
+def build_manager(collection: Optional[str] = None, top_k: int = 5) -> KnowledgeBaseManager:
+    """Create a manager over the configured vector store (or an explicit collection)."""
+    from shared.core_functions.config import Config
+    from shared.core_functions.logger import get_logger
+    from shared.knowledge_base.vector_store import VectorStore
+    from shared.knowledge_base.rag_pipeline import RAGPipeline
+
+    config = Config()
+    # Set up logging before the vector store logs its connection
+    get_logger(config)
+    log_to_stderr()
+    vector_store = VectorStore(config, collection_name=collection)
+    rag_pipeline = RAGPipeline(config, vector_store, top_k=top_k)
+    return KnowledgeBaseManager(config, vector_store, rag_pipeline)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m shared.knowledge_base",
+        description="Bulk operations and benchmarks for the Trivya knowledge base."
+    )
+    parser.add_argument("--collection", help="Collection to use instead of the configured one")
+    parser.add_argument("--json", action="store_true", help="Print the full result as JSON")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Ingest every matching file below a directory")
+    ingest.add_argument("path", help="Directory to ingest")
+    ingest.add_argument("--pattern", action="append", dest="patterns", help="Glob pattern (repeatable)")
+    ingest.add_argument("--workers", type=int, default=4, help="Parser threads")
+    ingest.add_argument("--batch-size", type=int, default=100, help="Documents per write")
+
+    sync = commands.add_parser("sync", help="Incrementally re-sync a directory against its manifest")
+    sync.add_argument("path", help="Directory to sync")
+    sync.add_argument("--pattern", action="append", dest="patterns", help="Glob pattern (repeatable)")
+    sync.add_argument("--manifest", help="Manifest file (defaults to .kb_manifest.json in the directory)")
+    sync.add_argument("--workers", type=int, default=4, help="Parser threads")
+    sync.add_argument("--batch-size", type=int, default=100, help="Documents per write or delete")
+
+    export = commands.add_parser("export", help="Stream the collection out as JSONL")
+    export.add_argument("output", help="Output file, or - for stdout")
+    export.add_argument("--batch-size", type=int, default=500, help="Documents read per request")
+
+    import_ = commands.add_parser("import", help="Stream a JSONL export into the collection")
+    import_.add_argument("input", help="JSONL file, or - for stdin")
+    import_.add_argument("--batch-size", type=int, default=500, help="Documents per write")
+    import_.add_argument("--journal", help="Journal file making the import resumable")
+
+    commands.add_parser("stats", help="Print knowledge base statistics")
+
+    query = commands.add_parser("query", help="Answer a query and report its latency")
+    query.add_argument("text", help="Query text")
+    query.add_argument("--top-k", type=int, default=5, help="Documents retrieved")
+    query.add_argument("--stream", action="store_true", help="Print the answer as it is produced")
+
+    bench = commands.add_parser("bench", help="Measure query latency and throughput")
+    bench.add_argument("--queries", help="File with one query per line (defaults to the warm-up queries)")
+    bench.add_argument("--iterations", type=int, default=3, help="Passes over the query list")
+    bench.add_argument("--concurrency", type=int, default=1, help="Queries in flight at once")
+    bench.add_argument("--top-k", type=int, default=5, help="Documents retrieved per query")
+    bench.add_argument("--warm-up", action="store_true", help="Run one unmeasured pass first")
+    return parser
+
+
+def run_ingest(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    return manager.ingest_directory(
+        args.path,
+        patterns=args.patterns,
+        workers=args.workers,
+        batch_size=args.batch_size
+    )
+
+
+def run_sync(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    return manager.sync_directory(
+        args.path,
+        patterns=args.patterns,
+        manifest_path=args.manifest,
+        workers=args.workers,
+        batch_size=args.batch_size
+    )
+
+
+def run_export(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    output = sys.stdout if args.output == "-" else args.output
+    return manager.export_jsonl(output, batch_size=args.batch_size)
+
+
+def run_import(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    source = sys.stdin if args.input == "-" else args.input
+    return manager.ingest_jsonl(source, batch_size=args.batch_size, journal_path=args.journal)
+
+
+def run_stats(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    return manager.get_stats()
+
+
+def run_query(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    start = time.perf_counter()
+    if not args.stream:
+        answer = manager.query(args.text, top_k=args.top_k)
+        return {
+            "query": args.text,
+            "answer": answer,
+            "latency_ms": (time.perf_counter() - start) * 1000
+        }
+
+    first_fragment_ms = None
+    fragments = []
+
+    async def _consume() -> None:
+        nonlocal first_fragment_ms
+        async for fragment in manager.query_stream(args.text, top_k=args.top_k):
+            if first_fragment_ms is None:
+                first_fragment_ms = (time.perf_counter() - start) * 1000
+            fragments.append(fragment)
+            if not args.json:
+                print(fragment, end="", flush=True)
+
+    asyncio.run(_consume())
+    if not args.json:
+        print()
+    return {
+        "query": args.text,
+        "answer": "".join(fragments),
+        "first_fragment_ms": first_fragment_ms,
+        "latency_ms": (time.perf_counter() - start) * 1000
+    }
+
+
+def run_bench(manager: KnowledgeBaseManager, args: argparse.Namespace) -> Dict[str, Any]:
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip()]
+    else:
+        queries = list(manager.warm_up_queries)
+    if not queries:
+        raise KnowledgeBaseError("No benchmark queries")
+
+    if args.warm_up:
+        manager.warm_up(queries, top_k=args.top_k)
+
+    workload = queries * max(1, args.iterations)
+    latency = LatencyHistogram(window_size=len(workload))
+    errors = []
+
+    def _timed(query: str) -> None:
+        query_start = time.perf_counter()
+        try:
+            # Straight to the pipeline, like warm_up, so query analytics stay clean
+            manager.rag_pipeline.query(user_query=query, top_k=args.top_k)
+        except Exception as e:
+            errors.append({"query": query, "error": str(e)})
+        latency.record((time.perf_counter() - query_start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        list(executor.map(_timed, workload))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "success": not errors,
+        "queries": len(workload),
+        "concurrency": max(1, args.concurrency),
+        "errors": errors,
+        "elapsed_seconds": elapsed,
+        "queries_per_second": len(workload) / elapsed if elapsed > 0 else 0.0,
+        "latency_ms": latency.summary(),
+        "stage_latency_ms": manager.rag_pipeline.get_stage_latency()
+    }
+
+
+COMMANDS = {
+    "ingest": run_ingest,
+    "sync": run_sync,
+    "export": run_export,
+    "import": run_import,
+    "stats": run_stats,
+    "query": run_query,
+    "bench": run_bench
+}
+
+
+def format_result(command: str, result: Dict[str, Any]) -> List[str]:
+    """Human-readable summary lines of a command result."""
+    throughput = result.get("throughput", {})
+    elapsed = throughput.get("elapsed_seconds", result.get("elapsed_seconds", 0.0))
+    if command == "ingest":
+        return [
+            f"Ingested {result['documents']} documents from {result['files']} files "
+            f"({result['failed_files']} failed, {result['invalid']} invalid) in {elapsed:.2f}s",
+            f"Throughput: {throughput['documents_per_second']:.1f} docs/s, "
+            f"{throughput['files_per_second']:.1f} files/s, {throughput['mb_per_second']:.2f} MB/s"
+        ]
+    if command == "sync":
+        return [
+            f"Synced {throughput['files_scanned']} files: {len(result['added'])} added, "
+            f"{len(result['updated'])} updated, {len(result['removed'])} removed, "
+            f"{result['unchanged']} unchanged, {len(result['failed'])} failed",
+            f"Documents: {result['documents_added']} written, {result['documents_deleted']} deleted, "
+            f"{result['pending_deletes']} pending deletes",
+            f"Throughput: {throughput['documents_per_second']:.1f} docs/s in {elapsed:.2f}s"
+        ]
+    if command == "export":
+        return [
+            f"Exported {result['documents']} documents in {elapsed:.2f}s "
+            f"({throughput['documents_per_second']:.1f} docs/s)"
+        ]
+    if command == "import":
+        lines = [
+            f"Imported {result['successful']} documents from {result['lines']} lines "
+            f"({result['failed']} invalid) in {elapsed:.2f}s "
+            f"({throughput['documents_per_second']:.1f} docs/s)"
+        ]
+        lines.extend(f"  line {error['line']}: {error['error']}" for error in result["errors"][:10])
+        return lines
+    if command == "stats":
+        vector_store = result.get("vector_store", {})
+        return [
+            f"Collection: {vector_store.get('name')} ({vector_store.get('document_count', 0)} documents)",
+            f"Queries: {result.get('total_queries', 0)}",
+            f"Ingestions: {result.get('successful_ingestions', 0)} successful, "
+            f"{result.get('failed_ingestions', 0)} failed",
+            f"Last update: {result.get('last_update')}"
+        ]
+    if command == "query":
+        lines = [] if "first_fragment_ms" in result else [result["answer"]]
+        timing = f"Latency: {result['latency_ms']:.1f} ms"
+        if result.get("first_fragment_ms") is not None:
+            timing += f" (first fragment {result['first_fragment_ms']:.1f} ms)"
+        return lines + [timing]
+    if command == "bench":
+        latency = result["latency_ms"]
+        return [
+            f"{result['queries']} queries at concurrency {result['concurrency']} in {elapsed:.2f}s "
+            f"({result['queries_per_second']:.1f} queries/s, {len(result['errors'])} errors)",
+            f"Latency: p50 {latency['p50_ms']} ms, p95 {latency['p95_ms']} ms, p99 {latency['p99_ms']} ms"
+        ] + [
+            f"  {stage}: p50 {summary['p50_ms']} ms, p95 {summary['p95_ms']} ms"
+            for stage, summary in result["stage_latency_ms"].items() if summary.get("count")
+        ]
+    return [json.dumps(result, default=str)]
+
+
+def main(argv: Optional[List[str]] = None, manager: Optional[KnowledgeBaseManager] = None) -> int:
+    """
+    Run the command line tool.
+
+    Args:
+        argv: Arguments (defaults to sys.argv[1:])
+        manager: Manager to use instead of one built from the environment
+
+    Returns:
+        Exit status: 0 on success, 1 if the command failed (including
+        configuration and validation errors)
+    """
+    args = build_parser().parse_args(argv)
+    log_to_stderr()
+    try:
+        if manager is None:
+            manager = build_manager(args.collection, top_k=getattr(args, "top_k", 5))
+        result = COMMANDS[args.command](manager, args)
+    except (KnowledgeBaseError, OSError) as e:
+        print(f"error: {str(e)}", file=sys.stderr)
+        return 1
+    except Exception as e:
+        # Invalid configuration or arguments the manager rejects; no traceback
+        print(f"error: {type(e).__name__}: {str(e)}", file=sys.stderr)
+        return 1
+
+    # Keep stdout clean for the JSONL stream of `export -`
+    out = sys.stderr if args.command == "export" and args.output == "-" else sys.stdout
+    if args.json:
+        print(json.dumps(result, indent=2, default=str), file=out)
+    else:
+        for line in format_result(args.command, result):
+            print(line, file=out)
+    return 0 if result.get("success", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""
+Query Analytics for Trivya Platform
+
+This module tracks the most frequent knowledge base queries in bounded
+memory. Counts live in a count-min sketch and only the current top-k
+normalized queries are kept verbatim, so cache pre-warming and gap analysis
+do not require storing every raw query.
+"""
+
+import hashlib
+import heapq
+import re
+import threading
+from typing import List, Dict, Any, Tuple
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", query.lower())).strip()
+
+
+class CountMinSketch:
+    """
+    Count-min sketch: ``depth`` rows of ``width`` counters.
+
+    Estimates never undercount; with width w and depth d an estimate exceeds
+    the true count by more than 2N/w with probability at most 2^-d, where N
+    is the total number of additions.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        """
+        Initialize the sketch.
+
+        Args:
+            width: Counters per row
+            depth: Number of rows (independent hash functions)
+        """
+        if width < 1 or depth < 1:
+            raise ValueError("width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._rows = [[0] * width for _ in range(depth)]
+
+    def add(self, item: str, count: int = 1) -> int:
+        """Add an item and return its new estimated count."""
+        estimate = None
+        for row, column in zip(self._rows, self._columns(item)):
+            row[column] += count
+            estimate = row[column] if estimate is None else min(estimate, row[column])
+        self.total += count
+        return estimate
+
+    def estimate(self, item: str) -> int:
+        """Estimated count of an item (an upper bound of the true count)."""
+        return min(row[column] for row, column in zip(self._rows, self._columns(item)))
+
+    def _columns(self, item: str) -> List[int]:
+        # Double hashing from one 128-bit digest; row i uses h1 + i*h2
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+
+class HeavyHitters:
+    """
+    Top-k items by estimated frequency over a count-min sketch.
+
+    Candidates sit in a min-heap keyed by their estimate; a new item enters
+    only when its estimate beats the smallest candidate. Heap entries go
+    stale as counts grow and are refreshed lazily when they reach the top.
+    """
+
+    def __init__(self, k: int = 50, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self._counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, item: str) -> int:
+        """Count an item; returns its estimated count."""
+        with self._lock:
+            estimate = self.sketch.add(item)
+            if item in self._counts:
+                self._counts[item] = estimate
+            elif len(self._counts) < self.k:
+                self._counts[item] = estimate
+                heapq.heappush(self._heap, (estimate, item))
+            elif estimate > self._min_count():
+                _, evicted = heapq.heappop(self._heap)
+                del self._counts[evicted]
+                self._counts[item] = estimate
+                heapq.heappush(self._heap, (estimate, item))
+            return estimate
+
+    def top(self, n: int = 10) -> List[Dict[str, Any]]:
+        """The n most frequent items with their estimated counts."""
+        with self._lock:
+            ranked = sorted(self._counts.items(), key=lambda entry: (-entry[1], entry[0]))
+        return [{"query": item, "count": count} for item, count in ranked[:n]]
+
+    @property
+    def total(self) -> int:
+        return self.sketch.total
+
+    def _min_count(self) -> int:
+        """Smallest current count among candidates, refreshing stale heap entries."""
+        while True:
+            count, item = self._heap[0]
+            current = self._counts[item]
+            if count == current:
+                return count
+            heapq.heapreplace(self._heap, (current, item))
+
+
+class QueryAnalytics:
+    """
+    Heavy hitters for all queries and for queries that went unanswered.
+
+    Queries are normalized before counting so trivial variations of the
+    same question are aggregated.
+    """
+
+    def __init__(self, k: int = 50, width: int = 2048, depth: int = 4):
+        """
+        Initialize query analytics.
+
+        Args:
+            k: Number of top queries tracked per category
+            width: Count-min sketch width
+            depth: Count-min sketch depth
+        """
+        self.queries = HeavyHitters(k, width, depth)
+        self.unanswered = HeavyHitters(k, width, depth)
+
+    def record_query(self, query: str) -> None:
+        normalized = normalize_query(query)
+        if normalized:
+            self.queries.add(normalized)
+
+    def record_unanswered(self, query: str) -> None:
+        normalized = normalize_query(query)
+        if normalized:
+            self.unanswered.add(normalized)
+
+    def top_queries(self, n: int = 10) -> List[Dict[str, Any]]:
+        return self.queries.top(n)
+
+    def top_unanswered(self, n: int = 10) -> List[Dict[str, Any]]:
+        return self.unanswered.top(n)
+
+    def get_stats(self, n: int = 10) -> Dict[str, Any]:
+        """Totals and the top n queries of each category."""
+        return {
+            "total_queries": self.queries.total,
+            "total_unanswered": self.unanswered.total,
+            "top_queries": self.top_queries(n),
+            "top_unanswered": self.top_unanswered(n)
+        }
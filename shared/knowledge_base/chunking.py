@@ -0,0 +1,331 @@
+"""
+Content-Defined Chunking for Trivya Platform
+
+This module splits documents into chunks whose boundaries are chosen by a
+rolling hash over the content instead of fixed offsets, so a block of text
+shared by many documents (legal footers, common troubleshooting steps) is
+cut into the same chunks wherever it appears. Chunks are stored under IDs
+derived from their hash; a chunk already in the collection is referenced
+(a row in the reference table, plus a higher count on the chunk) instead of
+being embedded and stored again.
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+# Metadata keys of stored chunks
+CHUNK_HASH_KEY = "chunk_hash"
+CHUNK_REFS_KEY = "chunk_refs"
+CHUNK_INDEX_KEY = "chunk_index"
+
+# Bookkeeping keys that are not part of any document's metadata
+CHUNK_METADATA_KEYS = (CHUNK_HASH_KEY, CHUNK_REFS_KEY, CHUNK_INDEX_KEY)
+
+# Chunk IDs per SQL statement, below SQLite's bound-parameter limit
+_SQL_BATCH = 500
+
+_MASK64 = (1 << 64) - 1
+
+# Gear table: one pseudo-random 64-bit value per byte value
+_GEAR = [
+    int.from_bytes(hashlib.blake2b(bytes([value]), digest_size=8).digest(), "big")
+    for value in range(256)
+]
+
+
+def chunk_hash(text: str) -> str:
+    """Stable content hash of a chunk."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def shared_chunk_id(digest: str) -> str:
+    """Collection ID of a deduplicated chunk."""
+    return f"chunk-{digest}"
+
+
+def chunk_reference(chunk_id: str, owner: str) -> str:
+    """Reference of one document to a chunk, as kept in manifests and the expiry heap."""
+    return f"{chunk_id}@{owner}"
+
+
+def split_chunk_reference(reference: str) -> Tuple[str, str]:
+    """(chunk ID, owning document) of a chunk reference."""
+    chunk_id, _, owner = reference.partition("@")
+    return chunk_id, owner
+
+
+class ContentDefinedChunker:
+    """
+    Gear rolling-hash chunker.
+
+    Each character shifts the 64-bit hash left and adds its gear value, so
+    the hash depends only on the last 64 characters. Once a chunk has
+    min_chars, a boundary is due when the top bits of the hash are zero
+    (about every avg_chars - min_chars characters) and is placed at the next
+    whitespace so words are not split. At max_chars a cut is forced, at the
+    last whitespace where possible.
+    """
+
+    def __init__(self, min_chars: int = 256, avg_chars: int = 1024, max_chars: int = 4096):
+        """
+        Initialize the chunker.
+
+        Args:
+            min_chars: Minimum chunk length
+            avg_chars: Target average chunk length
+            max_chars: Maximum chunk length
+
+        Raises:
+            ValueError: If the sizes are not increasing
+        """
+        if not 0 < min_chars < avg_chars < max_chars:
+            raise ValueError("Chunk sizes must satisfy 0 < min_chars < avg_chars < max_chars")
+        self.min_chars = min_chars
+        self.avg_chars = avg_chars
+        self.max_chars = max_chars
+        self._shift = 64 - max(1, round(math.log2(avg_chars - min_chars)))
+
+    def split(self, text: str) -> List[str]:
+        """
+        Split text into content-defined chunks.
+
+        Returns:
+            Non-empty chunks with surrounding whitespace stripped
+        """
+        chunks = []
+        start = 0
+        rolling = 0
+        boundary_due = False
+        last_space = -1
+        for position, char in enumerate(text):
+            rolling = ((rolling << 1) + _GEAR[ord(char) & 0xFF]) & _MASK64
+            if char.isspace():
+                last_space = position
+            length = position + 1 - start
+            if length < self.min_chars:
+                continue
+            if not boundary_due and rolling >> self._shift == 0:
+                boundary_due = True
+            if boundary_due and char.isspace():
+                end = position + 1
+            elif length >= self.max_chars:
+                # Forced cut: back off to the last whitespace unless that leaves too little
+                end = last_space + 1 if last_space + 1 - start >= self.min_chars else position + 1
+            else:
+                continue
+            chunks.append(text[start:end])
+            start = end
+            boundary_due = False
+        chunks.append(text[start:])
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+class ChunkReferenceTable:
+    """
+    Document-to-chunk references, kept outside the vector store.
+
+    One SQLite row per (chunk, document) pair, so the chunk record itself
+    only carries a reference count however many documents share it, and
+    adding a pair that already exists is a no-op. Changes made inside
+    transaction() are rolled back if the vector store write fails.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        """
+        Open (or create) the table.
+
+        Args:
+            path: SQLite file, or ":memory:" for a table that lives as long
+                as the process
+        """
+        self.path = path
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Callers serialize access (ChunkStore holds its lock around every use)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_refs ("
+                "chunk_id TEXT NOT NULL, owner TEXT NOT NULL, "
+                "PRIMARY KEY (chunk_id, owner)) WITHOUT ROWID"
+            )
+
+    def transaction(self) -> sqlite3.Connection:
+        """Context manager committing on success and rolling back on error."""
+        return self._connection
+
+    def add(self, pairs: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Insert (chunk ID, owner) pairs; returns those that were not present."""
+        added = []
+        for pair in dict.fromkeys(pairs):
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO chunk_refs (chunk_id, owner) VALUES (?, ?)", pair
+            )
+            if cursor.rowcount:
+                added.append(pair)
+        return added
+
+    def remove(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Delete (chunk ID, owner) pairs; absent pairs are ignored."""
+        self._connection.executemany("DELETE FROM chunk_refs WHERE chunk_id = ? AND owner = ?", list(pairs))
+
+    def counts(self, chunk_ids: List[str]) -> Dict[str, int]:
+        """Number of owners of each chunk (chunks without owners are left out)."""
+        counts = {}
+        for offset in range(0, len(chunk_ids), _SQL_BATCH):
+            batch = chunk_ids[offset:offset + _SQL_BATCH]
+            counts.update(self._connection.execute(
+                "SELECT chunk_id, COUNT(*) FROM chunk_refs WHERE chunk_id IN "
+                f"({', '.join('?' * len(batch))}) GROUP BY chunk_id",
+                batch
+            ))
+        return counts
+
+    def owners(self, chunk_id: str) -> List[str]:
+        """Documents referencing a chunk."""
+        return [
+            owner for (owner,) in self._connection.execute(
+                "SELECT owner FROM chunk_refs WHERE chunk_id = ? ORDER BY owner", (chunk_id,)
+            )
+        ]
+
+    def drop(self) -> None:
+        """Close the table and delete its file."""
+        self._connection.close()
+        if self.path != ":memory:":
+            Path(self.path).unlink(missing_ok=True)
+
+
+def reference_table_path(vector_store: Any) -> str:
+    """Reference table file of a collection, next to its vector database."""
+    db_path = getattr(vector_store, "db_path", None)
+    if not isinstance(db_path, str):
+        return ":memory:"
+    return str(Path(db_path) / f"{vector_store.collection_name}.chunk_refs.sqlite")
+
+
+class ChunkStore:
+    """
+    Reference-counted chunk storage on a vector store.
+
+    The collection's ID index is the global chunk-hash table: looking up a
+    batch of content-derived IDs tells which chunks exist. New chunks are
+    added (and embedded) once, with the metadata of the first document that
+    stores them; later documents only add a row to the reference table and
+    raise the chunk's CHUNK_REFS_KEY count. release() drops references and
+    deletes chunks nothing references any more.
+
+    References name the document holding the chunk (see chunk_reference).
+    Storing a (document, chunk) pair that is already referenced changes
+    nothing, so replaying a batch is safe.
+    """
+
+    def __init__(self, vector_store: Any, references: Optional[ChunkReferenceTable] = None):
+        """
+        Initialize the store.
+
+        Args:
+            vector_store: VectorStore holding the chunks
+            references: Reference table; defaults to one next to the
+                collection (see reference_table_path)
+        """
+        self.vector_store = vector_store
+        self.references = references or ChunkReferenceTable(reference_table_path(vector_store))
+        self.stats = {"chunks_stored": 0, "chunks_referenced": 0, "chunks_deleted": 0}
+        # Serializes read-modify-write of reference counts within the process
+        self._lock = threading.Lock()
+
+    def store(self, references: List[str], chunks: List[Dict[str, Any]]) -> None:
+        """
+        Store chunks under the given references, referencing those already present.
+
+        Args:
+            references: Chunk references from chunk_reference()
+            chunks: Prepared chunk documents, aligned with references
+        """
+        first = {}
+        pairs = []
+        for reference, chunk in zip(references, chunks):
+            chunk_id, owner = split_chunk_reference(reference)
+            first.setdefault(chunk_id, chunk)
+            pairs.append((chunk_id, owner))
+
+        with self._lock, self.references.transaction():
+            added = self.references.add(pairs)
+            if not added:
+                return
+            touched = list(dict.fromkeys(chunk_id for chunk_id, _ in added))
+            counts = self.references.counts(touched)
+            existing = {
+                document["id"]: document["metadata"]
+                for document in self.vector_store.get_documents(touched)
+            }
+            new_ids = [chunk_id for chunk_id in touched if chunk_id not in existing]
+            if new_ids:
+                self.vector_store.add_documents(
+                    [
+                        {
+                            "content": first[chunk_id]["content"],
+                            "metadata": {**first[chunk_id]["metadata"], CHUNK_REFS_KEY: counts[chunk_id]}
+                        }
+                        for chunk_id in new_ids
+                    ],
+                    ids=new_ids
+                )
+            if existing:
+                self.vector_store.update_metadata(
+                    list(existing),
+                    [{**metadata, CHUNK_REFS_KEY: counts[chunk_id]} for chunk_id, metadata in existing.items()]
+                )
+            self.stats["chunks_stored"] += len(new_ids)
+            self.stats["chunks_referenced"] += len(added) - len(new_ids)
+
+    def release(self, references: List[str]) -> int:
+        """
+        Drop the given references, deleting chunks left unreferenced.
+
+        Records without references in the table are deleted outright.
+
+        Returns:
+            Number of records deleted
+        """
+        pairs = [split_chunk_reference(reference) for reference in references]
+        chunk_ids = list(dict.fromkeys(chunk_id for chunk_id, _ in pairs))
+        with self._lock, self.references.transaction():
+            self.references.remove(pairs)
+            counts = self.references.counts(chunk_ids)
+            stored = {
+                document["id"]: document["metadata"]
+                for document in self.vector_store.get_documents(chunk_ids)
+            }
+            doomed = [chunk_id for chunk_id in stored if not counts.get(chunk_id)]
+            kept = [
+                chunk_id for chunk_id, metadata in stored.items()
+                if counts.get(chunk_id) and metadata.get(CHUNK_REFS_KEY) != counts[chunk_id]
+            ]
+            if kept:
+                self.vector_store.update_metadata(
+                    kept,
+                    [{**stored[chunk_id], CHUNK_REFS_KEY: counts[chunk_id]} for chunk_id in kept]
+                )
+            if doomed:
+                self.vector_store.delete_documents(doomed)
+            self.stats["chunks_deleted"] += len(doomed)
+        return len(doomed)
+
+    def drop(self) -> None:
+        """Delete the reference table, e.g. after the collection was dropped."""
+        with self._lock:
+            self.references.drop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        stored = self.stats["chunks_stored"]
+        referenced = self.stats["chunks_referenced"]
+        return {
+            **self.stats,
+            "dedup_ratio": referenced / (stored + referenced) if stored + referenced else 0.0
+        }
@@ -0,0 +1,172 @@
+"""
+Contextual Compression for Trivya Platform
+
+This module trims retrieved documents down to the sentences that actually
+overlap with the user's query before they are assembled into a prompt.
+Sentence boundaries are computed once at ingest and stored in document
+metadata, so query-time compression only slices the stored content.
+"""
+
+import re
+from typing import List, Dict, Any, Optional, Tuple
+
+from shared.knowledge_base.snippets import SNIPPET_LENGTH_KEY
+
+# Metadata key holding the encoded sentence boundaries of a document
+SENTENCE_OFFSETS_KEY = "sentence_offsets"
+
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+|\n|$)")
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+_STOPWORDS = frozenset({
+    "a", "an", "the", "is", "are", "was", "were", "be", "to", "of", "and",
+    "or", "in", "on", "at", "for", "with", "by", "it", "this", "that", "do",
+    "does", "i", "you", "my", "your", "we", "can", "how", "what", "when",
+    "where", "why", "which", "who", "me", "our", "from", "as", "if", "so",
+    "many", "much", "any", "there", "have", "has", "will", "would", "should",
+    "could"
+})
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    Split text into sentence spans.
+
+    Args:
+        text: Raw document content
+
+    Returns:
+        List of (start, end) character offsets, whitespace-trimmed
+    """
+    spans = []
+    for match in _SENTENCE_PATTERN.finditer(text):
+        start, end = match.start(), match.end()
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+    return spans
+
+
+def encode_offsets(spans: List[Tuple[int, int]]) -> str:
+    """Encode sentence spans as a compact metadata string ("s:e,s:e")."""
+    return ",".join(f"{start}:{end}" for start, end in spans)
+
+
+def decode_offsets(encoded: str) -> List[Tuple[int, int]]:
+    """Decode a string produced by encode_offsets back into spans."""
+    spans = []
+    if not encoded:
+        return spans
+    for part in encoded.split(","):
+        start, _, end = part.partition(":")
+        spans.append((int(start), int(end)))
+    return spans
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common stopwords removed."""
+    return [
+        token for token in _TOKEN_PATTERN.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+def document_spans(content: str, metadata: Optional[Dict[str, Any]] = None) -> List[Tuple[int, int]]:
+    """
+    Sentence spans of a stored document.
+
+    Uses the offsets stored at ingest when they fit the content, and falls
+    back to splitting on the fly for documents ingested without them.
+    """
+    encoded = (metadata or {}).get(SENTENCE_OFFSETS_KEY)
+    if encoded:
+        try:
+            spans = decode_offsets(encoded)
+            if spans and spans[-1][1] <= len(content):
+                return spans
+        except ValueError:
+            pass
+    return split_sentences(content)
+
+
+class ContextCompressor:
+    """
+    Keeps only the query-relevant sentences of each context document.
+
+    A sentence is kept when the fraction of query terms it contains reaches
+    ``min_overlap``. The best sentence of a document is always kept so that a
+    retrieved document never disappears from the prompt entirely.
+    """
+
+    def __init__(self, min_overlap: float = 0.2, max_sentences: int = 5):
+        """
+        Initialize the compressor.
+
+        Args:
+            min_overlap: Minimum share of query terms a sentence must contain
+            max_sentences: Maximum sentences kept per document
+        """
+        self.min_overlap = min_overlap
+        self.max_sentences = max_sentences
+
+    def compress(
+        self,
+        query: str,
+        context: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Compress a list of context documents against a query.
+
+        Args:
+            query: User query string
+            context: Context documents from RAGPipeline.retrieve_context
+
+        Returns:
+            New list of documents whose 'content' holds only relevant sentences
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return context
+        return [self.compress_document(query_terms, doc) for doc in context]
+
+    def compress_document(
+        self,
+        query_terms: set,
+        document: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Compress a single document; returns a copy, the input is untouched."""
+        content = document.get("content", "") or ""
+        metadata = document.get("metadata") or {}
+        spans = document_spans(content, metadata)
+        if len(spans) <= 1:
+            return document
+
+        scored = []
+        for position, (start, end) in enumerate(spans):
+            sentence_terms = set(tokenize(content[start:end]))
+            overlap = len(query_terms & sentence_terms) / len(query_terms)
+            scored.append((overlap, position))
+
+        best = max(scored)
+        kept = [item for item in scored if item[0] >= self.min_overlap and item[0] > 0]
+        if not kept:
+            kept = [best]
+        kept = sorted(kept, reverse=True)[:self.max_sentences]
+
+        # Preserve the original reading order of the kept sentences
+        positions = sorted(position for _, position in kept)
+        compressed = " ".join(content[spans[p][0]:spans[p][1]] for p in positions)
+
+        result = dict(document)
+        result["content"] = compressed
+        result["original_length"] = len(content)
+        # Stored offsets and snippet length describe the original content,
+        # not the compressed one
+        result["metadata"] = {
+            key: value for key, value in metadata.items()
+            if key not in (SENTENCE_OFFSETS_KEY, SNIPPET_LENGTH_KEY)
+        }
+        return result
@@ -0,0 +1,151 @@
+"""
+Near-Duplicate Detection for Trivya Platform
+
+This module computes compact SimHash signatures for documents at ingest and
+uses them at query time to drop retrieved documents that are lightly edited
+copies of a higher-ranked one.
+"""
+
+import hashlib
+import re
+from typing import List, Dict, Any, Optional
+
+# Metadata key holding the hex-encoded 64-bit SimHash of a document
+SIMHASH_KEY = "simhash"
+
+SIMHASH_BITS = 64
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _feature_hash(feature: str) -> int:
+    """Stable 64-bit hash of a shingle."""
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def simhash(text: str) -> int:
+    """
+    Compute a 64-bit SimHash over word unigrams and bigrams.
+
+    Args:
+        text: Document content
+
+    Returns:
+        Signature as an unsigned 64-bit integer
+    """
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    features: Dict[str, int] = {}
+    for index, token in enumerate(tokens):
+        features[token] = features.get(token, 0) + 1
+        if index + 1 < len(tokens):
+            bigram = f"{token} {tokens[index + 1]}"
+            features[bigram] = features.get(bigram, 0) + 1
+
+    weights = [0] * SIMHASH_BITS
+    for feature, weight in features.items():
+        value = _feature_hash(feature)
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += weight
+            else:
+                weights[bit] -= weight
+
+    signature = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            signature |= 1 << bit
+    return signature
+
+
+def encode_simhash(signature: int) -> str:
+    """Encode a signature for metadata storage (fixed-width hex)."""
+    return f"{signature:016x}"
+
+
+def decode_simhash(encoded: str) -> int:
+    """Decode a signature produced by encode_simhash."""
+    return int(encoded, 16)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two signatures."""
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateFilter:
+    """
+    Drops ranked documents whose SimHash is close to a higher-ranked one.
+
+    Kept signatures are indexed by ``bands`` equal slices of their bits. By the
+    pigeonhole principle two signatures within ``max_distance < bands`` bits
+    share at least one identical band, so each candidate only has to be
+    compared against the few kept signatures in its band buckets rather than
+    against every kept document.
+    """
+
+    def __init__(self, max_distance: int = 5, bands: int = 6):
+        """
+        Initialize the filter.
+
+        Args:
+            max_distance: Maximum Hamming distance treated as a duplicate
+            bands: Number of bit bands used for bucketing (must exceed
+                max_distance for the lookup to be exact)
+        """
+        if max_distance >= bands:
+            raise ValueError("bands must be greater than max_distance")
+        self.max_distance = max_distance
+        self.bands = bands
+        self._band_width = SIMHASH_BITS // bands
+        self._band_mask = (1 << self._band_width) - 1
+
+    def filter(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Remove near-duplicates from a ranked result list.
+
+        Args:
+            results: Documents in rank order (best first)
+
+        Returns:
+            Documents with lower-ranked near-duplicates removed
+        """
+        buckets: Dict[tuple, List[int]] = {}
+        kept = []
+        for result in results:
+            signature = self._signature(result)
+            if signature is None:
+                kept.append(result)
+                continue
+
+            keys = self._band_keys(signature)
+            duplicate = any(
+                hamming_distance(signature, other) <= self.max_distance
+                for key in keys
+                for other in buckets.get(key, ())
+            )
+            if duplicate:
+                continue
+
+            for key in keys:
+                buckets.setdefault(key, []).append(signature)
+            kept.append(result)
+        return kept
+
+    def _band_keys(self, signature: int) -> List[tuple]:
+        return [
+            (band, signature >> (band * self._band_width) & self._band_mask)
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def _signature(result: Dict[str, Any]) -> Optional[int]:
+        """Stored signature, or one computed from content for legacy documents."""
+        encoded = (result.get("metadata") or {}).get(SIMHASH_KEY)
+        if encoded:
+            try:
+                return decode_simhash(encoded)
+            except ValueError:
+                pass
+        content = result.get("content")
+        return simhash(content) if content else None
@@ -0,0 +1,111 @@
+"""
+Document Expiry for Trivya Platform
+
+Documents may carry an ``expires_at`` metadata field (ISO 8601 timestamp
+or Unix epoch seconds). It is normalized to epoch seconds at ingest, and the
+IDs of expiring documents are kept in a min-heap ordered by expiry time, so
+a purge only ever looks at documents that are actually due instead of
+scanning the collection.
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional, Tuple
+
+# Metadata key holding a document's expiry as Unix epoch seconds
+EXPIRES_AT_KEY = "expires_at"
+
+
+def parse_expiry(value: Any) -> float:
+    """
+    Convert an expires_at value to Unix epoch seconds.
+
+    Args:
+        value: Epoch seconds, or an ISO 8601 date/timestamp (naive values
+            are taken as UTC)
+
+    Returns:
+        Expiry as epoch seconds
+
+    Raises:
+        ValueError: If the value is not a number or ISO 8601 timestamp
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid {EXPIRES_AT_KEY}: {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        moment = value
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.endswith(("Z", "z")):
+            text = text[:-1] + "+00:00"
+        try:
+            moment = datetime.fromisoformat(text)
+        except ValueError:
+            raise ValueError(f"Invalid {EXPIRES_AT_KEY}: {value!r}")
+    else:
+        raise ValueError(f"Invalid {EXPIRES_AT_KEY}: {value!r}")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def is_expired(metadata: Optional[Dict[str, Any]], now: Optional[float] = None) -> bool:
+    """Whether stored metadata carries an expiry that has passed."""
+    expires_at = (metadata or {}).get(EXPIRES_AT_KEY)
+    if not isinstance(expires_at, (int, float)) or isinstance(expires_at, bool):
+        return False
+    return expires_at <= (time.time() if now is None else now)
+
+
+class ExpirySchedule:
+    """
+    Min-heap of (expires_at, document ID) pairs.
+
+    Entries are never removed early: a document deleted or re-scheduled by
+    other means leaves a stale entry whose purge is a harmless no-op.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def schedule(self, document_id: str, expires_at: float) -> None:
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, document_id))
+
+    def pop_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[Tuple[float, str]]:
+        """
+        Remove and return entries whose expiry has passed, earliest first.
+
+        Args:
+            now: Reference time in epoch seconds (defaults to the current time)
+            limit: Maximum number of entries returned
+        """
+        now = time.time() if now is None else now
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and (limit is None or len(due) < limit):
+                due.append(heapq.heappop(self._heap))
+        return due
+
+    def restore(self, entries: List[Tuple[float, str]]) -> None:
+        """Put back entries whose purge failed."""
+        with self._lock:
+            for entry in entries:
+                heapq.heappush(self._heap, entry)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap = []
+
+    def next_expiry(self) -> Optional[float]:
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
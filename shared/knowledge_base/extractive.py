@@ -0,0 +1,156 @@
+"""
+Extractive Answering for Trivya Platform
+
+This module answers FAQ-style questions directly from a span of the
+retrieved context. Sentences of the top-k documents are ranked against the
+query with BM25, and a span is returned only when it covers enough of the
+query to be trusted; otherwise the caller falls through to generation.
+Questions and lines that merely restate the query (FAQ questions, article
+titles) are never returned as answers; they lend their match to the
+sentence that follows them instead.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from shared.knowledge_base.compression import document_spans, tokenize
+
+# Share of a sentence's terms taken from the query above which it only restates the query
+RESTATEMENT_RATIO = 0.8
+
+_QUESTION_LABEL = re.compile(r"^\s*(q|question)\s*[:.)]", re.IGNORECASE)
+_ANSWER_LABEL = re.compile(r"^\s*(a|answer)\s*[:.)]\s*", re.IGNORECASE)
+
+
+class ExtractiveAnswerer:
+    """
+    BM25 sentence ranker over retrieved context.
+
+    Sentence statistics (IDF, average length) are computed over the sentences
+    of the retrieved documents only, which keeps scoring local to the query.
+    Confidence is the IDF-weighted share of query terms found in the chosen
+    span and the question or title heading it, so it stays in [0, 1]
+    regardless of corpus size.
+    """
+
+    def __init__(
+        self,
+        min_confidence: float = 0.75,
+        max_span_sentences: int = 2,
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        """
+        Initialize the answerer.
+
+        Args:
+            min_confidence: Confidence needed to answer without generation
+            max_span_sentences: Maximum consecutive sentences in an answer
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalisation
+        """
+        self.min_confidence = min_confidence
+        self.max_span_sentences = max_span_sentences
+        self.k1 = k1
+        self.b = b
+
+    def extract(
+        self,
+        query: str,
+        context: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Find the best answer span in the context.
+
+        Args:
+            query: User query string
+            context: Context documents from RAGPipeline.retrieve_context
+
+        Returns:
+            Dictionary with 'text', 'confidence', 'score', 'source' and
+            'document_id', or None if there is nothing to score
+        """
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms or not context:
+            return None
+
+        sentences = []
+        for doc_index, doc in enumerate(context):
+            content = doc.get("content", "") or ""
+            for position, (start, end) in enumerate(document_spans(content, doc.get("metadata"))):
+                sentences.append((doc_index, position, content[start:end], Counter(tokenize(content[start:end]))))
+        if not sentences:
+            return None
+
+        total = len(sentences)
+        avg_length = sum(sum(terms.values()) for *_, terms in sentences) / total or 1.0
+        idf = {}
+        for term in query_terms:
+            containing = sum(1 for *_, terms in sentences if term in terms)
+            idf[term] = math.log(1.0 + (total - containing + 0.5) / (containing + 0.5))
+
+        scores = []
+        for doc_index, position, text, terms in sentences:
+            length = sum(terms.values())
+            score = 0.0
+            for term in query_terms:
+                frequency = terms.get(term, 0)
+                if frequency:
+                    norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                    score += idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores.append(score)
+        prompts = [self._is_prompt(text, terms, query_terms) for _, _, text, terms in sentences]
+
+        # Answers are statements; a question or title directly before one
+        # in the same document heads it and adds its score
+        best = None
+        for index, (doc_index, *_) in enumerate(sentences):
+            if prompts[index]:
+                continue
+            heading = index - 1 if index and prompts[index - 1] and sentences[index - 1][0] == doc_index else None
+            score = scores[index] + (scores[heading] if heading is not None else 0.0)
+            if best is None or score > best[0]:
+                best = (score, index, heading)
+
+        if best is None or best[0] <= 0:
+            return None
+        score, index, heading = best
+
+        # Extend with following statements of the same document while they
+        # still match the query, up to max_span_sentences
+        doc_index = sentences[index][0]
+        span = [sentences[index]]
+        for offset, follower in enumerate(sentences[index + 1:index + self.max_span_sentences], index + 1):
+            if follower[0] != doc_index or prompts[offset] or not any(term in follower[3] for term in query_terms):
+                break
+            span.append(follower)
+
+        covered = set()
+        for *_, terms in span + ([sentences[heading]] if heading is not None else []):
+            covered.update(term for term in query_terms if term in terms)
+        weight_total = sum(idf.values()) or 1.0
+        confidence = sum(idf[term] for term in covered) / weight_total
+
+        document = context[doc_index]
+        return {
+            "text": _ANSWER_LABEL.sub("", " ".join(item[2] for item in span), count=1),
+            "confidence": round(confidence, 4),
+            "score": round(score, 4),
+            "source": (document.get("metadata") or {}).get("source"),
+            "document_id": document.get("id")
+        }
+
+    @staticmethod
+    def _is_prompt(text: str, terms: Counter, query_terms: List[str]) -> bool:
+        """Whether a sentence is a question or only restates the query."""
+        if text.rstrip().endswith("?") or _QUESTION_LABEL.match(text):
+            return True
+        length = sum(terms.values())
+        restated = sum(count for term, count in terms.items() if term in query_terms)
+        return length > 0 and restated / length >= RESTATEMENT_RATIO
+
+    def is_confident(self, answer: Optional[Dict[str, Any]]) -> bool:
+        """Whether an extracted answer can skip generation."""
+        return answer is not None and answer["confidence"] >= self.min_confidence
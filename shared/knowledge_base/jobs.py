@@ -0,0 +1,291 @@
+"""
+Background Ingestion Jobs for Trivya Platform
+
+This module runs document ingestion off the request path. Jobs wait in a
+bounded queue and are processed batch by batch by a small pool of worker
+threads, so callers get a job ID immediately and poll it for progress,
+errors and throughput while memory stays bounded by the queue size.
+"""
+
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable
+
+
+class IngestionJobError(Exception):
+    """Custom exception for ingestion job errors"""
+    pass
+
+
+class JobQueueFullError(IngestionJobError):
+    """Raised when a job cannot be queued because the queue is full"""
+    pass
+
+
+class IngestionJob:
+    """State of one ingestion job, guarded by the owning queue's lock."""
+
+    def __init__(self, job_id: str, documents: List[Dict[str, Any]], validate: bool):
+        self.job_id = job_id
+        self.documents = documents
+        self.validate = validate
+        self.status = "queued"
+        self.total = len(documents)
+        self.processed = 0
+        self.successful = 0
+        self.failed = 0
+        self.document_ids: List[str] = []
+        self.errors: List[Dict[str, Any]] = []
+        self.cancel_requested = False
+        self.created_at = datetime.now().isoformat()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Snapshot of the job for polling clients."""
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "successful": self.successful,
+            "failed": self.failed,
+            "progress": self.processed / self.total if self.total else 1.0,
+            "document_ids": list(self.document_ids),
+            "errors": list(self.errors),
+            "created_at": self.created_at,
+            "elapsed_seconds": elapsed,
+            "documents_per_second": self.processed / elapsed if elapsed > 0 else 0.0
+        }
+
+
+class IngestionJobQueue:
+    """
+    Bounded job queue drained by worker threads.
+
+    Each job is split into batches handed to ``ingest_batch`` (normally
+    KnowledgeBaseManager.ingest_documents); a failing batch is recorded and
+    the remaining batches still run. Workers start on the first submission.
+    """
+
+    # Seconds an idle worker waits for a job before checking for shutdown
+    IDLE_POLL_INTERVAL = 0.5
+
+    def __init__(
+        self,
+        ingest_batch: Callable[[List[Dict[str, Any]], bool], Dict[str, Any]],
+        max_queued: int = 16,
+        workers: int = 2,
+        batch_size: int = 100,
+        max_finished: int = 1000,
+        logger: Optional[Any] = None
+    ):
+        """
+        Initialize the job queue.
+
+        Args:
+            ingest_batch: Callable ingesting one batch, returning a summary
+                with 'successful', 'failed' and 'document_ids'
+            max_queued: Maximum number of jobs waiting to run
+            workers: Number of worker threads
+            batch_size: Documents per ingest_batch call
+            max_finished: Finished jobs kept for polling before the oldest
+                are forgotten
+            logger: Optional logger
+        """
+        self.ingest_batch = ingest_batch
+        self.max_queued = max_queued
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_finished = max_finished
+        self.logger = logger
+        self._queue: "queue.Queue[Optional[IngestionJob]]" = queue.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+
+    def submit(
+        self,
+        documents: List[Dict[str, Any]],
+        validate: bool = True,
+        block: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Queue documents for background ingestion.
+
+        Args:
+            documents: Documents to ingest
+            validate: Whether to validate documents before ingestion
+            block: Wait for queue space instead of rejecting immediately
+            timeout: Maximum wait when blocking (None waits indefinitely)
+
+        Returns:
+            Job ID to poll with get()
+
+        Raises:
+            JobQueueFullError: If the queue is full (after the timeout when blocking)
+            IngestionJobError: If the queue has been shut down
+        """
+        if self._closed:
+            raise IngestionJobError("Ingestion job queue is shut down")
+        self._ensure_workers()
+
+        job = IngestionJob(str(uuid.uuid4()), list(documents), validate)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        try:
+            self._queue.put(job, block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise JobQueueFullError(f"Ingestion queue is full ({self.max_queued} jobs waiting)")
+        return job.job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, or None if it is unknown or forgotten."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Request cancellation of a job.
+
+        A queued job never starts; a running job stops after its current batch.
+
+        Returns:
+            True if the job exists and had not finished yet
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ("queued", "running"):
+                return False
+            job.cancel_requested = True
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counts of jobs by status plus the current queue depth."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"queue_depth": self._queue.qsize(), "max_queued": self.max_queued, "jobs": counts}
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting jobs; workers exit once the queued jobs are done.
+
+        Never blocks on a full queue: wake-up sentinels are only added where
+        there is room, and workers that get none exit when they find the
+        queue empty after shutdown.
+
+        Args:
+            wait: Block until the workers have exited
+        """
+        self._closed = True
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                break
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        self._threads = []
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(max(1, self.workers)):
+                thread = threading.Thread(
+                    target=self._work,
+                    name=f"kb-ingest-job-{index + 1}",
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self._queue.get(timeout=self.IDLE_POLL_INTERVAL)
+            except queue.Empty:
+                if self._closed:
+                    return
+                continue
+            if job is None:
+                return
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: IngestionJob) -> None:
+        with self._lock:
+            if job.cancel_requested:
+                job.status = "cancelled"
+                job.documents = []
+                self._forget_finished()
+                return
+            job.status = "running"
+            job.started_at = time.monotonic()
+
+        for offset in range(0, job.total, max(1, self.batch_size)):
+            if job.cancel_requested:
+                break
+            batch = job.documents[offset:offset + max(1, self.batch_size)]
+            try:
+                result = self.ingest_batch(batch, job.validate)
+                with self._lock:
+                    job.successful += result.get("successful", 0)
+                    job.failed += result.get("failed", 0)
+                    job.document_ids.extend(result.get("document_ids", []))
+            except Exception as e:
+                with self._lock:
+                    job.failed += len(batch)
+                    job.errors.append({"offset": offset, "count": len(batch), "error": str(e)})
+                if self.logger:
+                    self.logger.error(f"Ingestion job {job.job_id} batch at {offset} failed: {str(e)}")
+            with self._lock:
+                job.processed = min(job.total, offset + len(batch))
+
+        with self._lock:
+            job.finished_at = time.monotonic()
+            if job.cancel_requested:
+                job.status = "cancelled"
+            elif job.errors and not job.successful:
+                job.status = "failed"
+            else:
+                job.status = "completed"
+            # Documents are no longer needed; only the outcome is kept
+            job.documents = []
+            self._forget_finished()
+
+        if self.logger:
+            self.logger.info(
+                "Ingestion job finished",
+                extra={
+                    "job_id": job.job_id,
+                    "status": job.status,
+                    "successful": job.successful,
+                    "failed": job.failed
+                }
+            )
+
+    def _forget_finished(self) -> None:
+        """Drop the oldest finished jobs beyond max_finished (lock held)."""
+        finished = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in ("completed", "failed", "cancelled")
+        ]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,164 @@
+"""
+Ingestion Journal for Trivya Platform
+
+This module implements the write-ahead journal behind resumable bulk
+ingestion. Before a batch is written to the vector store its offset and
+document hashes are appended as an intent record; once the write succeeds a
+commit record follows. Records are flushed and fsynced one by one, so after
+a crash the journal tells exactly which batches are durable and which one
+may have been half-written.
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+
+class JournalError(Exception):
+    """Custom exception for ingestion journal errors"""
+    pass
+
+
+def document_hash(document: Dict[str, Any]) -> str:
+    """Short stable hash of a raw document (content and metadata)."""
+    payload = json.dumps(document, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _batch_digest(hashes: List[str]) -> str:
+    """Digest of a batch's document hashes, kept in memory instead of the list."""
+    return hashlib.sha256(",".join(hashes).encode("ascii")).hexdigest()
+
+
+class IngestJournal:
+    """
+    Append-only JSONL journal of one bulk ingestion run.
+
+    Record types are ``begin`` (run ID and batch size), ``intent`` and
+    ``commit`` (batch offset and document hashes) and ``complete``. A torn
+    final line left by a crash is ignored when the journal is replayed.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open (or prepare to create) a journal.
+
+        Args:
+            path: Journal file path
+
+        Raises:
+            JournalError: If an existing journal is corrupt
+        """
+        self.path = Path(path)
+        self.run_id: Optional[str] = None
+        self.batch_size: Optional[int] = None
+        self.committed: Dict[int, str] = {}
+        self.pending: Dict[int, str] = {}
+        self.completed = False
+        self._handle = None
+        self._truncate_to: Optional[int] = None
+        self._replay()
+
+    @property
+    def resumed(self) -> bool:
+        """True if this journal continues an earlier run."""
+        return self.run_id is not None
+
+    def begin(self, batch_size: int) -> str:
+        """
+        Start a new run unless one is being resumed.
+
+        Args:
+            batch_size: Batch size of a new run (a resumed run keeps its own)
+
+        Returns:
+            The run ID
+        """
+        if self.run_id is None:
+            self.run_id = uuid.uuid4().hex
+            self.batch_size = batch_size
+            self._append({"type": "begin", "run_id": self.run_id, "batch_size": batch_size})
+        return self.run_id
+
+    def check_batch(self, offset: int, hashes: List[str]) -> bool:
+        """
+        Whether a batch was already committed.
+
+        Raises:
+            JournalError: If the batch at this offset was journaled with
+                different documents, i.e. the input changed since the crash
+        """
+        journaled = self.committed.get(offset, self.pending.get(offset))
+        if journaled is not None and journaled != _batch_digest(hashes):
+            raise JournalError(
+                f"Input differs from journal {self.path} at offset {offset}; "
+                "remove the journal to ingest this input from scratch"
+            )
+        return offset in self.committed
+
+    def record_intent(self, offset: int, hashes: List[str]) -> None:
+        """Journal a batch about to be written."""
+        self.pending[offset] = _batch_digest(hashes)
+        self._append({"type": "intent", "offset": offset, "hashes": hashes})
+
+    def record_commit(self, offset: int, hashes: List[str]) -> None:
+        """Journal a batch that is durably written."""
+        self.pending.pop(offset, None)
+        self.committed[offset] = _batch_digest(hashes)
+        self._append({"type": "commit", "offset": offset, "hashes": hashes})
+
+    def complete(self) -> None:
+        """Mark the run as finished."""
+        self.completed = True
+        self._append({"type": "complete"})
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _replay(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            lines = f.readlines()
+        valid_length = 0
+        for number, raw in enumerate(lines, 1):
+            if not raw.endswith(b"\n"):
+                # Torn write from a crash; the record it held is not durable
+                self._truncate_to = valid_length
+                break
+            try:
+                record = json.loads(raw) if raw.strip() else None
+            except ValueError:
+                raise JournalError(f"Corrupt journal {self.path} at line {number}")
+            valid_length += len(raw)
+            if record is None:
+                continue
+            kind = record.get("type")
+            if kind == "begin":
+                self.run_id = record["run_id"]
+                self.batch_size = record.get("batch_size")
+            elif kind == "intent":
+                self.pending[record["offset"]] = _batch_digest(record["hashes"])
+            elif kind == "commit":
+                self.pending.pop(record["offset"], None)
+                self.committed[record["offset"]] = _batch_digest(record["hashes"])
+            elif kind == "complete":
+                self.completed = True
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self._handle is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(self.path, "a", encoding="utf-8")
+            if self._truncate_to is not None:
+                # Drop the torn final line so the next record starts cleanly
+                self._handle.truncate(self._truncate_to)
+                self._truncate_to = None
+        self._handle.write(json.dumps(record) + "\n")
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
@@ -5,8 +5,17 @@ This module provides high-level orchestration for document ingestion,
 updates, and retrieval across the knowledge base system.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Iterator, Iterable
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from datetime import datetime
+import asyncio
+import hashlib
+import itertools
+import json
+import threading
+import time
+import uuid
 from pathlib import Path
 import sys
 import os
@@ -18,6 +27,60 @@ from shared.core_functions.config import Config
 from shared.core_functions.logger import get_logger
 from shared.knowledge_base.vector_store import VectorStore
 from shared.knowledge_base.rag_pipeline import RAGPipeline
+from shared.knowledge_base.compression import (
+    SENTENCE_OFFSETS_KEY,
+    split_sentences,
+    encode_offsets
+)
+from shared.knowledge_base.dedup import SIMHASH_KEY, simhash, encode_simhash
+from shared.knowledge_base.snippets import (
+    SNIPPET_LENGTH_KEY,
+    DEFAULT_SNIPPET_MAX_CHARS,
+    normalize_content,
+    snippet_length
+)
+from shared.knowledge_base.analytics import QueryAnalytics
+from shared.knowledge_base.chunking import (
+    CHUNK_HASH_KEY,
+    CHUNK_INDEX_KEY,
+    CHUNK_METADATA_KEYS,
+    ChunkStore,
+    ContentDefinedChunker,
+    chunk_hash,
+    chunk_reference,
+    shared_chunk_id,
+    split_chunk_reference
+)
+from shared.knowledge_base.expiry import EXPIRES_AT_KEY, ExpirySchedule, parse_expiry
+from shared.knowledge_base.jobs import IngestionJobQueue
+from shared.knowledge_base.journal import IngestJournal, JournalError, document_hash
+from shared.knowledge_base.language import LANGUAGE_KEY, LanguageRouter
+from shared.knowledge_base.loaders import (
+    DEFAULT_PATTERNS,
+    DEFAULT_MMAP_THRESHOLD,
+    DocumentParseError,
+    is_metadata_value,
+    parse_file,
+    parse_jsonl_line
+)
+
+
+# Default manifest file name, kept inside the synced directory
+MANIFEST_FILENAME = ".kb_manifest.json"
+
+MANIFEST_VERSION = 1
+
+# Metadata computed by prepare_document; left out of exports since an
+# import recomputes it
+DERIVED_METADATA_KEYS = (SNIPPET_LENGTH_KEY, SENTENCE_OFFSETS_KEY, SIMHASH_KEY)
+
+# Representative support questions used when no warm-up queries are configured
+DEFAULT_WARM_UP_QUERIES = (
+    "How do I reset my password?",
+    "What are your business hours?",
+    "How can I contact support?",
+    "What is your refund policy?",
+)
 
 
 class KnowledgeBaseError(Exception):
@@ -38,7 +101,20 @@ class KnowledgeBaseManager:
         config: Config,
         vector_store: VectorStore,
         rag_pipeline: RAGPipeline,
-        logger: Optional[Any] = None
+        logger: Optional[Any] = None,
+        snippet_max_chars: int = DEFAULT_SNIPPET_MAX_CHARS,
+        job_workers: int = 2,
+        job_queue_size: int = 16,
+        job_batch_size: int = 100,
+        warm_up_queries: Optional[List[str]] = None,
+        analytics_top_k: int = 50,
+        health_cache_ttl: float = 10.0,
+        health_timeout: float = 2.0,
+        health_query: str = "health check",
+        expiry_purge_interval: float = 60.0,
+        expiry_batch_size: int = 100,
+        chunker: Optional[ContentDefinedChunker] = None,
+        language_router: Optional[LanguageRouter] = None
     ):
         """
         Initialize the Knowledge Base Manager.
@@ -48,6 +124,25 @@ class KnowledgeBaseManager:
             vector_store: VectorStore instance
             rag_pipeline: RAGPipeline instance
             logger: Optional Logger instance
+            snippet_max_chars: Maximum length of the prompt snippet stored
+                for each document at ingest
+            job_workers: Worker threads for background ingestion jobs
+            job_queue_size: Maximum number of ingestion jobs waiting to run
+            job_batch_size: Documents per batch within an ingestion job
+            warm_up_queries: Queries run by warm_up (defaults to
+                DEFAULT_WARM_UP_QUERIES)
+            analytics_top_k: Number of top queries tracked by query analytics
+            health_cache_ttl: Seconds a deep health check result is reused
+            health_timeout: Timeout in seconds of the health test query
+            health_query: Query text used by the deep health check
+            expiry_purge_interval: Maximum seconds between background purges
+                of expired documents
+            expiry_batch_size: Expired documents deleted per vector store call
+            chunker: Optional ContentDefinedChunker; documents are then stored
+                as content-defined chunks, and chunks already in the
+                collection are referenced instead of embedded again
+            language_router: Optional LanguageRouter; documents and queries
+                are then routed to the collection of their detected language
             
         Raises:
             KnowledgeBaseError: If initialization fails
@@ -56,6 +151,40 @@ class KnowledgeBaseManager:
         self.vector_store = vector_store
         self.rag_pipeline = rag_pipeline
         self.logger = logger or get_logger(config).get_logger("KnowledgeBaseManager")
+        self.snippet_max_chars = snippet_max_chars
+        self._stats_lock = threading.Lock()
+        self.warm_up_queries = list(warm_up_queries or DEFAULT_WARM_UP_QUERIES)
+        self.ready = False
+        self._closed = False
+        self.last_warm_up: Optional[Dict[str, Any]] = None
+        self.analytics = QueryAnalytics(k=analytics_top_k)
+        self._rebuild_lock = threading.Lock()
+        self.rebuild_status: Optional[Dict[str, Any]] = None
+        self.health_cache_ttl = health_cache_ttl
+        self.health_timeout = health_timeout
+        self.health_query = health_query
+        self._health_lock = threading.Lock()
+        self._health_executor: Optional[ThreadPoolExecutor] = None
+        self._health_probe = None
+        self._last_health: Optional[Dict[str, Any]] = None
+        self._last_health_at = 0.0
+        self._started_at = time.monotonic()
+        self.expiry = ExpirySchedule()
+        self.expiry_purge_interval = expiry_purge_interval
+        self.expiry_batch_size = expiry_batch_size
+        self._purge_thread: Optional[threading.Thread] = None
+        self._purge_stop = threading.Event()
+        self.chunker = chunker
+        self.chunk_store = ChunkStore(vector_store) if chunker is not None else None
+        self.language_router = language_router
+        self._language_chunk_stores: Dict[str, ChunkStore] = {}
+        self.jobs = IngestionJobQueue(
+            self.ingest_documents,
+            max_queued=job_queue_size,
+            workers=job_workers,
+            batch_size=job_batch_size,
+            logger=self.logger
+        )
         
         # Track statistics
         self.stats = {
@@ -63,7 +192,8 @@ class KnowledgeBaseManager:
             "last_update": None,
             "total_queries": 0,
             "successful_ingestions": 0,
-            "failed_ingestions": 0
+            "failed_ingestions": 0,
+            "expired_documents": 0
         }
         
         self.logger.info("Knowledge Base Manager initialized")
@@ -96,8 +226,47 @@ class KnowledgeBaseManager:
             self.logger.warning("Document 'metadata' must be a dictionary")
             return False
         
+        for key, value in (document.get('metadata') or {}).items():
+            if not is_metadata_value(value):
+                self.logger.warning(f"Document metadata '{key}' has an unsupported value type")
+                return False
+        
+        expires_at = (document.get('metadata') or {}).get(EXPIRES_AT_KEY)
+        if expires_at is not None:
+            try:
+                parse_expiry(expires_at)
+            except ValueError as e:
+                self.logger.warning(str(e))
+                return False
+        
         return True
     
+    def prepare_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the stored form of a validated document.
+        
+        Normalizes the content (whitespace collapsed, boilerplate stripped)
+        and computes ingest-time metadata: the prompt snippet length, sentence
+        offsets for context compression and a SimHash signature for
+        near-duplicate suppression. An expires_at value is normalized to
+        epoch seconds. The caller's dict is not mutated.
+        
+        Args:
+            document: Document dictionary with 'content' and optional 'metadata'
+            
+        Returns:
+            New document dictionary ready for the vector store
+        """
+        content = normalize_content(document["content"])
+        metadata = dict(document.get("metadata") or {})
+        metadata[SNIPPET_LENGTH_KEY] = snippet_length(content, self.snippet_max_chars)
+        metadata[SENTENCE_OFFSETS_KEY] = encode_offsets(split_sentences(content))
+        metadata[SIMHASH_KEY] = encode_simhash(simhash(content))
+        if metadata.get(EXPIRES_AT_KEY) is not None:
+            metadata[EXPIRES_AT_KEY] = parse_expiry(metadata[EXPIRES_AT_KEY])
+        
+        return {"content": content, "metadata": metadata}
+    
     def ingest_documents(
         self,
         documents: List[Dict[str, Any]],
@@ -143,14 +312,8 @@ class KnowledgeBaseManager:
             # Ingest valid documents
             document_ids = []
             if valid_documents:
-                try:
-                    document_ids = self.vector_store.add_documents(valid_documents)
-                    self.stats["successful_ingestions"] += len(document_ids)
-                    self.stats["total_documents"] += len(document_ids)
-                except Exception as e:
-                    self.logger.error(f"Failed to add documents to vector store: {str(e)}")
-                    self.stats["failed_ingestions"] += len(valid_documents)
-                    raise
+                prepared = [self.prepare_document(doc) for doc in valid_documents]
+                document_ids = self._store_documents(prepared)
             
             # Update statistics
             self.stats["last_update"] = datetime.now().isoformat()
@@ -159,7 +322,7 @@ class KnowledgeBaseManager:
             summary = {
                 "success": True,
                 "total": len(documents),
-                "successful": len(document_ids),
+                "successful": len(valid_documents),
                 "failed": invalid_count,
                 "document_ids": document_ids,
                 "timestamp": self.stats["last_update"]
@@ -169,7 +332,7 @@ class KnowledgeBaseManager:
                 f"Document ingestion completed",
                 extra={
                     "total": len(documents),
-                    "successful": len(document_ids),
+                    "successful": len(valid_documents),
                     "failed": invalid_count
                 }
             )
@@ -181,6 +344,882 @@ class KnowledgeBaseManager:
             self.logger.error(error_msg, exc_info=True)
             raise KnowledgeBaseError(error_msg) from e
 
+    def _store_documents(
+        self,
+        prepared: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        grouped: bool = False
+    ) -> List[Any]:
+        """
+        Write prepared documents to the vector store and update statistics.
+        
+        With a chunker configured the documents are stored as chunks under
+        content-derived IDs; the given ids then name the documents in the
+        chunk references, so storing the same documents again adds no
+        references.
+        
+        Returns:
+            Stored IDs (chunk references when chunking), or with
+            grouped=True one list of IDs per document
+        """
+        try:
+            if self.language_router is not None:
+                grouped_ids = self._store_by_language(prepared, ids)
+            else:
+                grouped_ids = self._write_documents(prepared, ids, self.vector_store, self.chunk_store)
+        except Exception as e:
+            self.logger.error(f"Failed to add documents to vector store: {str(e)}")
+            with self._stats_lock:
+                self.stats["failed_ingestions"] += len(prepared)
+            raise
+        # Background jobs store from several threads at once
+        with self._stats_lock:
+            self.stats["successful_ingestions"] += len(grouped_ids)
+            self.stats["total_documents"] += len(grouped_ids)
+        self.expiry.restore(self._expiring(prepared, grouped_ids))
+        if grouped:
+            return grouped_ids
+        return [doc_id for doc_ids in grouped_ids for doc_id in doc_ids]
+    
+    def _write_documents(
+        self,
+        prepared: List[Dict[str, Any]],
+        ids: Optional[List[str]],
+        vector_store: Any,
+        chunk_store: Optional[ChunkStore]
+    ) -> List[List[str]]:
+        """Write prepared documents to one collection; returns stored IDs per document."""
+        if chunk_store is not None:
+            return self._store_chunks(prepared, chunk_store, ids)
+        if ids is None:
+            return [[doc_id] for doc_id in vector_store.add_documents(prepared)]
+        return [[doc_id] for doc_id in vector_store.add_documents(prepared, ids=ids)]
+    
+    def _store_by_language(
+        self,
+        prepared: List[Dict[str, Any]],
+        ids: Optional[List[str]]
+    ) -> List[List[str]]:
+        """Write each document to the collection of its language, keeping input order."""
+        by_language: Dict[str, List[int]] = {}
+        for position, document in enumerate(prepared):
+            language = self.language_router.language_of(document)
+            document["metadata"][LANGUAGE_KEY] = language
+            by_language.setdefault(language, []).append(position)
+        
+        grouped_ids: List[List[str]] = [[] for _ in prepared]
+        for language, positions in by_language.items():
+            vector_store, chunk_store = self._language_store(language)
+            stored = self._write_documents(
+                [prepared[position] for position in positions],
+                [ids[position] for position in positions] if ids is not None else None,
+                vector_store,
+                chunk_store
+            )
+            for position, doc_ids in zip(positions, stored):
+                grouped_ids[position] = doc_ids
+        return grouped_ids
+    
+    def _language_store(self, language: str) -> tuple:
+        """(vector store, chunk store) of a language's collection."""
+        vector_store = self.language_router.store_for(language)
+        if self.chunker is None:
+            return vector_store, None
+        if vector_store is self.vector_store:
+            return vector_store, self.chunk_store
+        with self._stats_lock:
+            chunk_store = self._language_chunk_stores.get(language)
+            if chunk_store is None:
+                chunk_store = self._language_chunk_stores[language] = ChunkStore(vector_store)
+        return vector_store, chunk_store
+    
+    def _collections(self) -> List[tuple]:
+        """(vector store, chunk store) of every collection the manager writes to."""
+        if self.language_router is None:
+            return [(self.vector_store, self.chunk_store)]
+        return [self._language_store(language) for language in self.language_router.languages]
+    
+    def _store_chunks(
+        self,
+        prepared: List[Dict[str, Any]],
+        chunk_store: ChunkStore,
+        ids: Optional[List[str]] = None
+    ) -> List[List[str]]:
+        """Split prepared documents into chunks and store them; returns chunk references per document."""
+        grouped_ids, references, chunks = [], [], []
+        for position, document in enumerate(prepared):
+            owner = ids[position] if ids is not None else uuid.uuid4().hex
+            metadata = {
+                key: value for key, value in document["metadata"].items()
+                if key not in DERIVED_METADATA_KEYS
+            }
+            # Expiring documents keep private chunks so a purge never removes shared content
+            private = metadata.get(EXPIRES_AT_KEY) is not None
+            document_ids = []
+            for index, text in enumerate(self.chunker.split(document["content"])):
+                chunk = self.prepare_document({"content": text, "metadata": {**metadata, CHUNK_INDEX_KEY: index}})
+                if not chunk["content"]:
+                    continue
+                digest = chunk_hash(chunk["content"])
+                chunk["metadata"][CHUNK_HASH_KEY] = digest
+                chunk_id = shared_chunk_id(digest)
+                if self.language_router is not None:
+                    # Deletes reach every language collection, so IDs must not repeat across them
+                    chunk_id = f"{chunk_id}-{metadata[LANGUAGE_KEY]}"
+                if private:
+                    chunk_id = f"{chunk_id}-{hashlib.sha256(owner.encode('utf-8')).hexdigest()[:12]}"
+                reference = chunk_reference(chunk_id, owner)
+                document_ids.append(reference)
+                references.append(reference)
+                chunks.append(chunk)
+            grouped_ids.append(document_ids)
+        if references:
+            chunk_store.store(references, chunks)
+        return grouped_ids
+    
+    def _delete_stored(self, ids: List[str]) -> None:
+        """Delete stored records, releasing chunk references when chunking."""
+        # IDs are unique across collections, and absent IDs are ignored
+        for vector_store, chunk_store in self._collections():
+            if chunk_store is not None:
+                chunk_store.release(ids)
+            else:
+                vector_store.delete_documents(ids)
+    
+    @staticmethod
+    def _expiring(prepared: List[Dict[str, Any]], grouped_ids: List[List[str]]) -> List[tuple]:
+        """(expires_at, ID) pairs of stored records of documents that carry an expiry."""
+        return [
+            (doc["metadata"][EXPIRES_AT_KEY], doc_id)
+            for doc, doc_ids in zip(prepared, grouped_ids)
+            if doc["metadata"].get(EXPIRES_AT_KEY) is not None
+            for doc_id in doc_ids
+        ]
+    
+    def bulk_ingest(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        journal_path: str,
+        batch_size: int = 500,
+        validate: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Crash-resumable ingestion of a large document stream.
+        
+        Every batch is recorded in a write-ahead journal: an intent record
+        with its offset and document hashes before the vector store write and
+        a commit record after it. Documents get IDs derived from the run and
+        their position and are upserted. Calling bulk_ingest again with the
+        same input and journal after a crash skips committed batches without
+        re-embedding them, and rewriting the one batch that may have been
+        half-written cannot duplicate it.
+        
+        Args:
+            documents: Documents in a stable order (list or iterator)
+            journal_path: Journal file; reuse it to resume an interrupted run
+            batch_size: Documents per vector store write (a resumed run keeps
+                the batch size it was started with)
+            validate: Whether to validate documents before ingestion
+            
+        Returns:
+            Ingestion summary including skipped batches and throughput
+            
+        Raises:
+            KnowledgeBaseError: If a batch cannot be written (the run can be
+                resumed) or the input no longer matches the journal
+        """
+        start = time.perf_counter()
+        total = successful = invalid = skipped_batches = skipped_documents = 0
+        try:
+            journal = IngestJournal(journal_path)
+        except (JournalError, OSError) as e:
+            raise KnowledgeBaseError(f"Cannot open ingestion journal: {str(e)}") from e
+        
+        resumed = journal.resumed
+        try:
+            run_id = journal.begin(batch_size)
+            batch_size = journal.batch_size or batch_size
+            iterator = iter(documents)
+            offset = 0
+            while True:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                total += len(batch)
+                hashes = [document_hash(doc) for doc in batch]
+                if journal.check_batch(offset, hashes):
+                    skipped_batches += 1
+                    skipped_documents += len(batch)
+                    offset += len(batch)
+                    continue
+                
+                prepared, ids = [], []
+                for position, doc in enumerate(batch, offset):
+                    if validate and not self.validate_document(doc):
+                        invalid += 1
+                        continue
+                    prepared.append(self.prepare_document(doc))
+                    ids.append(f"{run_id}-{position}")
+                
+                journal.record_intent(offset, hashes)
+                if prepared:
+                    self._store_documents(prepared, ids=ids)
+                journal.record_commit(offset, hashes)
+                successful += len(prepared)
+                offset += len(batch)
+            
+            if not journal.completed:
+                journal.complete()
+        except JournalError as e:
+            raise KnowledgeBaseError(str(e)) from e
+        except Exception as e:
+            error_msg = f"Bulk ingestion stopped at document {total}: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            raise KnowledgeBaseError(error_msg) from e
+        finally:
+            journal.close()
+        
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats["failed_ingestions"] += invalid
+        self.stats["last_update"] = datetime.now().isoformat()
+        
+        summary = {
+            "success": True,
+            "run_id": run_id,
+            "resumed": resumed,
+            "total": total,
+            "successful": successful,
+            "failed": invalid,
+            "skipped_batches": skipped_batches,
+            "skipped_documents": skipped_documents,
+            "throughput": {
+                "elapsed_seconds": elapsed,
+                "documents_per_second": successful / elapsed if elapsed > 0 else 0.0
+            },
+            "timestamp": self.stats["last_update"]
+        }
+        
+        self.logger.info(
+            "Bulk ingestion completed",
+            extra={
+                "run_id": run_id,
+                "resumed": resumed,
+                "successful": successful,
+                "failed": invalid,
+                "skipped_batches": skipped_batches,
+                "elapsed_seconds": round(elapsed, 3)
+            }
+        )
+        
+        return summary
+    
+    def ingest_jsonl(
+        self,
+        path_or_stream: Any,
+        batch_size: int = 500,
+        journal_path: Optional[str] = None,
+        max_errors: int = 1000
+    ) -> Dict[str, Any]:
+        """
+        Stream a JSONL/NDJSON export into the knowledge base.
+        
+        The input is read line by line and written in batches, so memory
+        use depends on the batch size, not the file size. Each line is a
+        JSON object with 'content' and optional 'metadata'; lines that fail
+        to parse or validate are reported with their line number and skipped.
+        
+        Args:
+            path_or_stream: File path, or an open text or binary stream
+            batch_size: Documents per vector store write
+            journal_path: Optional journal making the import resumable
+                (see bulk_ingest)
+            max_errors: Maximum number of line errors kept in the summary
+                (all are counted)
+            
+        Returns:
+            Ingestion summary with per-line errors and throughput
+            
+        Raises:
+            KnowledgeBaseError: If the input cannot be opened or a batch
+                cannot be written
+        """
+        start = time.perf_counter()
+        report = {"lines": 0, "invalid": 0, "errors": []}
+        
+        def _record_error(line_number: int, error: str) -> None:
+            report["invalid"] += 1
+            if len(report["errors"]) < max_errors:
+                report["errors"].append({"line": line_number, "error": error})
+        
+        def _documents(stream) -> Iterator[Dict[str, Any]]:
+            for line_number, line in enumerate(stream, 1):
+                report["lines"] = line_number
+                try:
+                    if isinstance(line, bytes):
+                        line = line.decode("utf-8")
+                    document = parse_jsonl_line(line)
+                except (DocumentParseError, UnicodeDecodeError) as e:
+                    _record_error(line_number, str(e))
+                    continue
+                if document is None:
+                    continue
+                if not self.validate_document(document):
+                    _record_error(line_number, "Document failed validation")
+                    continue
+                document["metadata"]["line"] = line_number
+                yield document
+        
+        if isinstance(path_or_stream, (str, Path)):
+            try:
+                stream = open(path_or_stream, "r", encoding="utf-8-sig")
+            except OSError as e:
+                raise KnowledgeBaseError(f"Cannot open JSONL input: {str(e)}") from e
+            source = Path(path_or_stream).name
+        else:
+            stream = path_or_stream
+            source = None
+        
+        successful = 0
+        try:
+            documents = _documents(stream)
+            if source:
+                documents = (
+                    {**doc, "metadata": {"source": source, **doc["metadata"]}}
+                    for doc in documents
+                )
+            if journal_path:
+                successful = self.bulk_ingest(
+                    documents,
+                    journal_path,
+                    batch_size=batch_size,
+                    validate=False
+                )["successful"]
+            else:
+                while True:
+                    batch = [
+                        self.prepare_document(doc)
+                        for doc in itertools.islice(documents, batch_size)
+                    ]
+                    if not batch:
+                        break
+                    try:
+                        self._store_documents(batch)
+                    except Exception as e:
+                        raise KnowledgeBaseError(
+                            f"JSONL ingestion failed at line {report['lines']}: {str(e)}"
+                        ) from e
+                    successful += len(batch)
+        finally:
+            if source:
+                stream.close()
+        
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats["failed_ingestions"] += report["invalid"]
+        self.stats["last_update"] = datetime.now().isoformat()
+        
+        summary = {
+            "success": True,
+            "lines": report["lines"],
+            "successful": successful,
+            "failed": report["invalid"],
+            "errors": report["errors"],
+            "throughput": {
+                "elapsed_seconds": elapsed,
+                "documents_per_second": successful / elapsed if elapsed > 0 else 0.0
+            },
+            "timestamp": self.stats["last_update"]
+        }
+        
+        self.logger.info(
+            "JSONL ingestion completed",
+            extra={
+                "lines": report["lines"],
+                "successful": successful,
+                "failed": report["invalid"],
+                "elapsed_seconds": round(elapsed, 3)
+            }
+        )
+        
+        return summary
+    
+    def export_jsonl(self, path_or_stream: Any, batch_size: int = 500) -> Dict[str, Any]:
+        """
+        Stream the collection out as JSONL that ingest_jsonl can re-import.
+        
+        With language routing every language collection is exported; the
+        routed language stays in the metadata, so a re-import puts each
+        document back in the same collection.
+        
+        The collection is read page by page, so memory use depends on the
+        batch size. Each line holds 'content' and 'metadata' without the
+        ingest-derived keys; IDs are not exported since an import assigns
+        new ones. With chunking, each stored chunk is one line, carrying the
+        metadata of the first document that stored it and no chunk
+        bookkeeping keys.
+        
+        Args:
+            path_or_stream: Output file path, or an open text stream
+            batch_size: Documents read per vector store request
+            
+        Returns:
+            Export summary with the document count and throughput
+            
+        Raises:
+            KnowledgeBaseError: If the output cannot be written or the
+                collection cannot be read
+        """
+        start = time.perf_counter()
+        exported = 0
+        if isinstance(path_or_stream, (str, Path)):
+            try:
+                stream = open(path_or_stream, "w", encoding="utf-8")
+            except OSError as e:
+                raise KnowledgeBaseError(f"Cannot open JSONL output: {str(e)}") from e
+        else:
+            stream = path_or_stream
+        
+        try:
+            for vector_store, _ in self._collections():
+                for page in vector_store.iter_documents(batch_size=batch_size):
+                    for document in page:
+                        metadata = {
+                            key: value for key, value in document["metadata"].items()
+                            if key not in DERIVED_METADATA_KEYS and key not in CHUNK_METADATA_KEYS
+                        }
+                        stream.write(json.dumps(
+                            {"content": document["content"], "metadata": metadata},
+                            ensure_ascii=False
+                        ) + "\n")
+                    exported += len(page)
+        except Exception as e:
+            raise KnowledgeBaseError(f"JSONL export failed after {exported} documents: {str(e)}") from e
+        finally:
+            if stream is not path_or_stream:
+                stream.close()
+        
+        elapsed = time.perf_counter() - start
+        self.logger.info(
+            "JSONL export completed",
+            extra={"documents": exported, "elapsed_seconds": round(elapsed, 3)}
+        )
+        return {
+            "success": True,
+            "documents": exported,
+            "throughput": {
+                "elapsed_seconds": elapsed,
+                "documents_per_second": exported / elapsed if elapsed > 0 else 0.0
+            }
+        }
+    
+    def submit_ingestion_job(
+        self,
+        documents: List[Dict[str, Any]],
+        validate: bool = True,
+        block: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Queue documents for ingestion in the background.
+        
+        Args:
+            documents: List of document dictionaries
+            validate: Whether to validate documents before ingestion
+            block: Wait for queue space instead of rejecting when full
+            timeout: Maximum wait in seconds when blocking
+            
+        Returns:
+            Job ID to poll with get_ingestion_job
+            
+        Raises:
+            KnowledgeBaseError: If the job queue is full or shut down
+        """
+        try:
+            job_id = self.jobs.submit(documents, validate=validate, block=block, timeout=timeout)
+        except Exception as e:
+            self.logger.warning(f"Ingestion job rejected: {str(e)}")
+            raise KnowledgeBaseError(f"Ingestion job rejected: {str(e)}") from e
+        
+        self.logger.info(
+            "Ingestion job queued",
+            extra={"job_id": job_id, "documents": len(documents)}
+        )
+        return job_id
+    
+    def get_ingestion_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress, errors and throughput of an ingestion job (None if unknown)."""
+        return self.jobs.get(job_id)
+    
+    def cancel_ingestion_job(self, job_id: str) -> bool:
+        """Cancel a queued job, or stop a running one after its current batch."""
+        return self.jobs.cancel(job_id)
+    
+    def ingest_directory(
+        self,
+        path: str,
+        patterns: Optional[List[str]] = None,
+        workers: int = 4,
+        batch_size: int = 100,
+        mmap_threshold: int = DEFAULT_MMAP_THRESHOLD
+    ) -> Dict[str, Any]:
+        """
+        Ingest every matching file below a directory.
+        
+        Files are read, parsed, validated and prepared on a thread pool while
+        the calling thread writes the results to the vector store in batches.
+        Parsing runs at most two files per worker ahead of the writer, so
+        memory stays bounded for large exports.
+        
+        Args:
+            path: Root directory of the export
+            patterns: Glob patterns matched recursively (defaults to
+                txt, md, html, csv and jsonl files)
+            workers: Number of parser threads
+            batch_size: Documents per vector store write
+            mmap_threshold: File size in bytes from which reads use mmap
+            
+        Returns:
+            Summary with per-file outcomes and a throughput figure
+            
+        Raises:
+            KnowledgeBaseError: If the directory does not exist
+        """
+        root = Path(path)
+        if not root.is_dir():
+            raise KnowledgeBaseError(f"Directory not found: {path}")
+        
+        start = time.perf_counter()
+        files = self._find_files(root, patterns or DEFAULT_PATTERNS)
+        outcomes, total_bytes = self._ingest_files(files, workers, batch_size, mmap_threshold)
+        
+        elapsed = time.perf_counter() - start
+        ingested = sum(len(outcome["document_ids"]) for outcome in outcomes.values())
+        failed_files = sum(1 for outcome in outcomes.values() if outcome["status"] == "failed")
+        self.stats["last_update"] = datetime.now().isoformat()
+        
+        summary = {
+            "success": failed_files == 0,
+            "files": len(files),
+            "failed_files": failed_files,
+            "documents": ingested,
+            "invalid": sum(outcome["invalid"] for outcome in outcomes.values()),
+            "bytes": total_bytes,
+            "outcomes": [outcomes[source] for source, _ in files],
+            "throughput": {
+                "elapsed_seconds": elapsed,
+                "files_per_second": len(files) / elapsed if elapsed > 0 else 0.0,
+                "documents_per_second": ingested / elapsed if elapsed > 0 else 0.0,
+                "mb_per_second": total_bytes / 1048576 / elapsed if elapsed > 0 else 0.0
+            },
+            "timestamp": self.stats["last_update"]
+        }
+        
+        self.logger.info(
+            "Directory ingestion completed",
+            extra={
+                "path": str(root),
+                "files": len(files),
+                "failed_files": failed_files,
+                "documents": ingested,
+                "elapsed_seconds": round(elapsed, 3)
+            }
+        )
+        
+        return summary
+    
+    def sync_directory(
+        self,
+        path: str,
+        patterns: Optional[List[str]] = None,
+        manifest_path: Optional[str] = None,
+        workers: int = 4,
+        batch_size: int = 100,
+        mmap_threshold: int = DEFAULT_MMAP_THRESHOLD
+    ) -> Dict[str, Any]:
+        """
+        Incrementally re-sync a directory against its manifest.
+        
+        The manifest records size, mtime, SHA-256 and document IDs for every
+        ingested file. Files whose size and mtime are unchanged are skipped
+        without being read; files that were only touched are recognised by
+        their hash. New and changed files are re-ingested, and chunks of
+        changed and removed files are deleted afterwards, so the cost of a
+        sync follows the change set rather than the corpus size. Deletes
+        that fail are kept in the manifest and retried on the next sync.
+        
+        Args:
+            path: Root directory of the source
+            patterns: Glob patterns matched recursively
+            manifest_path: Manifest file (defaults to .kb_manifest.json in path)
+            workers: Number of parser threads
+            batch_size: Documents per vector store write or delete
+            mmap_threshold: File size in bytes from which reads use mmap
+            
+        Returns:
+            Summary of added, updated, removed, unchanged and failed files
+            
+        Raises:
+            KnowledgeBaseError: If the directory does not exist or the
+                manifest cannot be read or written
+        """
+        root = Path(path)
+        if not root.is_dir():
+            raise KnowledgeBaseError(f"Directory not found: {path}")
+        
+        start = time.perf_counter()
+        manifest_file = Path(manifest_path) if manifest_path else root / MANIFEST_FILENAME
+        manifest = self._load_manifest(manifest_file)
+        entries = manifest["files"]
+        files = self._find_files(root, patterns or DEFAULT_PATTERNS)
+        
+        changed = []
+        fingerprints = {}
+        unchanged = 0
+        for source, file_path in files:
+            stat = file_path.stat()
+            entry = entries.get(source)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                unchanged += 1
+                continue
+            digest = self._file_digest(file_path)
+            if entry and entry["sha256"] == digest:
+                entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                unchanged += 1
+                continue
+            fingerprints[source] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest
+            }
+            changed.append((source, file_path))
+        
+        present = {source for source, _ in files}
+        removed = sorted(source for source in entries if source not in present)
+        
+        outcomes, total_bytes = self._ingest_files(changed, workers, batch_size, mmap_threshold)
+        
+        stale_ids = list(manifest["pending_deletes"])
+        added, updated, failed = [], [], []
+        for source, _ in changed:
+            outcome = outcomes[source]
+            if outcome["status"] == "failed":
+                # Keep the previous version; drop whatever part of this one landed
+                stale_ids.extend(outcome["document_ids"])
+                failed.append(outcome)
+                continue
+            previous = entries.get(source)
+            if previous:
+                stale_ids.extend(previous["document_ids"])
+                updated.append(source)
+            else:
+                added.append(source)
+            entries[source] = {**fingerprints[source], "document_ids": outcome["document_ids"]}
+        for source in removed:
+            stale_ids.extend(entries.pop(source)["document_ids"])
+        
+        deleted = 0
+        for offset in range(0, len(stale_ids), max(1, batch_size)):
+            chunk = stale_ids[offset:offset + max(1, batch_size)]
+            try:
+                self._delete_stored(chunk)
+            except Exception as e:
+                self.logger.error(f"Failed to delete stale documents: {str(e)}")
+                break
+            deleted += len(chunk)
+        manifest["pending_deletes"] = stale_ids[deleted:]
+        self.stats["total_documents"] = max(0, self.stats["total_documents"] - deleted)
+        
+        self._save_manifest(manifest_file, manifest)
+        
+        elapsed = time.perf_counter() - start
+        documents_added = sum(
+            len(outcomes[source]["document_ids"]) for source in added + updated
+        )
+        self.stats["last_update"] = datetime.now().isoformat()
+        
+        summary = {
+            "success": not failed and not manifest["pending_deletes"],
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "unchanged": unchanged,
+            "failed": failed,
+            "documents_added": documents_added,
+            "documents_deleted": deleted,
+            "pending_deletes": len(manifest["pending_deletes"]),
+            "bytes": total_bytes,
+            "throughput": {
+                "elapsed_seconds": elapsed,
+                "files_scanned": len(files),
+                "documents_per_second": documents_added / elapsed if elapsed > 0 else 0.0
+            },
+            "timestamp": self.stats["last_update"]
+        }
+        
+        self.logger.info(
+            "Directory sync completed",
+            extra={
+                "path": str(root),
+                "added": len(added),
+                "updated": len(updated),
+                "removed": len(removed),
+                "unchanged": unchanged,
+                "failed": len(failed),
+                "elapsed_seconds": round(elapsed, 3)
+            }
+        )
+        
+        return summary
+    
+    @staticmethod
+    def _file_digest(file_path: Path) -> str:
+        """SHA-256 of a file, read in chunks."""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _load_manifest(manifest_file: Path) -> Dict[str, Any]:
+        """Read a sync manifest, or start an empty one."""
+        if not manifest_file.exists():
+            return {"version": MANIFEST_VERSION, "files": {}, "pending_deletes": []}
+        try:
+            with open(manifest_file, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            raise KnowledgeBaseError(f"Unreadable sync manifest {manifest_file}: {str(e)}") from e
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise KnowledgeBaseError(f"Unsupported sync manifest version: {manifest.get('version')}")
+        manifest.setdefault("files", {})
+        manifest.setdefault("pending_deletes", [])
+        return manifest
+    
+    @staticmethod
+    def _save_manifest(manifest_file: Path, manifest: Dict[str, Any]) -> None:
+        """Write a sync manifest atomically."""
+        tmp_path = manifest_file.with_name(f"{manifest_file.name}.{os.getpid()}.tmp")
+        try:
+            manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+            # Atomic rename so a crash never leaves a truncated manifest
+            os.replace(tmp_path, manifest_file)
+        except OSError as e:
+            raise KnowledgeBaseError(f"Failed to write sync manifest {manifest_file}: {str(e)}") from e
+    
+    def _ingest_files(
+        self,
+        files: List[tuple],
+        workers: int,
+        batch_size: int,
+        mmap_threshold: int
+    ) -> tuple:
+        """
+        Parse files on a thread pool and write their documents in batches.
+        
+        Args:
+            files: (source, path) pairs as returned by _find_files
+            workers: Number of parser threads
+            batch_size: Documents per vector store write
+            mmap_threshold: File size in bytes from which reads use mmap
+            
+        Returns:
+            (outcomes keyed by source, total bytes read)
+        """
+        outcomes = {
+            source: {
+                "path": source,
+                "status": "pending",
+                "documents": 0,
+                "invalid": 0,
+                "document_ids": [],
+                "error": None
+            }
+            for source, _ in files
+        }
+        total_bytes = 0
+        batch: List[Dict[str, Any]] = []
+        owners: List[str] = []
+        
+        def _load(file_path: Path, source: str):
+            documents = parse_file(file_path, source=source, mmap_threshold=mmap_threshold)
+            valid = [self.prepare_document(doc) for doc in documents if self.validate_document(doc)]
+            return valid, len(documents) - len(valid)
+        
+        def _collect(future, source: str) -> None:
+            outcome = outcomes[source]
+            try:
+                documents, invalid = future.result()
+            except Exception as e:
+                outcome["error"] = str(e)
+                self.logger.warning(f"Failed to parse {source}: {str(e)}")
+                return
+            outcome["documents"] = len(documents)
+            outcome["invalid"] = invalid
+            self.stats["failed_ingestions"] += invalid
+            for document in documents:
+                batch.append(document)
+                owners.append(source)
+                if len(batch) >= batch_size:
+                    self._flush_directory_batch(batch, owners, outcomes)
+                    batch.clear()
+                    owners.clear()
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="kb-ingest") as executor:
+            pending = {}
+            for source, file_path in files:
+                total_bytes += file_path.stat().st_size
+                pending[executor.submit(_load, file_path, source)] = source
+                if len(pending) >= max(1, workers) * 2:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        _collect(future, pending.pop(future))
+            for future, source in pending.items():
+                _collect(future, source)
+        if batch:
+            self._flush_directory_batch(batch, owners, outcomes)
+        
+        for outcome in outcomes.values():
+            if outcome["error"]:
+                outcome["status"] = "failed"
+            elif outcome["document_ids"]:
+                outcome["status"] = "ingested"
+            else:
+                outcome["status"] = "empty"
+        
+        return outcomes, total_bytes
+    
+    def _flush_directory_batch(
+        self,
+        batch: List[Dict[str, Any]],
+        owners: List[str],
+        outcomes: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """Write one batch of directory documents and credit IDs to their files."""
+        try:
+            grouped_ids = self._store_documents(list(batch), grouped=True)
+        except Exception as e:
+            for source in set(owners):
+                outcomes[source]["error"] = f"Vector store write failed: {str(e)}"
+            return
+        for document_ids, source in zip(grouped_ids, owners):
+            outcomes[source]["document_ids"].extend(document_ids)
+    
+    @staticmethod
+    def _find_files(root: Path, patterns) -> List[tuple]:
+        """Matching files below root as sorted (relative source, path) pairs."""
+        found = {}
+        for pattern in patterns:
+            for file_path in root.rglob(pattern):
+                relative = file_path.relative_to(root)
+                if not file_path.is_file() or any(part.startswith(".") for part in relative.parts):
+                    continue
+                found[relative.as_posix()] = file_path
+        return sorted(found.items())
+    
     def add_document(
         self,
         file_path: str,
@@ -254,7 +1293,9 @@ class KnowledgeBaseManager:
         self,
         query: str,
         top_k: int = 5,
-        system_instruction: Optional[str] = None
+        system_instruction: Optional[str] = None,
+        session_id: Optional[str] = None,
+        customer_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Search the knowledge base and get RAG-formatted results.
@@ -263,9 +1304,13 @@ class KnowledgeBaseManager:
             query: Search query
             top_k: Number of results to return
             system_instruction: Optional system instruction for prompt
+            session_id: Optional chat session used for context prefetch
+            customer_id: Optional customer whose language routing decision
+                is cached and reused
             
         Returns:
-            RAG query results with prompt and context
+            RAG query results with prompt and context (and, with language
+            routing, the 'language' searched)
             
         Raises:
             KnowledgeBaseError: If search fails
@@ -273,13 +1318,19 @@ class KnowledgeBaseManager:
         try:
             # Update query statistics
             self.stats["total_queries"] += 1
+            self.analytics.record_query(query)
+            language, routing = self._route_query(query, customer_id)
             
             # Perform RAG query
             result = self.rag_pipeline.query(
                 user_query=query,
                 top_k=top_k,
-                system_instruction=system_instruction
+                system_instruction=system_instruction,
+                session_id=session_id,
+                **routing
             )
+            if language is not None:
+                result["language"] = language
             
             self.logger.info(
                 f"Knowledge base search completed",
@@ -300,25 +1351,564 @@ class KnowledgeBaseManager:
         self,
         query: str,
         top_k: int = 5,
-        system_instruction: Optional[str] = None
+        system_instruction: Optional[str] = None,
+        session_id: Optional[str] = None,
+        customer_id: Optional[str] = None
     ) -> str:
         """High-level helper that returns a textual response for the query."""
-        result = self.search(query, top_k=top_k, system_instruction=system_instruction)
-        context_docs = result.get("context", [])
+        result = self.search(
+            query,
+            top_k=top_k,
+            system_instruction=system_instruction,
+            session_id=session_id,
+            customer_id=customer_id
+        )
+        return "".join(self._answer_fragments(result.get("context", []), result.get("answer")))
+
+    async def query_stream(
+        self,
+        query: str,
+        top_k: int = 5,
+        system_instruction: Optional[str] = None,
+        llm_client: Optional[Any] = None,
+        tenant_id: str = "default",
+        session_id: Optional[str] = None,
+        customer_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of query() returning answer fragments.
+        
+        Without an LLM client the fragments are the same text query() returns,
+        starting with the header right after retrieval. With one, the answer
+        is generated and streamed through RAGPipeline.query_stream.
+        
+        Args:
+            query: Search query
+            top_k: Number of results to use
+            system_instruction: Optional system instruction for prompt
+            llm_client: Optional LLMClient used to generate the answer
+            tenant_id: Tenant charged for LLM tokens
+            session_id: Optional chat session used for context prefetch
+            customer_id: Optional customer whose language routing decision
+                is cached and reused
+            
+        Yields:
+            Answer text fragments in order
+            
+        Raises:
+            KnowledgeBaseError: If search or generation fails
+        """
+        try:
+            if llm_client is not None:
+                self.stats["total_queries"] += 1
+                self.analytics.record_query(query)
+                _, routing = self._route_query(query, customer_id)
+                async for fragment in self.rag_pipeline.query_stream(
+                    query,
+                    llm_client,
+                    top_k=top_k,
+                    system_instruction=system_instruction,
+                    tenant_id=tenant_id,
+                    session_id=session_id,
+                    **routing
+                ):
+                    yield fragment
+                return
+            
+            result = await asyncio.to_thread(
+                self.search,
+                query,
+                top_k=top_k,
+                system_instruction=system_instruction,
+                session_id=session_id,
+                customer_id=customer_id
+            )
+            for fragment in self._answer_fragments(result.get("context", []), result.get("answer")):
+                yield fragment
+                
+        except KnowledgeBaseError:
+            raise
+        except Exception as e:
+            error_msg = f"Knowledge base streaming query failed: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            raise KnowledgeBaseError(error_msg) from e
 
+    def _route_query(self, query: str, customer_id: Optional[str]) -> tuple:
+        """(language, extra RAG pipeline arguments) for a query; (None, {}) without routing."""
+        if self.language_router is None:
+            return None, {}
+        language = self.language_router.route_query(query, customer_id)
+        return language, {"vector_store": self.language_router.store_for(language)}
+
+    @staticmethod
+    def _answer_fragments(
+        context_docs: List[Dict[str, Any]],
+        answer: Optional[Dict[str, Any]] = None
+    ) -> Iterator[str]:
+        """Yield the textual answer for retrieved context piece by piece."""
+        if answer:
+            yield f"[{answer.get('source') or 'Knowledge Base'}] {answer['text']}"
+            return
+        
         if not context_docs:
-            return "No relevant information found in the knowledge base."
+            yield "No relevant information found in the knowledge base."
+            return
 
-        snippets = []
+        yield "Based on the knowledge base, here's what we found:\n"
+        first = True
         for idx, doc in enumerate(context_docs, 1):
             content = doc.get("content", "").strip()
             if not content:
                 continue
             source = doc.get("metadata", {}).get("source", f"Document {idx}")
-            snippets.append(f"[{source}] {content}")
-
-        combined = "\n".join(snippets)
-        return f"Based on the knowledge base, here's what we found:\n{combined}"
+            yield f"[{source}] {content}" if first else f"\n[{source}] {content}"
+            first = False
+    
+    def rebuild(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        validation_queries: Optional[List[str]] = None,
+        min_documents: int = 1,
+        batch_size: int = 500,
+        background: bool = False,
+        drop_delay: float = 5.0
+    ) -> Dict[str, Any]:
+        """
+        Blue/green rebuild: build a new collection, validate it, then swap.
+        
+        Documents are ingested into a fresh collection while searches keep
+        using the live one. The new collection must hold every written
+        document (and at least min_documents) and return results for each
+        validation query. Only then are the manager's and the pipeline's
+        vector store references switched to it in one step and the
+        collection activated for restarts. The old collection is dropped
+        after drop_delay seconds, letting in-flight searches finish.
+        Documents ingested into the live collection during a rebuild are
+        not carried over.
+        
+        Args:
+            documents: Complete document set for the new collection
+            validation_queries: Sample queries the new collection must answer
+                (defaults to the top analytics queries, else warm-up queries)
+            min_documents: Minimum document count for the new collection
+            batch_size: Documents per vector store write
+            background: Run in a background thread and return immediately;
+                poll get_rebuild_status()
+            drop_delay: Seconds to keep the old collection after the swap
+            
+        Returns:
+            Rebuild status (final, or 'building' when run in the background)
+            
+        Raises:
+            KnowledgeBaseError: If a rebuild is already running, language
+                routing is configured, or (in the foreground) if the build or
+                validation fails
+        """
+        if self.language_router is not None:
+            raise KnowledgeBaseError("Rebuild does not support language-routed collections")
+        if not self._rebuild_lock.acquire(blocking=False):
+            raise KnowledgeBaseError("A knowledge base rebuild is already running")
+        
+        base_name = getattr(self.vector_store, "base_collection_name", None) or self.vector_store.collection_name
+        collection_name = f"{base_name}__{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        self.rebuild_status = {
+            "status": "building",
+            "collection": collection_name,
+            "previous_collection": self.vector_store.collection_name,
+            "documents": 0,
+            "invalid": 0,
+            "started_at": datetime.now().isoformat(),
+            "error": None
+        }
+        args = (documents, collection_name, validation_queries, min_documents, batch_size, drop_delay)
+        
+        if background:
+            def _run_in_background():
+                try:
+                    self._run_rebuild(*args)
+                except KnowledgeBaseError:
+                    pass  # Recorded in rebuild_status
+            snapshot = dict(self.rebuild_status)
+            threading.Thread(target=_run_in_background, name="kb-rebuild", daemon=True).start()
+            return snapshot
+        return self._run_rebuild(*args)
+    
+    def get_rebuild_status(self) -> Optional[Dict[str, Any]]:
+        """Status of the current or last rebuild (None if there was none)."""
+        return dict(self.rebuild_status) if self.rebuild_status else None
+    
+    def _run_rebuild(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        collection_name: str,
+        validation_queries: Optional[List[str]],
+        min_documents: int,
+        batch_size: int,
+        drop_delay: float
+    ) -> Dict[str, Any]:
+        status = self.rebuild_status
+        start = time.perf_counter()
+        shadow = shadow_chunks = None
+        expiring = []
+        try:
+            shadow = self.vector_store.for_collection(collection_name)
+            shadow_chunks = ChunkStore(shadow) if self.chunker is not None else None
+            
+            iterator = iter(documents)
+            while True:
+                batch = list(itertools.islice(iterator, batch_size))
+                if not batch:
+                    break
+                prepared = [self.prepare_document(doc) for doc in batch if self.validate_document(doc)]
+                status["invalid"] += len(batch) - len(prepared)
+                if prepared:
+                    if shadow_chunks is not None:
+                        grouped_ids = self._store_chunks(prepared, shadow_chunks)
+                    else:
+                        grouped_ids = [[doc_id] for doc_id in shadow.add_documents(prepared)]
+                    expiring.extend(self._expiring(prepared, grouped_ids))
+                    status["documents"] += len(prepared)
+            
+            status["status"] = "validating"
+            count = shadow.get_collection_info().get("document_count", 0)
+            if count < max(min_documents, status["documents"]):
+                raise KnowledgeBaseError(
+                    f"New collection holds {count} documents, expected at least "
+                    f"{max(min_documents, status['documents'])}"
+                )
+            if validation_queries is None:
+                validation_queries = [
+                    entry["query"] for entry in self.analytics.top_queries(5)
+                ] or self.warm_up_queries
+            for query in validation_queries:
+                if not shadow.similarity_search(query, n_results=1):
+                    raise KnowledgeBaseError(f"New collection returned no results for '{query}'")
+            
+            old_store, old_chunks = self.vector_store, self.chunk_store
+            # Open the new collection for every source and replica first, so a
+            # failure leaves the live collection untouched
+            sources, replicas = self._rebind_retrieval(old_store, shadow)
+            # Persist first so a crash after the swap still restarts on the new collection
+            shadow.activate()
+            self.vector_store = shadow
+            self.rag_pipeline.vector_store = shadow
+            for source, vector_store in sources:
+                source.vector_store = vector_store
+            if replicas is not None:
+                self.rag_pipeline.replicas = replicas
+            if shadow_chunks is not None:
+                self.chunk_store = shadow_chunks
+            prefetcher = getattr(self.rag_pipeline, "prefetcher", None)
+            if prefetcher is not None:
+                prefetcher.cache.clear()
+            with self._stats_lock:
+                self.stats["total_documents"] = status["documents"]
+            self.expiry.clear()
+            self.expiry.restore(expiring)
+            
+            if drop_delay > 0:
+                timer = threading.Timer(drop_delay, self._drop_collection, (old_store, old_chunks))
+                timer.daemon = True
+                timer.start()
+            else:
+                self._drop_collection(old_store, old_chunks)
+            
+            status["status"] = "completed"
+        except Exception as e:
+            status["status"] = "failed"
+            status["error"] = str(e)
+            self.logger.error(f"Knowledge base rebuild failed: {str(e)}", exc_info=True)
+            if shadow is not None:
+                self._drop_collection(shadow, shadow_chunks)
+            if isinstance(e, KnowledgeBaseError):
+                raise
+            raise KnowledgeBaseError(f"Knowledge base rebuild failed: {str(e)}") from e
+        finally:
+            status["duration_seconds"] = time.perf_counter() - start
+            status["finished_at"] = datetime.now().isoformat()
+            self._rebuild_lock.release()
+        
+        self.logger.info(
+            "Knowledge base rebuild completed",
+            extra={
+                "collection": collection_name,
+                "previous_collection": status["previous_collection"],
+                "documents": status["documents"],
+                "duration_seconds": round(status["duration_seconds"], 3)
+            }
+        )
+        return dict(status)
+    
+    def _rebind_retrieval(self, old_store: Any, shadow: Any) -> tuple:
+        """
+        Stores federated sources and hedging replicas should use after a swap.
+        
+        Sources and replicas serving the old collection (same collection
+        name on the same database path) get their store opened on the new
+        one, which must already exist there (the shadow itself for the live
+        store). Stores on other databases are left alone.
+        
+        Returns:
+            ((source, store) pairs to rebind, new replica list or None)
+        """
+        def rebind(vector_store: Any) -> Any:
+            if vector_store is old_store:
+                return shadow
+            return vector_store.for_collection(shadow.collection_name, create=False)
+        
+        def serves_old(vector_store: Any) -> bool:
+            return vector_store is old_store or (
+                vector_store.collection_name == old_store.collection_name
+                and getattr(vector_store, "db_path", None) == getattr(old_store, "db_path", None)
+            )
+        
+        sources = [
+            (source, rebind(source.vector_store))
+            for source in getattr(self.rag_pipeline, "sources", None) or []
+            if serves_old(source.vector_store)
+        ]
+        replicas = list(getattr(self.rag_pipeline, "replicas", None) or [])
+        if not any(serves_old(replica) for replica in replicas):
+            return sources, None
+        return sources, [rebind(replica) if serves_old(replica) else replica for replica in replicas]
+    
+    def _drop_collection(self, vector_store: Any, chunk_store: Optional[ChunkStore] = None) -> None:
+        """Drop a retired collection and its chunk references; failures are logged, not raised."""
+        try:
+            vector_store.drop_collection()
+            if chunk_store is not None:
+                chunk_store.drop()
+        except Exception as e:
+            self.logger.warning(f"Failed to drop collection {vector_store.collection_name}: {str(e)}")
+    
+    def purge_expired(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Delete documents whose expires_at has passed.
+        
+        Only the due entries of the expiry heap are visited, in batches of
+        expiry_batch_size. Entries whose document is gone, or whose stored
+        expires_at no longer matches (re-ingested with a new expiry), are
+        dropped without a delete. If a delete fails its batch is rescheduled
+        and the purge stops until the next run.
+        
+        Args:
+            now: Reference time in epoch seconds (defaults to the current time)
+            
+        Returns:
+            Purge summary with the number of records actually deleted
+        """
+        start = time.perf_counter()
+        deleted = 0
+        error = None
+        while True:
+            due = self.expiry.pop_due(now, limit=max(1, self.expiry_batch_size))
+            if not due:
+                break
+            try:
+                deleted += self._delete_expired(due)
+            except Exception as e:
+                self.expiry.restore(due)
+                error = str(e)
+                self.logger.error(f"Failed to purge expired documents: {error}")
+                break
+        
+        if deleted:
+            with self._stats_lock:
+                self.stats["total_documents"] = max(0, self.stats["total_documents"] - deleted)
+                self.stats["expired_documents"] += deleted
+            self.logger.info(
+                "Expired documents purged",
+                extra={"deleted": deleted, "scheduled": len(self.expiry)}
+            )
+        return {
+            "success": error is None,
+            "deleted": deleted,
+            "scheduled": len(self.expiry),
+            "error": error,
+            "elapsed_seconds": time.perf_counter() - start
+        }
+    
+    def _delete_expired(self, due: List[tuple]) -> int:
+        """Delete due records whose stored expiry still matches their heap entry; returns the number removed."""
+        scheduled: Dict[str, set] = {}
+        for expires_at, doc_id in due:
+            scheduled.setdefault(doc_id, set()).add(expires_at)
+        removed = 0
+        for vector_store, chunk_store in self._collections():
+            if chunk_store is None:
+                matching = [
+                    document["id"] for document in vector_store.get_documents(list(scheduled))
+                    if document["metadata"].get(EXPIRES_AT_KEY) in scheduled[document["id"]]
+                ]
+            else:
+                # Expiring documents have private chunks, so the chunk's expiry is its document's
+                targets = {doc_id: split_chunk_reference(doc_id)[0] for doc_id in scheduled}
+                expiries = {
+                    document["id"]: document["metadata"].get(EXPIRES_AT_KEY)
+                    for document in vector_store.get_documents(list(set(targets.values())))
+                }
+                matching = [
+                    doc_id for doc_id, chunk_id in targets.items()
+                    if expiries.get(chunk_id) in scheduled[doc_id]
+                ]
+            if not matching:
+                continue
+            if chunk_store is not None:
+                removed += chunk_store.release(matching)
+            else:
+                removed += vector_store.delete_documents(matching)
+        return removed
+    
+    def load_expirations(self, batch_size: int = 500) -> int:
+        """
+        Rebuild the expiry heap from the collection, e.g. after a restart.
+        
+        Reads only documents matching an expires_at metadata filter.
+        
+        Returns:
+            Number of scheduled documents
+        """
+        entries = []
+        for vector_store, chunk_store in self._collections():
+            for page in vector_store.iter_documents(
+                batch_size=batch_size,
+                where={EXPIRES_AT_KEY: {"$gt": 0}}
+            ):
+                for doc in page:
+                    if not isinstance(doc["metadata"].get(EXPIRES_AT_KEY), (int, float)):
+                        continue
+                    if chunk_store is None:
+                        entries.append((doc["metadata"][EXPIRES_AT_KEY], doc["id"]))
+                        continue
+                    entries.extend(
+                        (doc["metadata"][EXPIRES_AT_KEY], chunk_reference(doc["id"], owner))
+                        for owner in chunk_store.references.owners(doc["id"])
+                    )
+        self.expiry.clear()
+        self.expiry.restore(entries)
+        return len(entries)
+    
+    def start_expiry_purge(self, load_existing: bool = True) -> None:
+        """
+        Purge expired documents on a daemon thread.
+        
+        The thread wakes at the next scheduled expiry, but at least every
+        expiry_purge_interval seconds so documents ingested meanwhile are
+        picked up.
+        
+        Args:
+            load_existing: Schedule documents already in the collection first
+        """
+        if self._purge_thread is not None:
+            return
+        if load_existing:
+            try:
+                self.load_expirations()
+            except Exception as e:
+                self.logger.error(f"Failed to load document expirations: {str(e)}")
+        self._purge_stop.clear()
+        self._purge_thread = threading.Thread(target=self._purge_loop, name="kb-expiry-purge", daemon=True)
+        self._purge_thread.start()
+    
+    def stop_expiry_purge(self) -> None:
+        """Stop the background purge thread."""
+        self._purge_stop.set()
+        if self._purge_thread is not None:
+            self._purge_thread.join()
+            self._purge_thread = None
+    
+    def _purge_loop(self) -> None:
+        while True:
+            next_expiry = self.expiry.next_expiry()
+            delay = self.expiry_purge_interval
+            if next_expiry is not None:
+                delay = min(delay, max(0.0, next_expiry - time.time()))
+            if self._purge_stop.wait(delay):
+                return
+            if not self.purge_expired()["success"]:
+                # The failed batch is due again at once; back off instead of spinning
+                if self._purge_stop.wait(self.expiry_purge_interval):
+                    return
+    
+    def record_escalation(self, query: str) -> None:
+        """
+        Count a query that was escalated to a human without an answer.
+        
+        Agents call this when they hand a question off; the top escalated
+        queries in get_stats() point at gaps in the knowledge base.
+        """
+        self.analytics.record_unanswered(query)
+    
+    def warm_up(
+        self,
+        queries: Optional[List[str]] = None,
+        top_k: int = 5
+    ) -> Dict[str, Any]:
+        """
+        Load the collection and prime caches before serving traffic.
+        
+        Loads the collection, then runs each warm-up query through the full
+        RAG path (embedding model, index, pipeline caches) without counting
+        it in query statistics. ``ready`` is set only once this finishes and
+        the collection loaded; a failing warm-up query is reported but does
+        not block readiness.
+        
+        Args:
+            queries: Queries to run (defaults to the configured warm-up queries)
+            top_k: Number of documents retrieved per query
+            
+        Returns:
+            Warm-up report with durations and per-query latency
+        """
+        queries = list(queries) if queries is not None else self.warm_up_queries
+        self.ready = False
+        start = time.perf_counter()
+        report = {
+            "ready": False,
+            "queries": len(queries),
+            "failed": 0,
+            "document_count": 0,
+            "collection_load_ms": 0.0,
+            "query_latency_ms": [],
+            "errors": []
+        }
+        
+        try:
+            info = self.vector_store.get_collection_info()
+            report["document_count"] = info.get("document_count", 0)
+        except Exception as e:
+            report["errors"].append({"stage": "collection", "error": str(e)})
+            self.logger.error(f"Warm-up failed to load the collection: {str(e)}")
+        report["collection_load_ms"] = (time.perf_counter() - start) * 1000
+        collection_loaded = not report["errors"]
+        
+        for query in queries:
+            query_start = time.perf_counter()
+            try:
+                self.rag_pipeline.query(user_query=query, top_k=top_k)
+            except Exception as e:
+                report["failed"] += 1
+                report["errors"].append({"stage": "query", "query": query, "error": str(e)})
+                self.logger.warning(f"Warm-up query failed: {str(e)}")
+            report["query_latency_ms"].append((time.perf_counter() - query_start) * 1000)
+        
+        report["duration_ms"] = (time.perf_counter() - start) * 1000
+        report["ready"] = collection_loaded
+        report["finished_at"] = datetime.now().isoformat()
+        self.last_warm_up = report
+        self.ready = collection_loaded
+        
+        self.logger.info(
+            "Knowledge base warm-up completed",
+            extra={
+                "ready": self.ready,
+                "queries": len(queries),
+                "failed": report["failed"],
+                "duration_ms": round(report["duration_ms"], 1)
+            }
+        )
+        
+        return report
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -335,7 +1925,12 @@ class KnowledgeBaseManager:
             stats = {
                 **self.stats,
                 "vector_store": vector_store_info,
-                "rag_pipeline": self.rag_pipeline.get_pipeline_stats()
+                "rag_pipeline": self.rag_pipeline.get_pipeline_stats(),
+                "ingestion_jobs": self.jobs.get_stats(),
+                "query_analytics": self.analytics.get_stats(),
+                "expiry": self._expiry_stats(),
+                "chunks": self.chunk_store.get_stats() if self.chunk_store is not None else None,
+                "language_routing": self.language_router.get_stats() if self.language_router is not None else None
             }
             
             return stats
@@ -347,6 +1942,14 @@ class KnowledgeBaseManager:
                 **self.stats
             }
 
+    def _expiry_stats(self) -> Dict[str, Any]:
+        next_expiry = self.expiry.next_expiry()
+        return {
+            "scheduled": len(self.expiry),
+            "next_expiry": datetime.fromtimestamp(next_expiry).isoformat() if next_expiry is not None else None,
+            "purge_running": self._purge_thread is not None
+        }
+
     def list_documents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """List documents currently stored in the vector store."""
         try:
@@ -355,18 +1958,92 @@ class KnowledgeBaseManager:
             self.logger.error(f"Failed to list documents: {str(e)}")
             return []
     
-    def health_check(self) -> Dict[str, Any]:
+    def liveness(self) -> Dict[str, Any]:
+        """
+        Cheap liveness probe served entirely from in-memory state.
+        
+        Never touches the vector store, so orchestrator probes add no load.
+        
+        Returns:
+            Liveness status with uptime, readiness flag and a summary of the
+            last deep check
+        """
+        with self._health_lock:
+            last = self._last_health
+            checked_at = self._last_health_at
+        reasons = self._not_ready_reasons()
+        return {
+            "status": "alive",
+            "uptime_seconds": time.monotonic() - self._started_at,
+            "ready": not reasons,
+            "not_ready_reasons": reasons,
+            "last_check": {
+                "status": last["status"],
+                "age_seconds": time.monotonic() - checked_at,
+                "latency_ms": last["latency_ms"]
+            } if last else None
+        }
+    
+    def health_check(self, force: bool = False) -> Dict[str, Any]:
         """
-        Perform a health check on the knowledge base system.
+        Deep readiness check, cached for health_cache_ttl seconds.
+        
+        Checks the collection, the RAG pipeline and runs a real test query
+        bounded by health_timeout. Within the cache interval the previous
+        result is returned with its age instead of hitting the store again.
+        Readiness is evaluated on every call, the same way liveness() does,
+        and reported in 'ready' and 'not_ready_reasons' (warm-up pending,
+        rebuilding or closed); 'status' only reflects the checks.
         
+        Args:
+            force: Ignore the cached result
+            
         Returns:
-            Health check results
+            Health check results with 'ready', 'not_ready_reasons',
+            'age_seconds' and 'latency_ms'
         """
+        with self._health_lock:
+            if (
+                not force
+                and self._last_health is not None
+                and time.monotonic() - self._last_health_at < self.health_cache_ttl
+            ):
+                return {
+                    **self._with_readiness(self._last_health),
+                    "cached": True,
+                    "age_seconds": time.monotonic() - self._last_health_at
+                }
+        
+        health = self._deep_health_check()
+        with self._health_lock:
+            self._last_health = health
+            self._last_health_at = time.monotonic()
+        return {**self._with_readiness(health), "cached": False, "age_seconds": 0.0}
+    
+    def _not_ready_reasons(self) -> List[str]:
+        """Why the manager should not receive traffic; empty when ready."""
+        reasons = []
+        if self._closed:
+            reasons.append("closed")
+        elif not self.ready:
+            reasons.append("warm_up_pending")
+        if self.rebuild_status is not None and self.rebuild_status.get("status") == "building":
+            reasons.append("rebuilding")
+        return reasons
+    
+    def _with_readiness(self, health: Dict[str, Any]) -> Dict[str, Any]:
+        """Combine the stored check results with the current readiness."""
+        reasons = self._not_ready_reasons()
+        return {**health, "ready": not reasons, "not_ready_reasons": reasons}
+    
+    def _deep_health_check(self) -> Dict[str, Any]:
+        start = time.perf_counter()
         health = {
             "status": "healthy",
             "checks": {
                 "vector_store": False,
                 "rag_pipeline": False,
+                "test_query": False,
                 "document_count": 0
             }
         }
@@ -381,10 +2058,16 @@ class KnowledgeBaseManager:
             pipeline_stats = self.rag_pipeline.get_pipeline_stats()
             health["checks"]["rag_pipeline"] = "error" not in pipeline_stats
             
+            # Run a real query, bounded so a stuck store cannot hang the probe
+            health["checks"]["test_query"], query_error = self._health_test_query()
+            if query_error:
+                health["error"] = query_error
+            
             # Overall status
             if all([
                 health["checks"]["vector_store"],
-                health["checks"]["rag_pipeline"]
+                health["checks"]["rag_pipeline"],
+                health["checks"]["test_query"]
             ]):
                 health["status"] = "healthy"
             else:
@@ -395,4 +2078,47 @@ class KnowledgeBaseManager:
             health["error"] = str(e)
             self.logger.error(f"Health check failed: {str(e)}")
         
+        health["latency_ms"] = (time.perf_counter() - start) * 1000
+        health["checked_at"] = datetime.now().isoformat()
         return health
+    
+    def _health_test_query(self) -> tuple:
+        """Run the health test query with a timeout; returns (ok, error)."""
+        with self._health_lock:
+            if self._health_probe is not None and not self._health_probe.done():
+                # A single probe thread: a hung query is not joined by more of them
+                return False, "Previous health test query is still running"
+            if self._health_executor is None:
+                self._health_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kb-health")
+            self._health_probe = self._health_executor.submit(
+                self.vector_store.similarity_search,
+                self.health_query,
+                n_results=1
+            )
+            probe = self._health_probe
+        try:
+            probe.result(timeout=self.health_timeout)
+            return True, None
+        except FuturesTimeoutError:
+            return False, f"Health test query timed out after {self.health_timeout}s"
+        except Exception as e:
+            return False, f"Health test query failed: {str(e)}"
+    
+    def close(self) -> None:
+        """
+        Release background threads: ingestion workers, the expiry purge, the
+        health probe and the pipeline's fan-out pool.
+        
+        Queued ingestion jobs still run to completion on their daemon
+        workers, but no new jobs are accepted.
+        """
+        self._closed = True
+        self.ready = False
+        self.jobs.shutdown(wait=False)
+        self.stop_expiry_purge()
+        with self._health_lock:
+            if self._health_executor is not None:
+                self._health_executor.shutdown(wait=False)
+                self._health_executor = None
+        self.rag_pipeline.close()
+        self.logger.info("Knowledge Base Manager closed")
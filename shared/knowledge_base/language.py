@@ -0,0 +1,262 @@
+"""
+Language Routing for Trivya Platform
+
+This module detects the language of documents and queries with a cheap
+heuristic (Unicode script for non-Latin text, stopword and diacritic hits
+for Latin text) and routes each language to its own collection, so
+retrieval only searches documents in the language of the question. The
+routing decision for a customer is cached, so follow-up queries skip
+detection entirely.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterable
+
+# Metadata key recording the language a document was routed to
+LANGUAGE_KEY = "language"
+
+# Characters inspected per detection; enough for a stable verdict
+DETECTION_SAMPLE_CHARS = 2000
+
+_WORD = re.compile(r"[^\W\d_]+")
+
+_STOPWORDS = {
+    "en": {"the", "and", "is", "are", "to", "of", "in", "for", "you", "your", "with", "how",
+           "what", "can", "do", "my", "it", "on", "this", "not", "be", "have", "i"},
+    "es": {"el", "la", "los", "las", "de", "que", "y", "en", "es", "por", "para", "con",
+           "una", "un", "mi", "cómo", "qué", "no", "se", "su", "del", "al", "puedo"},
+    "fr": {"le", "la", "les", "de", "des", "et", "est", "en", "un", "une", "pour", "que",
+           "qui", "dans", "pas", "je", "mon", "ma", "vous", "votre", "comment", "du", "au"},
+    "de": {"der", "die", "das", "und", "ist", "nicht", "ich", "mein", "meine", "wie", "ein",
+           "eine", "zu", "mit", "für", "den", "von", "auf", "sie", "kann", "es", "im"},
+    "pt": {"o", "a", "os", "as", "de", "que", "e", "em", "um", "uma", "para", "com", "não",
+           "meu", "minha", "como", "do", "da", "no", "na", "posso", "é", "se"},
+    "it": {"il", "lo", "la", "gli", "le", "di", "che", "e", "è", "un", "una", "per", "con",
+           "non", "mio", "mia", "come", "del", "della", "nel", "posso", "sono", "si"},
+    "nl": {"de", "het", "een", "en", "is", "van", "ik", "mijn", "niet", "hoe", "wat", "te",
+           "met", "voor", "op", "dat", "je", "kan", "zijn", "er", "naar", "ook", "wordt"},
+}
+
+# Letters that are strong evidence for one Latin-script language
+_DIACRITICS = {
+    "es": set("ñ¿¡"),
+    "fr": set("çœèêëîïûùâ"),
+    "de": set("ßäöü"),
+    "pt": set("ãõç"),
+    "it": set("òàì"),
+}
+
+# (first, last, language) code point ranges of non-Latin scripts
+_SCRIPTS = (
+    (0x0370, 0x03FF, "el"),
+    (0x0400, 0x04FF, "ru"),
+    (0x0590, 0x05FF, "he"),
+    (0x0600, 0x06FF, "ar"),
+    (0x0900, 0x097F, "hi"),
+    (0x0E00, 0x0E7F, "th"),
+    (0x1100, 0x11FF, "ko"),
+    (0x3040, 0x30FF, "ja"),
+    (0x4E00, 0x9FFF, "zh"),
+    (0xAC00, 0xD7AF, "ko"),
+)
+
+
+def _script_of(char: str) -> Optional[str]:
+    code = ord(char)
+    for first, last, language in _SCRIPTS:
+        if first <= code <= last:
+            return language
+    return None
+
+
+def detect_language(text: str, languages: Optional[Iterable[str]] = None) -> Optional[str]:
+    """
+    Detect the language of a text.
+
+    Args:
+        text: Document content or query
+        languages: Optional candidate language codes; others are never returned
+
+    Returns:
+        ISO 639-1 code, or None if the text gives no clear signal
+    """
+    sample = text[:DETECTION_SAMPLE_CHARS].lower()
+    candidates = set(languages) if languages is not None else None
+
+    letters = 0
+    scripts: Dict[str, int] = {}
+    for char in sample:
+        if char.isalpha():
+            letters += 1
+            script = _script_of(char)
+            if script is not None:
+                scripts[script] = scripts.get(script, 0) + 1
+    if not letters:
+        return None
+    if sum(scripts.values()) * 2 > letters:
+        # Japanese mixes kana with Han characters
+        if scripts.get("ja") and (candidates is None or "ja" in candidates):
+            return "ja"
+        script = max(scripts, key=scripts.get)
+        return script if candidates is None or script in candidates else None
+
+    scores: Dict[str, float] = {}
+    for word in _WORD.findall(sample):
+        for language, stopwords in _STOPWORDS.items():
+            if word in stopwords:
+                scores[language] = scores.get(language, 0) + 1
+    for language, marks in _DIACRITICS.items():
+        hits = sum(1 for char in sample if char in marks)
+        if hits:
+            scores[language] = scores.get(language, 0) + 1.5 * hits
+    if candidates is not None:
+        scores = {language: score for language, score in scores.items() if language in candidates}
+    if not scores:
+        return None
+    ranked = sorted(scores.items(), key=lambda entry: -entry[1])
+    if len(ranked) > 1 and ranked[0][1] == ranked[1][1]:
+        return None
+    return ranked[0][0]
+
+
+class LanguageRouter:
+    """
+    Routes documents and queries to per-language collections.
+
+    The fallback language is served by the configured collection itself;
+    every other language gets a ``<collection>__lang_<code>`` collection on
+    the same client, opened on first use. Text in an unsupported or
+    undetectable language goes to the fallback.
+    """
+
+    def __init__(
+        self,
+        vector_store: Any,
+        languages: List[str],
+        fallback_language: str = "en",
+        cache_size: int = 10000,
+        cache_ttl: Optional[float] = 3600.0,
+        logger: Optional[Any] = None
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            vector_store: Collection of the fallback language; other
+                languages open sibling collections on its client
+            languages: Supported language codes
+            fallback_language: Language used when detection gives no answer
+            cache_size: Customers whose routing decision is remembered
+            cache_ttl: Seconds a customer's decision is reused (None keeps it
+                until evicted)
+            logger: Optional logger
+        """
+        self.vector_store = vector_store
+        self.fallback_language = fallback_language
+        self.languages = list(dict.fromkeys([fallback_language, *languages]))
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.logger = logger
+        self._stores: Dict[str, Any] = {}
+        self._decisions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"detections": 0, "cache_hits": 0, "fallbacks": 0, "routed": {}}
+
+    def detect(self, text: str) -> str:
+        """Supported language of a text, or the fallback language."""
+        language = detect_language(text, self.languages)
+        with self._lock:
+            self.stats["detections"] += 1
+            if language is None:
+                self.stats["fallbacks"] += 1
+        return language or self.fallback_language
+
+    def language_of(self, document: Dict[str, Any]) -> str:
+        """Language of a document: its language metadata if supported, else detected."""
+        language = (document.get("metadata") or {}).get(LANGUAGE_KEY)
+        if language not in self.languages:
+            language = self.detect(document["content"])
+        self._count(language)
+        return language
+
+    def route_query(self, query: str, customer_id: Optional[str] = None) -> str:
+        """
+        Language whose collection should answer a query.
+
+        A customer's first confidently detected language is reused for
+        cache_ttl seconds, so their follow-up queries skip detection.
+        Queries that fall back are not cached, so a short first message
+        does not pin a customer to the fallback language.
+        """
+        if customer_id is not None:
+            with self._lock:
+                decision = self._decisions.get(customer_id)
+                if decision is not None and (decision[1] is None or decision[1] > time.monotonic()):
+                    self._decisions.move_to_end(customer_id)
+                    self.stats["cache_hits"] += 1
+                    language = decision[0]
+                    self._count_locked(language)
+                    return language
+
+        detected = detect_language(query, self.languages)
+        language = detected or self.fallback_language
+        with self._lock:
+            self.stats["detections"] += 1
+            if detected is None:
+                self.stats["fallbacks"] += 1
+            elif customer_id is not None:
+                expires = time.monotonic() + self.cache_ttl if self.cache_ttl is not None else None
+                self._decisions[customer_id] = (language, expires)
+                self._decisions.move_to_end(customer_id)
+                while len(self._decisions) > self.cache_size:
+                    self._decisions.popitem(last=False)
+            self._count_locked(language)
+        return language
+
+    def forget_customer(self, customer_id: str) -> None:
+        """Drop a customer's cached decision, e.g. after a language change."""
+        with self._lock:
+            self._decisions.pop(customer_id, None)
+
+    def collection_name(self, language: str) -> str:
+        base_name = getattr(self.vector_store, "base_collection_name", None) or self.vector_store.collection_name
+        return f"{base_name}__lang_{language}"
+
+    def store_for(self, language: str) -> Any:
+        """Vector store of a supported language (the fallback for any other)."""
+        if language not in self.languages or language == self.fallback_language:
+            return self.vector_store
+        with self._lock:
+            store = self._stores.get(language)
+            if store is None:
+                name = self.collection_name(language)
+                store = self._stores[language] = self.vector_store.for_collection(name, base_collection_name=name)
+                if self.logger:
+                    self.logger.info(f"Opened collection {store.collection_name} for language {language}")
+            return store
+
+    def all_stores(self) -> Dict[str, Any]:
+        """Vector stores of every supported language, opening them as needed."""
+        return {language: self.store_for(language) for language in self.languages}
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "languages": list(self.languages),
+                "fallback_language": self.fallback_language,
+                "cached_customers": len(self._decisions),
+                "detections": self.stats["detections"],
+                "cache_hits": self.stats["cache_hits"],
+                "fallbacks": self.stats["fallbacks"],
+                "routed": dict(self.stats["routed"])
+            }
+
+    def _count(self, language: str) -> None:
+        with self._lock:
+            self._count_locked(language)
+
+    def _count_locked(self, language: str) -> None:
+        self.stats["routed"][language] = self.stats["routed"].get(language, 0) + 1
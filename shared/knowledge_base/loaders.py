@@ -0,0 +1,266 @@
+"""
+Document Loaders for Trivya Platform
+
+This module turns files from help-center exports into knowledge base
+documents. Plain text, Markdown and HTML files become one document each;
+CSV rows and JSONL lines become one document per record. Large files are
+memory-mapped and decoded a slice at a time, so no bytes copy of the whole
+file is made next to the decoded text.
+"""
+
+import codecs
+import csv
+import io
+import json
+import mmap
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable
+
+DEFAULT_PATTERNS = ("*.txt", "*.md", "*.html", "*.htm", "*.csv", "*.jsonl")
+
+# Files at least this large are read through mmap
+DEFAULT_MMAP_THRESHOLD = 1024 * 1024
+
+# Bytes of a memory-mapped file decoded per step
+MMAP_DECODE_CHUNK = 1024 * 1024
+
+# CSV columns tried, in order, as the document content
+CONTENT_COLUMNS = ("content", "body", "text", "answer", "article")
+
+# Metadata values the vector store accepts, alone or in non-empty lists
+METADATA_SCALAR_TYPES = (str, int, float, bool)
+
+_MARKDOWN_TITLE = re.compile(r"^#\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+
+class DocumentParseError(Exception):
+    """Custom exception for files that cannot be parsed into documents"""
+    pass
+
+
+def read_text(path: Path, mmap_threshold: int = DEFAULT_MMAP_THRESHOLD) -> str:
+    """
+    Read a UTF-8 file, memory-mapping it when it is large.
+
+    A mapped file is decoded incrementally in MMAP_DECODE_CHUNK slices, so
+    only one slice of raw bytes is held at a time.
+
+    Args:
+        path: File to read
+        mmap_threshold: Size in bytes from which mmap is used
+
+    Returns:
+        Decoded file content (a leading BOM is dropped)
+    """
+    with open(path, "rb") as handle:
+        size = handle.seek(0, io.SEEK_END)
+        handle.seek(0)
+        if size == 0:
+            return ""
+        if size >= mmap_threshold:
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                decoder = codecs.getincrementaldecoder("utf-8-sig")()
+                parts = [
+                    decoder.decode(mapped[offset:offset + MMAP_DECODE_CHUNK])
+                    for offset in range(0, size, MMAP_DECODE_CHUNK)
+                ]
+                parts.append(decoder.decode(b"", final=True))
+                return "".join(parts)
+        return handle.read().decode("utf-8-sig")
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects visible text and the <title> of an HTML page."""
+
+    _SKIPPED = {"script", "style", "noscript", "template", "head"}
+    _BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self.title = ""
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self._SKIPPED:
+            self._skip_depth += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self._SKIPPED and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self.parts.append(data)
+
+
+def parse_text(text: str, source: str) -> List[Dict[str, Any]]:
+    """One document holding the whole file."""
+    return [{"content": text, "metadata": {"source": source}}]
+
+
+def parse_markdown(text: str, source: str) -> List[Dict[str, Any]]:
+    """One document; the first level-1 heading becomes the title."""
+    metadata = {"source": source}
+    match = _MARKDOWN_TITLE.search(text)
+    if match:
+        metadata["title"] = match.group(1)
+    return [{"content": text, "metadata": metadata}]
+
+
+def parse_html(text: str, source: str) -> List[Dict[str, Any]]:
+    """One document with tags, scripts and styles removed."""
+    extractor = _HTMLTextExtractor()
+    extractor.feed(text)
+    extractor.close()
+    metadata = {"source": source}
+    title = " ".join(extractor.title.split())
+    if title:
+        metadata["title"] = title
+    return [{"content": "".join(extractor.parts), "metadata": metadata}]
+
+
+def parse_csv(text: str, source: str) -> List[Dict[str, Any]]:
+    """
+    One document per row.
+
+    The first of CONTENT_COLUMNS present is the content; every other
+    non-empty column is kept as string metadata. Without a content column
+    the row's fields are joined as "column: value" lines.
+    """
+    reader = csv.DictReader(io.StringIO(text))
+    fields = [name for name in (reader.fieldnames or []) if name]
+    lowered = {name.lower(): name for name in fields}
+    content_column = next((lowered[name] for name in CONTENT_COLUMNS if name in lowered), None)
+
+    documents = []
+    for row_number, row in enumerate(reader, 1):
+        metadata = {"source": source, "row": row_number}
+        if content_column:
+            content = row.get(content_column) or ""
+            for name in fields:
+                if name != content_column and row.get(name):
+                    metadata.setdefault(name, row[name])
+        else:
+            content = "\n".join(f"{name}: {row[name]}" for name in fields if row.get(name))
+        documents.append({"content": content, "metadata": metadata})
+    return documents
+
+
+def is_metadata_value(value: Any) -> bool:
+    """Whether a metadata value can be stored in the vector store."""
+    if isinstance(value, list):
+        return bool(value) and all(isinstance(item, METADATA_SCALAR_TYPES) for item in value)
+    return isinstance(value, METADATA_SCALAR_TYPES)
+
+
+def parse_jsonl_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse one JSONL record into a document.
+
+    Records are objects with 'content' and optional 'metadata'; any other
+    scalar fields are folded into the metadata.
+
+    Returns:
+        Document dictionary, or None for a blank line
+
+    Raises:
+        DocumentParseError: If the line is not a JSON object or its metadata
+            holds values the vector store cannot store (nested objects,
+            nulls, empty lists)
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise DocumentParseError(f"Invalid JSON: {e.msg}") from e
+    if not isinstance(record, dict):
+        raise DocumentParseError("JSONL record must be an object")
+
+    metadata = record.get("metadata")
+    metadata = dict(metadata) if isinstance(metadata, dict) else {}
+    for key, value in record.items():
+        if key not in ("content", "metadata") and isinstance(value, METADATA_SCALAR_TYPES):
+            metadata.setdefault(key, value)
+    for key, value in metadata.items():
+        if not is_metadata_value(value):
+            raise DocumentParseError(
+                f"Metadata '{key}' must be a string, number, boolean or non-empty list of those"
+            )
+    return {"content": record.get("content"), "metadata": metadata}
+
+
+def parse_jsonl(text: str, source: str) -> List[Dict[str, Any]]:
+    """One document per JSONL line; the line number is kept as metadata."""
+    documents = []
+    for line_number, line in enumerate(text.splitlines(), 1):
+        try:
+            document = parse_jsonl_line(line)
+        except DocumentParseError as e:
+            raise DocumentParseError(f"line {line_number}: {e}") from e
+        if document is None:
+            continue
+        document["metadata"].setdefault("source", source)
+        document["metadata"]["line"] = line_number
+        documents.append(document)
+    return documents
+
+
+PARSERS: Dict[str, Callable[[str, str], List[Dict[str, Any]]]] = {
+    ".txt": parse_text,
+    ".md": parse_markdown,
+    ".markdown": parse_markdown,
+    ".html": parse_html,
+    ".htm": parse_html,
+    ".csv": parse_csv,
+    ".jsonl": parse_jsonl,
+    ".ndjson": parse_jsonl,
+}
+
+
+def parse_file(
+    path: Path,
+    source: Optional[str] = None,
+    mmap_threshold: int = DEFAULT_MMAP_THRESHOLD
+) -> List[Dict[str, Any]]:
+    """
+    Read and parse a file with the parser for its extension.
+
+    Args:
+        path: File to parse
+        source: Value of the 'source' metadata (defaults to the file name)
+        mmap_threshold: Size in bytes from which mmap is used
+
+    Returns:
+        Parsed documents (not yet validated)
+
+    Raises:
+        DocumentParseError: If the format is unsupported or the file is malformed
+    """
+    path = Path(path)
+    parser = PARSERS.get(path.suffix.lower())
+    if parser is None:
+        raise DocumentParseError(f"Unsupported file type: {path.suffix or path.name}")
+    try:
+        text = read_text(path, mmap_threshold)
+    except UnicodeDecodeError as e:
+        raise DocumentParseError(f"File is not valid UTF-8: {e.reason}") from e
+    try:
+        return parser(text, source or path.name)
+    except csv.Error as e:
+        raise DocumentParseError(f"Malformed CSV: {e}") from e
@@ -0,0 +1,186 @@
+"""
+Speculative Context Prefetch for Trivya Platform
+
+This module keeps a small per-session cache of context documents. After a
+question is answered, the neighbours of its top documents are fetched in the
+background; a follow-up question in the same session that lexically matches
+the warm documents is then answered without a vector store round trip.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from shared.knowledge_base.compression import tokenize
+from shared.knowledge_base.snippets import render_snippet
+
+# Result key holding the share of query terms a warm document covers
+SESSION_MATCH_KEY = "session_match_score"
+
+
+class SessionContextCache:
+    """
+    Bounded LRU of sessions, each holding an LRU of documents by ID.
+
+    Sessions expire ``ttl`` seconds after their last use. All methods are
+    thread-safe since prefetches complete on worker threads.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_docs_per_session: int = 50,
+        ttl: float = 900.0
+    ):
+        self.max_sessions = max_sessions
+        self.max_docs_per_session = max_docs_per_session
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session_id: str, documents: List[Dict[str, Any]]) -> None:
+        """Add documents to a session, evicting the least recently used."""
+        with self._lock:
+            session = self._touch(session_id, create=True)
+            docs = session["docs"]
+            for doc in documents:
+                key = doc.get("id") or doc.get("content")
+                if not key:
+                    continue
+                docs[key] = doc
+                docs.move_to_end(key)
+            while len(docs) > self.max_docs_per_session:
+                docs.popitem(last=False)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> List[Dict[str, Any]]:
+        """Documents currently warm for a session (most recent last)."""
+        with self._lock:
+            session = self._touch(session_id, create=False)
+            return list(session["docs"].values()) if session else []
+
+    def clear(self, session_id: Optional[str] = None) -> None:
+        """Drop one session, or all of them."""
+        with self._lock:
+            if session_id is None:
+                self._sessions.clear()
+            else:
+                self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def _touch(self, session_id: str, create: bool) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is not None and now - session["last_used"] > self.ttl:
+            del self._sessions[session_id]
+            session = None
+        if session is None:
+            if not create:
+                return None
+            session = {"docs": OrderedDict(), "last_used": now}
+            self._sessions[session_id] = session
+        session["last_used"] = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+
+class ContextPrefetcher:
+    """
+    Decides what to prefetch after a query and whether a follow-up hits.
+
+    A follow-up is served from the session cache when at least ``min_docs``
+    warm documents cover ``match_threshold`` of the query's terms.
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SessionContextCache] = None,
+        seed_docs: int = 2,
+        neighbours_per_doc: int = 3,
+        match_threshold: float = 0.6,
+        min_docs: int = 1
+    ):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            cache: Session cache (a default-sized one is created if None)
+            seed_docs: Number of top documents whose neighbours are fetched
+            neighbours_per_doc: Neighbours fetched per seed document
+            match_threshold: Share of query terms a warm document must cover
+            min_docs: Matching warm documents needed for a cache hit
+        """
+        self.cache = cache or SessionContextCache()
+        self.seed_docs = seed_docs
+        self.neighbours_per_doc = neighbours_per_doc
+        self.match_threshold = match_threshold
+        self.min_docs = min_docs
+        self.stats = {"lookups": 0, "hits": 0, "prefetches": 0, "prefetch_errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def lookup(self, session_id: str, query: str, top_k: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Try to answer a query from the session's warm documents.
+
+        Hits keep the vector distance they were retrieved with, so the
+        pipeline's threshold and adaptive top-k filters apply to them as to
+        search results. Term coverage is reported under SESSION_MATCH_KEY,
+        never as a similarity score.
+
+        Returns:
+            Up to top_k best-covered documents (copies, ordered by distance),
+            or None on a miss
+        """
+        self._count("lookups")
+        query_terms = set(tokenize(query))
+        documents = self.cache.get(session_id)
+        if not query_terms or not documents:
+            return None
+
+        scored = []
+        for doc in documents:
+            terms = set(tokenize(render_snippet(doc.get("content", ""), doc.get("metadata"))))
+            coverage = len(query_terms & terms) / len(query_terms)
+            if coverage >= self.match_threshold:
+                scored.append((coverage, doc))
+        if len(scored) < self.min_docs:
+            return None
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        self._count("hits")
+        hits = []
+        for coverage, doc in scored[:top_k]:
+            hit = dict(doc)
+            # Scores of an earlier query are recomputed by the pipeline filters
+            hit.pop("similarity_score", None)
+            hit[SESSION_MATCH_KEY] = coverage
+            hit["from_session_cache"] = True
+            hits.append(hit)
+        # Ranked like search results, which the adaptive cutoff expects
+        hits.sort(key=lambda hit: (hit.get("distance") is None, hit.get("distance") or 0.0))
+        return hits
+
+    def seed_queries(self, context: List[Dict[str, Any]]) -> List[str]:
+        """Query texts used to find neighbours of the top documents."""
+        return [
+            render_snippet(doc.get("content", ""), doc.get("metadata"))
+            for doc in context[:self.seed_docs]
+            if doc.get("content")
+        ]
+
+    def record_prefetch(self, succeeded: bool) -> None:
+        """Count a completed background prefetch."""
+        self._count("prefetches" if succeeded else "prefetch_errors")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {**self.stats, "sessions": len(self.cache)}
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
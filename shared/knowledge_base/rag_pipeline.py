@@ -5,7 +5,20 @@ This module provides intelligent document retrieval and context assembly
 for AI agents to answer customer questions accurately using the vector store.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Iterator
+from collections import deque
+import asyncio
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+    wait
+)
+import itertools
+import heapq
+import threading
+import time
 import sys
 import os
 
@@ -15,6 +28,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 from shared.core_functions.config import Config
 from shared.core_functions.logger import get_logger
 from shared.knowledge_base.vector_store import VectorStore
+from shared.knowledge_base.compression import ContextCompressor
+from shared.knowledge_base.dedup import NearDuplicateFilter
+from shared.knowledge_base.snippets import render_snippet
+from shared.knowledge_base.extractive import ExtractiveAnswerer
+from shared.knowledge_base.prefetch import ContextPrefetcher
+from shared.knowledge_base.expiry import is_expired
 
 
 class RAGPipelineError(Exception):
@@ -22,6 +41,159 @@ class RAGPipelineError(Exception):
     pass
 
 
+async def iterate_in_thread(make_iterator: Callable[[], Iterator[Any]]) -> AsyncIterator[Any]:
+    """
+    Drive a blocking iterator on a worker thread and yield its items.
+    
+    Items are handed to the event loop as soon as they are produced. If the
+    consumer stops early, the producer is told to stop at its next item.
+    
+    Args:
+        make_iterator: Zero-argument callable returning the blocking iterator
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    stop = threading.Event()
+    
+    def _produce() -> None:
+        try:
+            for item in make_iterator():
+                if stop.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+            return
+        loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+    
+    producer = loop.run_in_executor(None, _produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is finished:
+                if error is not None:
+                    raise error
+                break
+            yield item
+    finally:
+        stop.set()
+        await producer
+
+
+class LatencyHistogram:
+    """
+    Rolling latency histogram for a single pipeline stage.
+    
+    Keeps the most recent ``window_size`` samples (in milliseconds) so that
+    percentiles reflect current behaviour rather than the whole process lifetime.
+    """
+    
+    def __init__(self, window_size: int = 1024):
+        self.window_size = window_size
+        self._samples = deque(maxlen=window_size)
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def record(self, elapsed_ms: float) -> None:
+        """Record a single latency sample in milliseconds."""
+        with self._lock:
+            self._samples.append(elapsed_ms)
+            self._count += 1
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Return the given percentile (0-100) over the current window."""
+        with self._lock:
+            samples = sorted(self._samples)
+        return self._nearest_rank(samples, pct)
+    
+    def summary(self) -> Dict[str, Any]:
+        """Return count and p50/p95/p99 for the current window."""
+        with self._lock:
+            samples = sorted(self._samples)
+            count = self._count
+        
+        summary = {"count": count, "window": len(samples)}
+        for pct in (50, 95, 99):
+            value = self._nearest_rank(samples, pct)
+            summary[f"p{pct}_ms"] = round(value, 3) if value is not None else None
+        return summary
+    
+    @staticmethod
+    def _nearest_rank(samples: List[float], pct: float) -> Optional[float]:
+        """Nearest-rank percentile over an already sorted sample list."""
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples))) - 1))
+        return samples[index]
+
+
+class RetrievalSource:
+    """
+    A named vector store taking part in federated retrieval.
+    
+    Scores from each source are multiplied by ``weight`` before results are
+    merged, and a source that has not answered within ``timeout`` seconds is
+    left out of that query's results.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        vector_store: VectorStore,
+        weight: float = 1.0,
+        timeout: Optional[float] = None
+    ):
+        self.name = name
+        self.vector_store = vector_store
+        self.weight = weight
+        self.timeout = timeout
+
+
+class BoundedLane:
+    """
+    Executor for one retrieval backend that refuses work instead of queueing it.
+    
+    At most max_in_flight calls run at once, each on its own thread, so a
+    submitted call starts immediately. While a stalled backend holds every
+    slot, submit() returns None and the caller skips that backend; calls
+    that time out keep their slot until they actually return.
+    """
+    
+    def __init__(self, name: str, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.rejected = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=name)
+    
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+    
+    def submit(self, fn: Callable, *args: Any, **kwargs: Any) -> Optional[Future]:
+        """Start fn on a free slot; returns None if the lane is saturated."""
+        with self._lock:
+            if self._in_flight >= self.max_in_flight:
+                self.rejected += 1
+                return None
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+    
+    def _release(self, _future: Optional[Future] = None) -> None:
+        with self._lock:
+            self._in_flight -= 1
+    
+    def shutdown(self, wait: bool = False) -> None:
+        self._executor.shutdown(wait=wait)
+
+
 class RAGPipeline:
     """
     RAG Pipeline for retrieving relevant context and generating prompts.
@@ -30,13 +202,38 @@ class RAGPipeline:
     vector store and assembles them into context for LLM queries.
     """
     
+    # Stages reported by get_pipeline_stats(); embedding happens inside the
+    # vector store query, so it is accounted for under "vector_search".
+    STAGES = (
+        "session_cache", "vector_search", "dedup", "threshold_filter",
+        "extractive", "compression", "prompt_assembly", "total"
+    )
+    # Lane key of the hedged primary store
+    _PRIMARY_LANE = "primary"
+    
     def __init__(
         self,
         config: Config,
         vector_store: VectorStore,
         logger: Optional[Any] = None,
         top_k: int = 5,
-        similarity_threshold: float = 0.0
+        similarity_threshold: float = 0.0,
+        compressor: Optional[ContextCompressor] = None,
+        adaptive_top_k: bool = False,
+        adaptive_max_k: int = 20,
+        adaptive_min_k: int = 1,
+        score_gap: float = 0.15,
+        cumulative_relevance: Optional[float] = None,
+        dedup_filter: Optional[NearDuplicateFilter] = None,
+        sources: Optional[List[RetrievalSource]] = None,
+        source_timeout: float = 2.0,
+        extractive: Optional[ExtractiveAnswerer] = None,
+        replicas: Optional[List[VectorStore]] = None,
+        hedge_percentile: float = 95.0,
+        hedge_min_delay: float = 0.005,
+        hedge_default_delay: float = 0.05,
+        prefetcher: Optional[ContextPrefetcher] = None,
+        max_in_flight: int = 4
     ):
         """
         Initialize the RAG Pipeline.
@@ -47,6 +244,32 @@ class RAGPipeline:
             logger: Optional Logger instance
             top_k: Default number of documents to retrieve
             similarity_threshold: Minimum similarity score for results
+            compressor: Optional ContextCompressor applied between retrieval
+                and prompt generation in query()
+            adaptive_top_k: Request adaptive_max_k candidates and truncate
+                where relevance drops off instead of using a fixed top_k
+            adaptive_max_k: Number of candidates requested in adaptive mode
+            adaptive_min_k: Minimum documents kept in adaptive mode
+            score_gap: Similarity drop between neighbours that ends the list
+            cumulative_relevance: Optional summed similarity at which to stop
+            dedup_filter: Optional NearDuplicateFilter that drops candidates
+                whose SimHash is close to a higher-ranked document
+            sources: Optional list of RetrievalSource to query concurrently
+                instead of the single vector_store
+            source_timeout: Default per-source timeout in seconds
+            extractive: Optional ExtractiveAnswerer; confident extractive
+                answers skip prompt generation in query()
+            replicas: Optional replica VectorStores; a search that outlasts
+                the hedge delay is duplicated to a replica and the first
+                answer wins
+            hedge_percentile: Percentile of recent primary search latency
+                used as the hedge delay
+            hedge_min_delay: Lower bound for the hedge delay in seconds
+            hedge_default_delay: Hedge delay used until latency samples exist
+            prefetcher: Optional ContextPrefetcher; queries with a session_id
+                warm a per-session cache with neighbours of their top documents
+            max_in_flight: Concurrent searches allowed per federated source,
+                replica and hedged primary; a backend at the limit is skipped
             
         Raises:
             RAGPipelineError: If initialization fails
@@ -56,12 +279,45 @@ class RAGPipeline:
         self.logger = logger or get_logger(config).get_logger("RAGPipeline")
         self.top_k = top_k
         self.similarity_threshold = similarity_threshold
+        self.compressor = compressor
+        self.adaptive_top_k = adaptive_top_k
+        self.adaptive_max_k = adaptive_max_k
+        self.adaptive_min_k = adaptive_min_k
+        self.score_gap = score_gap
+        self.cumulative_relevance = cumulative_relevance
+        self.dedup_filter = dedup_filter
+        self.sources = list(sources or [])
+        self.source_timeout = source_timeout
+        self.extractive = extractive
+        self.replicas = list(replicas or [])
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.prefetcher = prefetcher
+        self.primary_latency = LatencyHistogram()
+        self.hedge_stats = {"searches": 0, "hedged": 0, "replica_wins": 0}
+        self._replica_cycle = itertools.cycle(range(len(self.replicas))) if self.replicas else None
+        self._hedge_lock = threading.Lock()
+        self.max_in_flight = max_in_flight
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # One lane per backend (source, replica, hedged primary) so a stalled
+        # backend can only tie up its own threads
+        self._lanes: Dict[Any, BoundedLane] = {}
+        self.stage_latency = {stage: LatencyHistogram() for stage in self.STAGES}
         
         self.logger.info(
             "RAG Pipeline initialized",
             extra={
                 "top_k": self.top_k,
-                "similarity_threshold": self.similarity_threshold
+                "similarity_threshold": self.similarity_threshold,
+                "compression": self.compressor is not None,
+                "adaptive_top_k": self.adaptive_top_k,
+                "dedup": self.dedup_filter is not None,
+                "sources": [source.name for source in self.sources],
+                "extractive": self.extractive is not None,
+                "replicas": len(self.replicas),
+                "prefetch": self.prefetcher is not None
             }
         )
     
@@ -69,7 +325,10 @@ class RAGPipeline:
         self,
         query: str,
         top_k: Optional[int] = None,
-        filter_threshold: bool = True
+        filter_threshold: bool = True,
+        timings: Optional[Dict[str, float]] = None,
+        retrieval_info: Optional[Dict[str, Any]] = None,
+        vector_store: Optional[Any] = None
     ) -> List[Dict[str, Any]]:
         """
         Retrieve relevant context documents for a query.
@@ -78,6 +337,13 @@ class RAGPipeline:
             query: User query string
             top_k: Number of documents to retrieve (uses default if None)
             filter_threshold: Whether to filter by similarity threshold
+            timings: Optional dict that receives per-stage timings (ms)
+            retrieval_info: Optional dict that receives 'requested_k',
+                'chosen_k' (the k kept after adaptive truncation) and, for
+                federated retrieval, 'timed_out_sources'/'failed_sources'
+            vector_store: Optional store searched instead of the pipeline's
+                own (e.g. a per-language collection); federation and
+                hedging only apply to the pipeline's own store
             
         Returns:
             List of context documents with content and metadata
@@ -90,27 +356,14 @@ class RAGPipeline:
                 self.logger.warning("Empty query provided to retrieve_context")
                 return []
             
-            k = top_k if top_k is not None else self.top_k
+            k = self._retrieval_k(top_k)
             
             # Retrieve documents from vector store
-            results = self.vector_store.similarity_search(query, n_results=k)
-            
-            # Filter by similarity threshold if enabled
-            if filter_threshold and self.similarity_threshold > 0:
-                filtered_results = []
-                for result in results:
-                    # Distance is inverse of similarity (lower is better)
-                    # Convert to similarity score (higher is better)
-                    if result.get('distance') is not None:
-                        similarity = 1.0 - result['distance']
-                        if similarity >= self.similarity_threshold:
-                            result['similarity_score'] = similarity
-                            filtered_results.append(result)
-                    else:
-                        # If no distance, include the result
-                        filtered_results.append(result)
-                
-                results = filtered_results
+            stage_start = time.perf_counter()
+            results = self._search(query, k, retrieval_info, vector_store)
+            self._record_stage("vector_search", stage_start, timings)
+            
+            results = self._filter_results(results, k, filter_threshold, timings, retrieval_info)
             
             self.logger.info(
                 f"Retrieved {len(results)} context documents",
@@ -128,11 +381,67 @@ class RAGPipeline:
             self.logger.error(error_msg, exc_info=True)
             raise RAGPipelineError(error_msg) from e
     
+    def _retrieval_k(self, top_k: Optional[int]) -> int:
+        """Number of candidates to fetch; widened when adaptive top-k truncates later."""
+        k = top_k if top_k is not None else self.top_k
+        if self.adaptive_top_k:
+            k = max(k, self.adaptive_max_k)
+        return k
+    
+    def _filter_results(
+        self,
+        results: List[Dict[str, Any]],
+        k: int,
+        filter_threshold: bool = True,
+        timings: Optional[Dict[str, float]] = None,
+        retrieval_info: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Post-retrieval filters shared by vector search and session cache hits:
+        expiry, near-duplicate removal, adaptive top-k and similarity threshold.
+        """
+        # Expired documents not yet purged are never served
+        results = [result for result in results if not is_expired(result.get('metadata'))]
+        
+        # Drop lightly edited copies of higher-ranked documents
+        if self.dedup_filter is not None:
+            stage_start = time.perf_counter()
+            results = self.dedup_filter.filter(results)
+            self._record_stage("dedup", stage_start, timings)
+        
+        # Truncate where relevance drops off
+        if self.adaptive_top_k:
+            results = self._adaptive_cutoff(results)
+        if retrieval_info is not None:
+            retrieval_info["requested_k"] = k
+            retrieval_info["chosen_k"] = len(results)
+        
+        # Filter by similarity threshold if enabled
+        stage_start = time.perf_counter()
+        if filter_threshold and self.similarity_threshold > 0:
+            filtered_results = []
+            for result in results:
+                # Distance is inverse of similarity (lower is better)
+                # Convert to similarity score (higher is better)
+                if result.get('distance') is not None:
+                    similarity = 1.0 - result['distance']
+                    if similarity >= self.similarity_threshold:
+                        result['similarity_score'] = similarity
+                        filtered_results.append(result)
+                else:
+                    # If no distance, include the result
+                    filtered_results.append(result)
+            
+            results = filtered_results
+        self._record_stage("threshold_filter", stage_start, timings)
+        return results
+    
     def generate_prompt(
         self,
         query: str,
         context: List[Dict[str, Any]],
-        system_instruction: Optional[str] = None
+        system_instruction: Optional[str] = None,
+        timings: Optional[Dict[str, float]] = None
     ) -> str:
         """
         Generate a prompt for the LLM by combining query with context.
@@ -141,20 +450,25 @@ class RAGPipeline:
             query: User query string
             context: List of context documents
             system_instruction: Optional system-level instruction
+            timings: Optional dict that receives per-stage timings (ms)
             
         Returns:
             Formatted prompt string for LLM
         """
+        stage_start = time.perf_counter()
         try:
             if not context:
                 self.logger.warning("No context provided for prompt generation")
+                self._record_stage("prompt_assembly", stage_start, timings)
                 return f"Query: {query}\n\nNo relevant context found. Please answer based on general knowledge."
             
             # Build context section
             context_parts = []
             for idx, doc in enumerate(context, 1):
-                content = doc.get('content', '')
                 metadata = doc.get('metadata', {})
+                # Documents ingested through KnowledgeBaseManager carry a
+                # precomputed snippet length, so this is just a slice
+                content = render_snippet(doc.get('content', ''), metadata)
                 similarity = doc.get('similarity_score')
                 
                 context_part = f"[Document {idx}]"
@@ -180,6 +494,7 @@ class RAGPipeline:
             prompt_parts.append("\nPlease answer the query based on the context provided above.")
             
             prompt = "\n".join(prompt_parts)
+            self._record_stage("prompt_assembly", stage_start, timings)
             
             self.logger.info(
                 "Generated prompt for LLM",
@@ -200,7 +515,9 @@ class RAGPipeline:
         self,
         user_query: str,
         top_k: Optional[int] = None,
-        system_instruction: Optional[str] = None
+        system_instruction: Optional[str] = None,
+        session_id: Optional[str] = None,
+        vector_store: Optional[Any] = None
     ) -> Dict[str, Any]:
         """
         End-to-end RAG query: retrieve context and generate prompt.
@@ -209,36 +526,99 @@ class RAGPipeline:
             user_query: User's question
             top_k: Number of documents to retrieve
             system_instruction: Optional system instruction for LLM
+            session_id: Optional chat session; with a prefetcher configured,
+                warm session context is tried first and neighbours of the
+                answer's documents are prefetched afterwards
+            vector_store: Optional store searched instead of the pipeline's own
             
         Returns:
-            Dictionary with 'prompt' and 'context' keys
+            Dictionary with 'prompt', 'context', 'answer_type', 'answer' and
+            per-stage 'timings' (ms). When a confident extractive answer is
+            found, 'answer_type' is "extractive" and 'prompt' is None;
+            otherwise 'answer_type' is "generative" and 'answer' is None.
             
         Raises:
             RAGPipelineError: If query processing fails
         """
         try:
-            # Retrieve relevant context
-            context = self.retrieve_context(user_query, top_k=top_k)
+            query_start = time.perf_counter()
+            timings: Dict[str, float] = {}
+            retrieval_info: Dict[str, Any] = {}
             
-            # Generate prompt
-            prompt = self.generate_prompt(
-                user_query,
-                context,
-                system_instruction=system_instruction
+            # Follow-ups in a session may already have warm context
+            context = None
+            if self.prefetcher is not None and session_id:
+                k = self._retrieval_k(top_k)
+                stage_start = time.perf_counter()
+                warm = self.prefetcher.lookup(session_id, user_query, k)
+                self._record_stage("session_cache", stage_start, timings)
+                if warm is not None:
+                    # Same filters as a vector search; an emptied hit falls through to retrieval
+                    context = self._filter_results(warm, k, timings=timings, retrieval_info=retrieval_info) or None
+            
+            # Retrieve relevant context
+            if context is None:
+                context = self.retrieve_context(
+                    user_query,
+                    top_k=top_k,
+                    timings=timings,
+                    retrieval_info=retrieval_info,
+                    vector_store=vector_store
+                )
+            from_session_cache = bool(context) and all(
+                doc.get("from_session_cache") for doc in context
             )
+            retrieved = context
+            
+            # Answer directly from a span of the context when confident
+            answer = None
+            if self.extractive is not None and context:
+                stage_start = time.perf_counter()
+                candidate = self.extractive.extract(user_query, context)
+                if self.extractive.is_confident(candidate):
+                    answer = candidate
+                self._record_stage("extractive", stage_start, timings)
+            
+            prompt = None
+            if answer is None:
+                # Keep only the query-relevant sentences of each document
+                if self.compressor is not None and context:
+                    stage_start = time.perf_counter()
+                    context = self.compressor.compress(user_query, context)
+                    self._record_stage("compression", stage_start, timings)
+                
+                # Generate prompt
+                prompt = self.generate_prompt(
+                    user_query,
+                    context,
+                    system_instruction=system_instruction,
+                    timings=timings
+                )
+            self._record_stage("total", query_start, timings)
             
             result = {
                 "query": user_query,
                 "prompt": prompt,
                 "context": context,
-                "context_count": len(context)
+                "context_count": len(context),
+                "chosen_k": retrieval_info.get("chosen_k", 0),
+                "answer_type": "extractive" if answer is not None else "generative",
+                "answer": answer,
+                "from_session_cache": from_session_cache,
+                "timings": timings
             }
             
+            # Cache the uncompressed documents; warm hits were prefetched already
+            if self.prefetcher is not None and session_id and retrieved and not from_session_cache:
+                self.prefetch(session_id, retrieved, vector_store=vector_store)
+            
             self.logger.info(
                 "RAG query completed successfully",
                 extra={
                     "query_length": len(user_query),
-                    "context_count": len(context)
+                    "context_count": len(context),
+                    "answer_type": result["answer_type"],
+                    "total_ms": timings.get("total")
                 }
             )
             
@@ -249,6 +629,64 @@ class RAGPipeline:
             self.logger.error(error_msg, exc_info=True)
             raise RAGPipelineError(error_msg) from e
     
+    async def query_stream(
+        self,
+        user_query: str,
+        llm_client: Any,
+        top_k: Optional[int] = None,
+        system_instruction: Optional[str] = None,
+        tenant_id: str = "default",
+        session_id: Optional[str] = None,
+        vector_store: Optional[Any] = None
+    ) -> AsyncIterator[str]:
+        """
+        Streaming RAG query: retrieve context, then stream the LLM answer.
+        
+        Retrieval and prompt assembly run on a worker thread; answer
+        fragments are yielded as the LLM produces them, so time-to-first
+        fragment does not depend on the length of the answer.
+        
+        Args:
+            user_query: User's question
+            llm_client: LLMClient (anything with a compatible stream() method)
+            top_k: Number of documents to retrieve
+            system_instruction: Optional system instruction for LLM
+            tenant_id: Tenant charged for the tokens
+            session_id: Optional chat session used for context prefetch
+            vector_store: Optional store searched instead of the pipeline's own
+            
+        Yields:
+            Answer text fragments in order
+            
+        Raises:
+            RAGPipelineError: If retrieval or generation fails
+        """
+        try:
+            result = await asyncio.to_thread(
+                self.query,
+                user_query,
+                top_k=top_k,
+                system_instruction=system_instruction,
+                session_id=session_id,
+                vector_store=vector_store
+            )
+            
+            if result["answer_type"] == "extractive":
+                yield result["answer"]["text"]
+                return
+            
+            async for fragment in iterate_in_thread(
+                lambda: llm_client.stream(result["prompt"], tenant_id=tenant_id)
+            ):
+                yield fragment
+                
+        except RAGPipelineError:
+            raise
+        except Exception as e:
+            error_msg = f"RAG streaming query failed: {str(e)}"
+            self.logger.error(error_msg, exc_info=True)
+            raise RAGPipelineError(error_msg) from e
+    
     def get_pipeline_stats(self) -> Dict[str, Any]:
         """
         Get statistics about the RAG pipeline configuration.
@@ -262,8 +700,32 @@ class RAGPipeline:
             stats = {
                 "top_k": self.top_k,
                 "similarity_threshold": self.similarity_threshold,
-                "vector_store": vector_store_info
+                "adaptive_top_k": self.adaptive_top_k,
+                "vector_store": vector_store_info,
+                "stage_latency": self.get_stage_latency()
             }
+            if self.sources:
+                stats["sources"] = [
+                    {
+                        "name": source.name,
+                        "weight": source.weight,
+                        "timeout": source.timeout or self.source_timeout,
+                        "in_flight": self._lane(source, source.name).in_flight,
+                        "rejected": self._lane(source, source.name).rejected,
+                        "vector_store": source.vector_store.get_collection_info()
+                    }
+                    for source in self.sources
+                ]
+            if self.prefetcher is not None:
+                stats["prefetch"] = self.prefetcher.get_stats()
+            if self.replicas:
+                with self._hedge_lock:
+                    stats["hedging"] = {
+                        **self.hedge_stats,
+                        "primary_in_flight": self._lane(self._PRIMARY_LANE, "primary").in_flight,
+                        "replicas": len(self.replicas),
+                        "current_delay_ms": round(self.get_hedge_delay() * 1000.0, 3)
+                    }
             
             return stats
             
@@ -272,5 +734,305 @@ class RAGPipeline:
             return {
                 "error": str(e),
                 "top_k": self.top_k,
-                "similarity_threshold": self.similarity_threshold
+                "similarity_threshold": self.similarity_threshold,
+                "stage_latency": self.get_stage_latency()
             }
+    
+    def get_stage_latency(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get rolling p50/p95/p99 latency for each pipeline stage.
+        
+        Returns:
+            Dictionary mapping stage name to its latency summary
+        """
+        return {stage: hist.summary() for stage, hist in self.stage_latency.items()}
+    
+    def prefetch(
+        self,
+        session_id: str,
+        context: List[Dict[str, Any]],
+        vector_store: Optional[Any] = None
+    ) -> None:
+        """
+        Warm a session's cache with the given context and, in the background,
+        with the neighbours of its top documents.
+        
+        Args:
+            session_id: Chat session identifier
+            context: Documents just used to answer a question
+            vector_store: Optional store the neighbours are searched in
+        """
+        if self.prefetcher is None:
+            return
+        
+        self.prefetcher.cache.add(
+            session_id,
+            [doc for doc in context if not doc.get("from_session_cache")]
+        )
+        seeds = self.prefetcher.seed_queries(context)
+        if not seeds:
+            return
+        
+        def _fetch_neighbours() -> None:
+            for seed in seeds:
+                try:
+                    neighbours = self._search(seed, self.prefetcher.neighbours_per_doc, vector_store=vector_store)
+                    self.prefetcher.cache.add(session_id, neighbours)
+                    self.prefetcher.record_prefetch(True)
+                except Exception as e:
+                    self.prefetcher.record_prefetch(False)
+                    self.logger.warning(f"Context prefetch failed: {str(e)}")
+        
+        self._get_executor().submit(_fetch_neighbours)
+    
+    def close(self, wait: bool = False) -> None:
+        """
+        Release the thread pools used for fan-out retrieval and prefetch.
+        
+        Args:
+            wait: Block until in-flight searches and prefetches finish
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+            lanes, self._lanes = list(self._lanes.values()), {}
+        for lane in lanes:
+            lane.shutdown(wait=wait)
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the prefetch pool."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-prefetch")
+            return self._executor
+    
+    def _lane(self, backend: Any, name: str) -> BoundedLane:
+        """Lazily create the bounded lane of one backend."""
+        with self._executor_lock:
+            lane = self._lanes.get(backend)
+            if lane is None:
+                lane = self._lanes[backend] = BoundedLane(f"rag-{name}", self.max_in_flight)
+            return lane
+    
+    def _federated_search(
+        self,
+        query: str,
+        k: int,
+        retrieval_info: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Query all sources concurrently and merge them into a single top-k.
+        
+        Each source gets its own deadline and its own bounded lane; sources
+        that miss the deadline or raise are skipped, and a source whose
+        earlier searches still hold every slot of its lane is not queried at
+        all, so one slow collection cannot stall the whole answer.
+        
+        Raises:
+            RAGPipelineError: If no source returned results in time
+        """
+        started = time.monotonic()
+        futures, saturated = [], []
+        for source in self.sources:
+            future = self._lane(source, source.name).submit(source.vector_store.similarity_search, query, n_results=k)
+            if future is None:
+                saturated.append(source.name)
+            else:
+                futures.append((source, future))
+        
+        candidates = []
+        timed_out, failed = [], []
+        for source, future in futures:
+            deadline = started + (source.timeout or self.source_timeout)
+            try:
+                source_results = future.result(timeout=max(0.0, deadline - time.monotonic()))
+            except FutureTimeoutError:
+                future.cancel()
+                timed_out.append(source.name)
+                continue
+            except Exception as e:
+                self.logger.warning(f"Source '{source.name}' failed: {str(e)}")
+                failed.append(source.name)
+                continue
+            
+            for rank, result in enumerate(source_results):
+                result['source_collection'] = source.name
+                if result.get('distance') is not None:
+                    score = 1.0 - result['distance']
+                else:
+                    # No distance reported: fall back to a rank-based score
+                    score = 1.0 - rank / max(len(source_results), 1)
+                result['weighted_score'] = score * source.weight
+                candidates.append(result)
+        
+        if retrieval_info is not None:
+            retrieval_info["timed_out_sources"] = timed_out
+            retrieval_info["failed_sources"] = failed
+            retrieval_info["saturated_sources"] = saturated
+        if timed_out or failed or saturated:
+            self.logger.warning(
+                "Federated retrieval skipped sources",
+                extra={"timed_out": timed_out, "failed": failed, "saturated": saturated}
+            )
+        if len(timed_out) + len(failed) + len(saturated) == len(self.sources):
+            raise RAGPipelineError("No retrieval source answered in time")
+        
+        return heapq.nlargest(k, candidates, key=lambda result: result['weighted_score'])
+    
+    def _search(
+        self,
+        query: str,
+        k: int,
+        retrieval_info: Optional[Dict[str, Any]] = None,
+        vector_store: Optional[Any] = None
+    ) -> List[Dict[str, Any]]:
+        """Run a similarity search through federation, hedging or the primary store."""
+        if vector_store is not None and vector_store is not self.vector_store:
+            return vector_store.similarity_search(query, n_results=k)
+        if self.sources:
+            return self._federated_search(query, k, retrieval_info)
+        if self.replicas:
+            return self._hedged_search(query, k, retrieval_info)
+        return self.vector_store.similarity_search(query, n_results=k)
+    
+    def get_hedge_delay(self) -> float:
+        """Current hedge delay in seconds, from recent primary latency."""
+        percentile_ms = self.primary_latency.percentile(self.hedge_percentile)
+        if percentile_ms is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, percentile_ms / 1000.0)
+    
+    def _record_primary_latency(self, start: float, recorded: Dict[str, bool]) -> None:
+        """Record one primary search's latency once, whichever side gets there first."""
+        with self._hedge_lock:
+            if recorded["done"]:
+                return
+            recorded["done"] = True
+        self.primary_latency.record((time.perf_counter() - start) * 1000.0)
+    
+    def _timed_primary_search(
+        self,
+        query: str,
+        k: int,
+        start: float,
+        recorded: Dict[str, bool]
+    ) -> List[Dict[str, Any]]:
+        """Primary search that feeds the latency histogram, even when it loses."""
+        try:
+            return self.vector_store.similarity_search(query, n_results=k)
+        finally:
+            self._record_primary_latency(start, recorded)
+    
+    def _hedged_search(
+        self,
+        query: str,
+        k: int,
+        retrieval_info: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search the primary, hedging to a replica if it is slow.
+        
+        If the primary has not answered within the hedge delay (or fails), the
+        same search is sent to the next replica and whichever answers first
+        wins. The losing request is cancelled if it has not started yet and
+        its result is ignored otherwise.
+        
+        The primary and every replica run on their own bounded lanes, so
+        stalled primary searches never delay a hedge. While the primary's
+        lane is full the search goes straight to a replica, and a primary
+        that loses the race is recorded with the time it had taken so far,
+        so the hedge delay follows a stall as it happens.
+        """
+        start = time.perf_counter()
+        recorded = {"done": False}
+        primary = self._lane(self._PRIMARY_LANE, "primary").submit(
+            self._timed_primary_search, query, k, start, recorded
+        )
+        with self._hedge_lock:
+            self.hedge_stats["searches"] += 1
+        
+        if primary is not None:
+            done, _ = wait([primary], timeout=self.get_hedge_delay())
+            if primary in done and primary.exception() is None:
+                if retrieval_info is not None:
+                    retrieval_info["hedged"] = False
+                return primary.result()
+        else:
+            done = set()
+        
+        hedge = None
+        with self._hedge_lock:
+            self.hedge_stats["hedged"] += 1
+            first = next(self._replica_cycle)
+            candidates = self.replicas[first:] + self.replicas[:first]
+        for replica in candidates:
+            hedge = self._lane(replica, "replica").submit(replica.similarity_search, query, n_results=k)
+            if hedge is not None:
+                break
+        
+        pending = {future for future in (primary, hedge) if future is not None and future not in done}
+        errors = [primary.exception()] if primary in done else []
+        if not pending and not errors:
+            raise RAGPipelineError("Primary and replicas are saturated")
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                for loser in pending:
+                    loser.cancel()
+                winner = "replica" if future is hedge else "primary"
+                if winner == "replica" and primary is not None:
+                    self._record_primary_latency(start, recorded)
+                if winner == "replica":
+                    with self._hedge_lock:
+                        self.hedge_stats["replica_wins"] += 1
+                if retrieval_info is not None:
+                    retrieval_info["hedged"] = True
+                    retrieval_info["hedge_winner"] = winner
+                return future.result()
+        
+        raise errors[-1]
+    
+    def _adaptive_cutoff(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Truncate ranked results at the first large score gap.
+        
+        Stops once the similarity drop between neighbours exceeds score_gap or
+        the summed similarity reaches cumulative_relevance. Results without a
+        distance cannot be scored and are returned up to the default top_k.
+        """
+        if not results or any(result.get('distance') is None for result in results):
+            return results[:max(self.top_k, self.adaptive_min_k)]
+        
+        kept = []
+        cumulative = 0.0
+        previous = None
+        for result in results:
+            similarity = 1.0 - result['distance']
+            if len(kept) >= self.adaptive_min_k:
+                if previous is not None and previous - similarity > self.score_gap:
+                    break
+                if self.cumulative_relevance is not None and cumulative >= self.cumulative_relevance:
+                    break
+            result['similarity_score'] = similarity
+            kept.append(result)
+            cumulative += max(similarity, 0.0)
+            previous = similarity
+        
+        return kept
+    
+    def _record_stage(
+        self,
+        stage: str,
+        start: float,
+        timings: Optional[Dict[str, float]] = None
+    ) -> float:
+        """Record elapsed time since ``start`` for a stage and return it in ms."""
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        self.stage_latency[stage].record(elapsed_ms)
+        if timings is not None:
+            timings[stage] = round(elapsed_ms, 3)
+        return elapsed_ms
@@ -0,0 +1,108 @@
+"""
+Ingest-time Snippet Preparation for Trivya Platform
+
+This module normalizes document content once at ingest (whitespace collapsed,
+help-center boilerplate stripped) and computes the length of the prompt
+snippet, so prompt assembly only has to slice and join ready strings.
+"""
+
+import re
+from typing import List, Optional, Pattern
+
+# Metadata key holding the character length of the prompt snippet
+SNIPPET_LENGTH_KEY = "snippet_length"
+
+DEFAULT_SNIPPET_MAX_CHARS = 1200
+
+# Whole lines that carry no answer content in typical help-center exports
+BOILERPLATE_PATTERNS: List[Pattern] = [
+    re.compile(pattern, re.IGNORECASE) for pattern in (
+        r"was this (article|page|answer) helpful\??( yes no)?",
+        r"back to top",
+        r"print( this (article|page))?",
+        r"share( this (article|page))?( on \w+)?",
+        # Needs "last" or a colon plus a date-like digit, so prose such as
+        # "Updated plans take effect immediately." is kept
+        r"(last (updated|modified)( on)?:?|(updated|modified)( on)?:) [\w ,./-]{0,30}\d[\w ,./:-]{0,20}",
+        r"related articles:?",
+        r"skip to (main )?content",
+        r"(this site|we) uses? cookies.{0,120}",
+        r"\d+ out of \d+ found this helpful",
+        r"(have more questions|still need help)\?( submit a request| contact us)?",
+    )
+]
+
+# Feedback widget buttons; only boilerplate right after a feedback prompt,
+# since elsewhere "Yes" or "No" is a real one-word answer
+FEEDBACK_PROMPT = re.compile(r"was this (article|page|answer) helpful\??", re.IGNORECASE)
+FEEDBACK_BUTTON = re.compile(r"yes|no", re.IGNORECASE)
+
+_INLINE_WHITESPACE = re.compile(r"[ \t\f\v\u00a0]+")
+
+
+def normalize_content(
+    text: str,
+    boilerplate_patterns: Optional[List[Pattern]] = None
+) -> str:
+    """
+    Collapse whitespace and drop boilerplate lines.
+
+    Line breaks are kept (single) because sentence splitting treats them as
+    boundaries; runs of spaces and blank lines are collapsed.
+
+    Args:
+        text: Raw document content
+        boilerplate_patterns: Line patterns to drop (defaults to BOILERPLATE_PATTERNS)
+
+    Returns:
+        Normalized content, or the stripped input if everything was boilerplate
+    """
+    patterns = BOILERPLATE_PATTERNS if boilerplate_patterns is None else boilerplate_patterns
+    lines = []
+    after_feedback_prompt = False
+    for line in text.splitlines():
+        line = _INLINE_WHITESPACE.sub(" ", line).strip()
+        if not line:
+            continue
+        if after_feedback_prompt and FEEDBACK_BUTTON.fullmatch(line):
+            continue
+        after_feedback_prompt = bool(FEEDBACK_PROMPT.fullmatch(line))
+        if any(pattern.fullmatch(line) for pattern in patterns):
+            continue
+        lines.append(line)
+
+    normalized = "\n".join(lines)
+    return normalized if normalized else text.strip()
+
+
+def snippet_length(text: str, max_chars: int = DEFAULT_SNIPPET_MAX_CHARS) -> int:
+    """
+    Length of the prompt snippet for normalized text.
+
+    Cuts at the last sentence end (or failing that, the last space) before
+    ``max_chars`` so snippets never end mid-word.
+
+    Args:
+        text: Normalized document content
+        max_chars: Maximum snippet length
+
+    Returns:
+        Number of leading characters of ``text`` that form the snippet
+    """
+    if len(text) <= max_chars:
+        return len(text)
+
+    window = text[:max_chars]
+    sentence_end = max(window.rfind(". "), window.rfind("! "), window.rfind("? "), window.rfind("\n"))
+    if sentence_end >= max_chars // 2:
+        return sentence_end + 1
+    space = window.rfind(" ")
+    return space if space > 0 else max_chars
+
+
+def render_snippet(content: str, metadata: Optional[dict] = None) -> str:
+    """Return the stored snippet of a document's content."""
+    length = (metadata or {}).get(SNIPPET_LENGTH_KEY)
+    if isinstance(length, int) and 0 < length < len(content):
+        return content[:length]
+    return content
@@ -0,0 +1,377 @@
+"""
+Tenant Pool for Trivya Platform
+
+This module serves many tenants from one process. Each tenant gets its own
+KnowledgeBaseManager (with its own RAGPipeline and collection), created on
+the first request and kept in an LRU bounded by tenant count and estimated
+memory. Tenants idle for longer than the TTL are evicted and closed, so
+thousands of small tenants can share a node while only the active ones hold
+threads and caches.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Iterator, List
+
+from shared.knowledge_base.kb_manager import KnowledgeBaseManager
+from shared.knowledge_base.rag_pipeline import RAGPipeline
+
+# Rough per-tenant footprint used by the default memory estimate: fixed
+# overhead (manager, pipeline, histograms, sketches) plus a share per document
+# for client-side caches and collection handles
+DEFAULT_TENANT_OVERHEAD_BYTES = 256 * 1024
+DEFAULT_BYTES_PER_DOCUMENT = 2 * 1024
+
+# Tenant IDs longer than this are shortened (and hashed) in collection names,
+# leaving room for the suffix a rebuild appends within Chroma's 63 characters
+_MAX_TENANT_NAME = 24
+_UNSAFE_NAME_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class TenantPoolError(Exception):
+    """Custom exception for tenant pool errors"""
+    pass
+
+
+def tenant_collection_name(base_name: str, tenant_id: str) -> str:
+    """
+    Collection name for a tenant: ``<base>__tenant_<id>``.
+
+    IDs that are long or contain characters Chroma rejects are sanitized and
+    suffixed with a short hash so distinct tenants never share a collection.
+    """
+    safe = _UNSAFE_NAME_CHARS.sub("-", tenant_id)
+    if safe != tenant_id or len(safe) > _MAX_TENANT_NAME:
+        digest = hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:8]
+        safe = f"{safe[:_MAX_TENANT_NAME - 9]}-{digest}"
+    return f"{base_name}__tenant_{safe}"
+
+
+def estimate_manager_memory(manager: KnowledgeBaseManager) -> int:
+    """Default memory estimate: fixed overhead plus a share per stored document."""
+    try:
+        documents = manager.vector_store.get_collection_info().get("document_count", 0)
+    except Exception:
+        documents = 0
+    return DEFAULT_TENANT_OVERHEAD_BYTES + DEFAULT_BYTES_PER_DOCUMENT * int(documents or 0)
+
+
+def make_tenant_factory(
+    config: Any,
+    vector_store: Any,
+    logger: Optional[Any] = None,
+    pipeline_kwargs: Optional[Dict[str, Any]] = None,
+    manager_kwargs: Optional[Dict[str, Any]] = None
+) -> Callable[[str], KnowledgeBaseManager]:
+    """
+    Build a factory creating one manager per tenant on a shared client.
+
+    Args:
+        config: Config object
+        vector_store: Root VectorStore; tenants open sibling collections on
+            its client instead of new database connections
+        logger: Optional logger shared by all tenants
+        pipeline_kwargs: Extra RAGPipeline arguments for every tenant
+        manager_kwargs: Extra KnowledgeBaseManager arguments for every tenant
+
+    Returns:
+        Callable mapping a tenant ID to a new KnowledgeBaseManager
+    """
+    base_name = getattr(vector_store, "base_collection_name", None) or vector_store.collection_name
+
+    def _create(tenant_id: str) -> KnowledgeBaseManager:
+        collection_name = tenant_collection_name(base_name, tenant_id)
+        tenant_store = vector_store.for_collection(collection_name, base_collection_name=collection_name)
+        pipeline = RAGPipeline(config, tenant_store, logger=logger, **(pipeline_kwargs or {}))
+        return KnowledgeBaseManager(config, tenant_store, pipeline, logger=logger, **(manager_kwargs or {}))
+
+    return _create
+
+
+class _TenantEntry:
+    """A pooled manager with its memory estimate, recency and lease count."""
+
+    def __init__(self, manager: KnowledgeBaseManager, memory_bytes: int):
+        self.manager = manager
+        self.memory_bytes = memory_bytes
+        self.last_used = time.monotonic()
+        self.leases = 0
+
+
+class TenantPool:
+    """
+    Lazily created, LRU-bounded pool of per-tenant KnowledgeBaseManagers.
+
+    Concurrent first requests for a tenant share a single creation. When the
+    pool exceeds max_tenants or max_memory_bytes the least recently used
+    tenants are closed; tenants held through lease() are never evicted, so
+    the pool may overshoot its bounds while every tenant is in use.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], KnowledgeBaseManager],
+        max_tenants: int = 100,
+        max_memory_bytes: Optional[int] = None,
+        idle_ttl: Optional[float] = 900.0,
+        estimator: Optional[Callable[[KnowledgeBaseManager], int]] = None,
+        logger: Optional[Any] = None
+    ):
+        """
+        Initialize the tenant pool.
+
+        Args:
+            factory: Callable creating the manager of a tenant ID, e.g. from
+                make_tenant_factory()
+            max_tenants: Maximum number of live tenant managers
+            max_memory_bytes: Optional bound on the summed memory estimates
+            idle_ttl: Seconds after which an unused tenant is evicted by
+                evict_idle() (None disables idle eviction)
+            estimator: Callable estimating a manager's memory in bytes at
+                creation (defaults to estimate_manager_memory)
+            logger: Optional logger
+
+        Raises:
+            TenantPoolError: If the bounds are invalid
+        """
+        if max_tenants < 1:
+            raise TenantPoolError("max_tenants must be at least 1")
+        self.factory = factory
+        self.max_tenants = max_tenants
+        self.max_memory_bytes = max_memory_bytes
+        self.idle_ttl = idle_ttl
+        self.estimator = estimator or estimate_manager_memory
+        self.logger = logger
+        self._entries: "OrderedDict[str, _TenantEntry]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._memory_bytes = 0
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._closed = False
+        self.stats = {"hits": 0, "misses": 0, "creations": 0, "evictions": 0, "idle_evictions": 0}
+
+    def get(self, tenant_id: str) -> KnowledgeBaseManager:
+        """
+        Manager of a tenant, created on first use.
+
+        The manager may be evicted (and closed) once the caller is done with
+        it; use lease() to pin it for the duration of a request.
+
+        Raises:
+            TenantPoolError: If the tenant ID is empty, the pool is closed or
+                the factory fails
+        """
+        return self._acquire(tenant_id, lease=False).manager
+
+    @contextmanager
+    def lease(self, tenant_id: str) -> Iterator[KnowledgeBaseManager]:
+        """Context manager yielding a tenant's manager, pinned against eviction."""
+        entry = self._acquire(tenant_id, lease=True)
+        try:
+            yield entry.manager
+        finally:
+            with self._lock:
+                entry.leases -= 1
+                entry.last_used = time.monotonic()
+                # Keep the LRU order in step with last_used, which evict_idle relies on
+                if self._entries.get(tenant_id) is entry:
+                    self._entries.move_to_end(tenant_id)
+
+    def evict(self, tenant_id: str) -> bool:
+        """
+        Close and drop a tenant's manager.
+
+        Returns:
+            True if the tenant was pooled and not leased
+        """
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is None or entry.leases:
+                return False
+            self._remove(tenant_id)
+            self.stats["evictions"] += 1
+        self._close_managers([(tenant_id, entry)], "manual")
+        return True
+
+    def evict_idle(self) -> int:
+        """
+        Evict tenants unused for longer than idle_ttl.
+
+        Returns:
+            Number of tenants evicted
+        """
+        if self.idle_ttl is None:
+            return 0
+        cutoff = time.monotonic() - self.idle_ttl
+        evicted = []
+        with self._lock:
+            # Entries are in LRU order, so the scan stops at the first recent one
+            for tenant_id, entry in list(self._entries.items()):
+                if entry.last_used > cutoff:
+                    break
+                if entry.leases:
+                    continue
+                self._remove(tenant_id)
+                evicted.append((tenant_id, entry))
+            self.stats["evictions"] += len(evicted)
+            self.stats["idle_evictions"] += len(evicted)
+        self._close_managers(evicted, "idle")
+        return len(evicted)
+
+    def start_sweeper(self, interval: float = 60.0) -> None:
+        """Run evict_idle() every interval seconds on a daemon thread."""
+        with self._lock:
+            if self._sweeper is not None:
+                return
+            self._stop.clear()
+            self._sweeper = threading.Thread(
+                target=self._sweep,
+                args=(interval,),
+                name="kb-tenant-sweeper",
+                daemon=True
+            )
+            self._sweeper.start()
+
+    def close(self) -> None:
+        """Stop the sweeper and close every pooled manager."""
+        self._stop.set()
+        with self._lock:
+            self._closed = True
+            sweeper, self._sweeper = self._sweeper, None
+            closing = list(self._entries.items())
+            self._entries.clear()
+            self._memory_bytes = 0
+        if sweeper is not None:
+            sweeper.join()
+        self._close_managers(closing, "shutdown")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool occupancy, memory estimate and hit/miss/eviction counters."""
+        with self._lock:
+            return {
+                "tenants": len(self._entries),
+                "leased": sum(1 for entry in self._entries.values() if entry.leases),
+                "max_tenants": self.max_tenants,
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                **self.stats
+            }
+
+    def _acquire(self, tenant_id: str, lease: bool) -> _TenantEntry:
+        if not tenant_id:
+            raise TenantPoolError("Tenant ID must not be empty")
+        with self._lock:
+            if self._closed:
+                raise TenantPoolError("Tenant pool is closed")
+            entry = self._entries.get(tenant_id)
+            if entry is not None:
+                self.stats["hits"] += 1
+                self._touch(tenant_id, entry, lease)
+                return entry
+            self.stats["misses"] += 1
+            pending = self._pending.get(tenant_id)
+            creator = pending is None
+            if creator:
+                pending = self._pending[tenant_id] = Future()
+
+        if not creator:
+            # Another request is creating this tenant; share its result
+            pending.result()
+            with self._lock:
+                entry = self._entries.get(tenant_id)
+                if entry is not None:
+                    self._touch(tenant_id, entry, lease)
+                    return entry
+            # Evicted again before we got to it
+            return self._acquire(tenant_id, lease)
+
+        try:
+            manager = self.factory(tenant_id)
+            entry = _TenantEntry(manager, self.estimator(manager))
+        except Exception as e:
+            with self._lock:
+                del self._pending[tenant_id]
+            error = TenantPoolError(f"Failed to create knowledge base for tenant {tenant_id}: {str(e)}")
+            pending.set_exception(error)
+            if self.logger:
+                self.logger.error(str(error))
+            raise error from e
+
+        with self._lock:
+            del self._pending[tenant_id]
+            self._entries[tenant_id] = entry
+            self._memory_bytes += entry.memory_bytes
+            self.stats["creations"] += 1
+            self._touch(tenant_id, entry, lease)
+            evicted = self._enforce_bounds(tenant_id)
+        pending.set_result(None)
+
+        if self.logger:
+            self.logger.info(
+                "Tenant knowledge base created",
+                extra={"tenant_id": tenant_id, "memory_bytes": entry.memory_bytes}
+            )
+        self._close_managers(evicted, "capacity")
+        return entry
+
+    def _touch(self, tenant_id: str, entry: _TenantEntry, lease: bool) -> None:
+        """Mark an entry most recently used (lock held)."""
+        self._entries.move_to_end(tenant_id)
+        entry.last_used = time.monotonic()
+        if lease:
+            entry.leases += 1
+
+    def _enforce_bounds(self, keep: str) -> List[tuple]:
+        """Pop least recently used, unleased tenants until within bounds (lock held)."""
+        evicted = []
+        for tenant_id, entry in list(self._entries.items()):
+            if not self._over_bounds():
+                break
+            if tenant_id == keep or entry.leases:
+                continue
+            self._remove(tenant_id)
+            evicted.append((tenant_id, entry))
+        self.stats["evictions"] += len(evicted)
+        if self._over_bounds() and self.logger:
+            self.logger.warning(
+                "Tenant pool over capacity; all other tenants are leased",
+                extra={"tenants": len(self._entries), "memory_bytes": self._memory_bytes}
+            )
+        return evicted
+
+    def _over_bounds(self) -> bool:
+        if len(self._entries) > self.max_tenants:
+            return True
+        return self.max_memory_bytes is not None and self._memory_bytes > self.max_memory_bytes
+
+    def _remove(self, tenant_id: str) -> None:
+        entry = self._entries.pop(tenant_id)
+        self._memory_bytes -= entry.memory_bytes
+
+    def _close_managers(self, entries: List[tuple], reason: str) -> None:
+        """Close evicted managers outside the pool lock."""
+        for tenant_id, entry in entries:
+            try:
+                entry.manager.close()
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Failed to close knowledge base of tenant {tenant_id}: {str(e)}")
+            if self.logger:
+                self.logger.info(
+                    "Tenant knowledge base evicted",
+                    extra={"tenant_id": tenant_id, "reason": reason}
+                )
+
+    def _sweep(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(f"Idle tenant sweep failed: {str(e)}")
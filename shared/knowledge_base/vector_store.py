@@ -1,22 +1,43 @@
 import chromadb
+import copy
+import json
+import os
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator
 from chromadb.config import Settings
 from shared.core_functions.config import Config
 from shared.core_functions.logger import get_logger, TrivyaLogger
 
+# Pointer file (inside VECTOR_DB_PATH) mapping configured collection names to
+# the collection currently serving them after a blue/green rebuild
+ACTIVE_COLLECTIONS_FILE = "active_collections.json"
+
+# Collections use cosine distance so that 1 - distance is a cosine similarity in
+# [-1, 1], which the RAG similarity threshold and adaptive top-k compare against.
+# Chroma's default (squared L2) distances are unbounded.
+COLLECTION_METADATA = {"hnsw:space": "cosine"}
+
 class VectorStore:
     """
     Abstraction layer for interacting with the vector database (ChromaDB).
     Responsible for adding documents and performing similarity searches.
     """
 
-    def __init__(self, config: Config, logger: Optional[TrivyaLogger] = None):
+    def __init__(
+        self,
+        config: Config,
+        logger: Optional[TrivyaLogger] = None,
+        collection_name: Optional[str] = None
+    ):
         """
         Initialize the VectorStore with configuration.
 
         Args:
             config (Config): The main configuration object.
+            collection_name (Optional[str]): Explicit collection to open. By default the
+                collection activated for COLLECTION_NAME by the last rebuild, or
+                COLLECTION_NAME itself.
         """
         self.config = config
         base_logger = logger or get_logger(self.config)
@@ -24,14 +45,15 @@ class VectorStore:
         
         self.db_type = self.config.vector_db_config.VECTOR_DB_TYPE
         self.db_path = self.config.vector_db_config.VECTOR_DB_PATH
-        self.collection_name = self.config.vector_db_config.COLLECTION_NAME
+        self.base_collection_name = self.config.vector_db_config.COLLECTION_NAME
+        self.collection_name = collection_name or self._read_active_collection() or self.base_collection_name
 
         self.logger.info(f"Initializing VectorStore with type={self.db_type}, path={self.db_path}")
 
         try:
             if self.db_type == "chromadb":
                 self.client = chromadb.PersistentClient(path=self.db_path)
-                self.collection = self.client.get_or_create_collection(name=self.collection_name)
+                self.collection = self._open_collection(self.collection_name)
                 self.logger.info(f"Successfully connected to ChromaDB collection: {self.collection_name}")
             else:
                 raise ValueError(f"Unsupported VECTOR_DB_TYPE: {self.db_type}")
@@ -39,12 +61,14 @@ class VectorStore:
             self.logger.error(f"Failed to initialize VectorStore: {str(e)}")
             raise
 
-    def add_documents(self, documents: List[Dict[str, Any]]) -> List[str]:
+    def add_documents(self, documents: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> List[str]:
         """
         Add documents to the vector store.
 
         Args:
             documents (List[Dict[str, Any]]): List of documents. Each dict must have 'content' (str) and 'metadata' (dict).
+            ids (Optional[List[str]]): Caller-chosen IDs. Documents are then upserted, so
+                writing the same batch twice (e.g. when resuming an ingest) does not duplicate it.
 
         Returns:
             List[str]: List of IDs of the added documents.
@@ -54,13 +78,24 @@ class VectorStore:
             return []
 
         try:
+            contents = [doc['content'] for doc in documents]
+            metadatas = [doc['metadata'] for doc in documents]
+
+            if ids is not None:
+                if len(ids) != len(documents):
+                    raise ValueError("ids must match documents one to one")
+                self.collection.upsert(
+                    documents=contents,
+                    metadatas=metadatas,
+                    ids=list(ids)
+                )
+                self.logger.info(f"Successfully upserted {len(documents)} documents to collection {self.collection_name}")
+                return list(ids)
+
             ids = [str(i) for i in range(len(documents))] # Simple ID generation for now, can be improved
             # In a real app, we might want to generate UUIDs or use a hash of the content
             import uuid
             ids = [str(uuid.uuid4()) for _ in documents]
-            
-            contents = [doc['content'] for doc in documents]
-            metadatas = [doc['metadata'] for doc in documents]
 
             self.collection.add(
                 documents=contents,
@@ -83,7 +118,8 @@ class VectorStore:
             n_results (int): Number of results to return.
 
         Returns:
-            List[Dict[str, Any]]: List of documents with 'content' and 'metadata'.
+            List[Dict[str, Any]]: List of documents with 'content', 'metadata', 'id'
+            and 'distance' (None if the backend did not report one).
         """
         try:
             results = self.collection.query(
@@ -96,12 +132,14 @@ class VectorStore:
             
             formatted_results = []
             if results['documents']:
+                distances = results.get('distances') or []
                 num_results = len(results['documents'][0])
                 for i in range(num_results):
                     formatted_results.append({
                         'content': results['documents'][0][i],
                         'metadata': results['metadatas'][0][i] if results['metadatas'] else {},
-                        'id': results['ids'][0][i]
+                        'id': results['ids'][0][i],
+                        'distance': distances[0][i] if distances and distances[0] else None
                     })
             
             self.logger.info(f"Similarity search for '{query}' returned {len(formatted_results)} results")
@@ -110,6 +148,69 @@ class VectorStore:
             self.logger.error(f"Failed to perform similarity search: {str(e)}")
             raise
 
+    def delete_documents(self, ids: List[str]) -> int:
+        """
+        Delete documents by ID.
+
+        Args:
+            ids (List[str]): IDs returned by add_documents.
+
+        Returns:
+            int: Number of IDs submitted for deletion.
+        """
+        if not ids:
+            return 0
+
+        try:
+            self.collection.delete(ids=list(ids))
+            self.logger.info(f"Deleted {len(ids)} documents from collection {self.collection_name}")
+            return len(ids)
+        except Exception as e:
+            self.logger.error(f"Failed to delete documents: {str(e)}")
+            raise
+
+    def get_documents(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Fetch the metadata of documents by ID.
+
+        Args:
+            ids (List[str]): IDs to look up; unknown IDs are skipped.
+
+        Returns:
+            List[Dict[str, Any]]: Found documents with 'id' and 'metadata'.
+        """
+        if not ids:
+            return []
+
+        try:
+            results = self.collection.get(ids=list(ids), include=["metadatas"])
+            metadatas = results.get("metadatas", []) or []
+            return [
+                {"id": doc_id, "metadata": (metadatas[idx] if idx < len(metadatas) else None) or {}}
+                for idx, doc_id in enumerate(results.get("ids", []) or [])
+            ]
+        except Exception as e:
+            self.logger.error(f"Failed to get documents: {str(e)}")
+            raise
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """
+        Replace the metadata of existing documents without re-embedding them.
+
+        Args:
+            ids (List[str]): IDs of the documents to update.
+            metadatas (List[Dict[str, Any]]): New metadata, aligned with ids.
+        """
+        if not ids:
+            return
+
+        try:
+            self.collection.update(ids=list(ids), metadatas=list(metadatas))
+            self.logger.info(f"Updated metadata of {len(ids)} documents in collection {self.collection_name}")
+        except Exception as e:
+            self.logger.error(f"Failed to update metadata: {str(e)}")
+            raise
+
     def delete_collection(self):
         """
         Delete the entire collection.
@@ -118,11 +219,128 @@ class VectorStore:
             self.client.delete_collection(name=self.collection_name)
             self.logger.warning(f"Deleted collection: {self.collection_name}")
             # Re-create it so the object is still usable
-            self.collection = self.client.get_or_create_collection(name=self.collection_name)
+            self.collection = self._open_collection(self.collection_name)
         except Exception as e:
             self.logger.error(f"Failed to delete collection: {str(e)}")
             raise
 
+    def for_collection(
+        self,
+        collection_name: str,
+        base_collection_name: Optional[str] = None,
+        create: bool = True
+    ) -> "VectorStore":
+        """
+        Return a VectorStore for another collection sharing this client.
+
+        Args:
+            collection_name (str): Collection to open (created if missing).
+            base_collection_name (Optional[str]): Logical name the new store serves, e.g. a
+                tenant's collection. The collection activated for it by a rebuild is opened
+                instead of collection_name if there is one, and activate() records against
+                it. Defaults to this store's base name.
+            create (bool): Create the collection if it does not exist; with False a
+                missing collection raises instead.
+
+        Returns:
+            VectorStore: New instance bound to that collection.
+        """
+        try:
+            sibling = copy.copy(self)
+            if base_collection_name is not None:
+                sibling.base_collection_name = base_collection_name
+                collection_name = sibling._read_active_collection() or collection_name
+            sibling.collection_name = collection_name
+            sibling.collection = self._open_collection(collection_name, create=create)
+            return sibling
+        except Exception as e:
+            self.logger.error(f"Failed to open collection {collection_name}: {str(e)}")
+            raise
+
+    def _open_collection(self, collection_name: str, create: bool = True):
+        """Open (or create) a collection with cosine distance."""
+        if create:
+            collection = self.client.get_or_create_collection(name=collection_name, metadata=COLLECTION_METADATA)
+        else:
+            collection = self.client.get_collection(name=collection_name)
+        space = self._distance_space(collection)
+        if isinstance(space, str) and space != COLLECTION_METADATA["hnsw:space"]:
+            self.logger.warning(
+                f"Collection {collection_name} uses '{space}' distance; similarity scores assume cosine. "
+                "Rebuild the knowledge base to migrate it."
+            )
+        return collection
+
+    @staticmethod
+    def _distance_space(collection: Any) -> Optional[str]:
+        """
+        Distance function of an opened collection.
+
+        Newer Chroma versions keep it in the collection configuration and
+        leave metadata empty for collections created with default settings;
+        older ones only record it in the 'hnsw:space' metadata.
+        """
+        configuration = getattr(collection, "configuration", None)
+        if isinstance(configuration, dict):
+            for index in ("hnsw", "spann"):
+                space = (configuration.get(index) or {}).get("space")
+                if isinstance(space, str):
+                    return space
+        metadata = getattr(collection, "metadata", None)
+        return metadata.get("hnsw:space") if isinstance(metadata, dict) else None
+
+    def activate(self) -> None:
+        """
+        Record this store's collection as the one serving its base name.
+
+        Later VectorStore instances created from the same config open it, so a
+        blue/green swap survives restarts.
+        """
+        pointer = Path(self.db_path) / ACTIVE_COLLECTIONS_FILE
+        try:
+            active = self._read_pointer(pointer)
+            active[self.base_collection_name] = self.collection_name
+            pointer.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = pointer.with_name(f"{pointer.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(active, f, indent=1, sort_keys=True)
+                # The rename must not reach the disk before the new contents do
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, pointer)
+            self.logger.info(f"Activated collection {self.collection_name} for {self.base_collection_name}")
+        except Exception as e:
+            self.logger.error(f"Failed to activate collection {self.collection_name}: {str(e)}")
+            raise
+
+    def drop_collection(self) -> None:
+        """
+        Delete this store's collection without re-creating it.
+
+        Used to discard a collection replaced by a rebuild; the instance must
+        not be used afterwards.
+        """
+        try:
+            self.client.delete_collection(name=self.collection_name)
+            self.logger.warning(f"Dropped collection: {self.collection_name}")
+        except Exception as e:
+            self.logger.error(f"Failed to drop collection: {str(e)}")
+            raise
+
+    def _read_active_collection(self) -> Optional[str]:
+        try:
+            return self._read_pointer(Path(self.db_path) / ACTIVE_COLLECTIONS_FILE).get(self.base_collection_name)
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable active collection pointer: {str(e)}")
+            return None
+
+    @staticmethod
+    def _read_pointer(pointer: Path) -> Dict[str, str]:
+        if not pointer.exists():
+            return {}
+        with open(pointer, "r", encoding="utf-8") as f:
+            return json.load(f)
+
     def add_document(self, file_path: str, metadata: Optional[Dict[str, Any]] = None) -> str:
         """Add a single document from a file path to the store."""
         try:
@@ -183,3 +401,48 @@ class VectorStore:
         except Exception as e:
             self.logger.error(f"Failed to list documents: {str(e)}")
             return []
+
+    def iter_documents(
+        self,
+        batch_size: int = 500,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Page through the whole collection, or the documents matching a metadata filter.
+
+        Args:
+            batch_size (int): Documents fetched per request.
+            where (Optional[Dict[str, Any]]): Chroma metadata filter, e.g.
+                {"expires_at": {"$gt": 0}}.
+
+        Yields:
+            List[Dict[str, Any]]: Pages of documents with 'id', 'content' and 'metadata'.
+        """
+        offset = 0
+        while True:
+            try:
+                results = self.collection.get(
+                    where=where,
+                    limit=batch_size,
+                    offset=offset,
+                    include=["metadatas", "documents"]
+                )
+            except Exception as e:
+                self.logger.error(f"Failed to read documents at offset {offset}: {str(e)}")
+                raise
+            ids = results.get("ids", []) or []
+            if not ids:
+                return
+            contents = results.get("documents", []) or []
+            metadatas = results.get("metadatas", []) or []
+            yield [
+                {
+                    "id": doc_id,
+                    "content": contents[idx] if idx < len(contents) else "",
+                    "metadata": (metadatas[idx] if idx < len(metadatas) else None) or {}
+                }
+                for idx, doc_id in enumerate(ids)
+            ]
+            if len(ids) < batch_size:
+                return
+            offset += len(ids)
@@ -0,0 +1,52 @@
+import pytest
+from shared.knowledge_base.analytics import (
+    CountMinSketch,
+    HeavyHitters,
+    QueryAnalytics,
+    normalize_query
+)
+
+def test_count_min_sketch_never_undercounts():
+    """Test that estimates are upper bounds of the true counts."""
+    sketch = CountMinSketch(width=64, depth=4)
+    truth = {}
+    for i in range(500):
+        item = f"q{i % 37}"
+        truth[item] = truth.get(item, 0) + 1
+        sketch.add(item)
+    
+    assert all(sketch.estimate(item) >= count for item, count in truth.items())
+    assert sketch.total == 500
+
+def test_count_min_sketch_rejects_empty_dimensions():
+    """Test that the sketch needs at least one counter."""
+    with pytest.raises(ValueError):
+        CountMinSketch(width=0)
+
+def test_heavy_hitters_keeps_most_frequent():
+    """Test that frequent items displace rare ones in the top-k."""
+    hitters = HeavyHitters(k=3)
+    for item, count in [("a", 1), ("b", 1), ("c", 1), ("hot", 10), ("warm", 5)]:
+        for _ in range(count):
+            hitters.add(item)
+    
+    top = hitters.top(2)
+    
+    assert [entry["query"] for entry in top] == ["hot", "warm"]
+    assert top[0]["count"] >= 10
+    assert len(hitters.top(10)) == 3
+
+def test_query_analytics_normalizes_and_separates_unanswered():
+    """Test that query variants aggregate and escalations are tracked apart."""
+    analytics = QueryAnalytics(k=5)
+    analytics.record_query("How do I reset my password?")
+    analytics.record_query("how do i  reset my PASSWORD")
+    analytics.record_unanswered("Do you ship to Mars?")
+    analytics.record_query("   ")
+    
+    stats = analytics.get_stats()
+    
+    assert normalize_query("Reset, password!") == "reset password"
+    assert stats["top_queries"] == [{"query": "how do i reset my password", "count": 2}]
+    assert stats["top_unanswered"] == [{"query": "do you ship to mars", "count": 1}]
+    assert stats["total_queries"] == 2
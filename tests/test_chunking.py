@@ -0,0 +1,148 @@
+import random
+import pytest
+from shared.knowledge_base.chunking import (
+    ContentDefinedChunker,
+    ChunkStore,
+    CHUNK_REFS_KEY,
+    chunk_hash,
+    chunk_reference,
+    shared_chunk_id
+)
+
+class InMemoryStore:
+    """Minimal vector store recording embeddings (adds) separately from metadata updates."""
+    def __init__(self):
+        self.records = {}
+        self.embedded = 0
+
+    def get_documents(self, ids):
+        return [{"id": i, "metadata": dict(self.records[i]["metadata"])} for i in ids if i in self.records]
+
+    def add_documents(self, documents, ids=None):
+        for doc_id, doc in zip(ids, documents):
+            self.records[doc_id] = {"content": doc["content"], "metadata": dict(doc["metadata"])}
+        self.embedded += len(documents)
+        return list(ids)
+
+    def update_metadata(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            self.records[doc_id]["metadata"] = dict(metadata)
+
+    def delete_documents(self, ids):
+        for doc_id in ids:
+            self.records.pop(doc_id, None)
+        return len(ids)
+
+def _words(seed, count):
+    rng = random.Random(seed)
+    vocabulary = ["router", "reset", "account", "billing", "press", "hold", "seconds", "light",
+                  "customer", "policy", "refund", "days", "contact", "support", "cable", "restart"]
+    return " ".join(rng.choice(vocabulary) for _ in range(count))
+
+def test_shared_block_yields_same_chunks_after_different_prefixes():
+    """Test that boundaries resynchronize, so a common block chunks identically."""
+    chunker = ContentDefinedChunker(min_chars=64, avg_chars=256, max_chars=1024)
+    footer = _words("footer", 800)
+
+    first = chunker.split(_words("a", 120) + " " + footer)
+    second = chunker.split(_words("b", 333) + " " + footer)
+
+    shared = set(first) & set(second)
+    assert len(shared) >= 3
+    assert sum(len(chunk) for chunk in shared) > len(footer) * 0.6
+
+def test_chunks_respect_size_bounds_and_word_boundaries():
+    """Test min/max lengths and that words are never split."""
+    chunker = ContentDefinedChunker(min_chars=64, avg_chars=256, max_chars=512)
+    text = _words("bounds", 2000)
+
+    chunks = chunker.split(text)
+
+    assert " ".join(chunks) == text
+    assert all(len(chunk) <= 512 for chunk in chunks)
+    assert all(len(chunk) >= 63 for chunk in chunks[:-1])
+
+def test_invalid_sizes_rejected():
+    """Test that chunk sizes must increase."""
+    with pytest.raises(ValueError):
+        ContentDefinedChunker(min_chars=512, avg_chars=256, max_chars=1024)
+
+def test_existing_chunks_are_referenced_not_re_embedded():
+    """Test that a chunk already stored only gets a reference added."""
+    store = InMemoryStore()
+    chunk_store = ChunkStore(store)
+    footer_id = shared_chunk_id(chunk_hash("Terms apply."))
+    footer = {"content": "Terms apply.", "metadata": {"source": "a.md"}}
+
+    chunk_store.store(
+        [chunk_reference("body-a", "a"), chunk_reference(footer_id, "a")],
+        [{"content": "A", "metadata": {"source": "a.md"}}, footer]
+    )
+    chunk_store.store(
+        [chunk_reference("body-b", "b"), chunk_reference(footer_id, "b"), chunk_reference(footer_id, "c")],
+        [{"content": "B", "metadata": {"source": "b.md"}}, footer, footer]
+    )
+
+    assert store.embedded == 3
+    assert store.records[footer_id]["metadata"][CHUNK_REFS_KEY] == 3
+    assert store.records[footer_id]["metadata"]["source"] == "a.md"
+    assert chunk_store.get_stats()["chunks_referenced"] == 2
+
+def test_shared_chunk_metadata_does_not_grow_with_references():
+    """Test that references live in the table, leaving the chunk a count and display metadata."""
+    store = InMemoryStore()
+    chunk_store = ChunkStore(store)
+    for index in range(50):
+        chunk_store.store(
+            [chunk_reference("footer", f"doc-{index}")],
+            [{"content": "F", "metadata": {"source": f"{index}.md"}}]
+        )
+
+    assert store.records["footer"]["metadata"] == {"source": "0.md", CHUNK_REFS_KEY: 50}
+    assert chunk_store.references.owners("footer")[:2] == ["doc-0", "doc-1"]
+
+def test_references_persist_next_to_the_collection(tmp_path):
+    """Test that a new ChunkStore on the same collection sees earlier references."""
+    store = InMemoryStore()
+    store.db_path, store.collection_name = str(tmp_path), "kb"
+    ChunkStore(store).store(
+        [chunk_reference("shared", "a"), chunk_reference("shared", "b")],
+        [{"content": "S", "metadata": {}}] * 2
+    )
+
+    reopened = ChunkStore(store)
+
+    assert reopened.release([chunk_reference("shared", "a")]) == 0
+    assert store.records["shared"]["metadata"][CHUNK_REFS_KEY] == 1
+    reopened.drop()
+    assert not (tmp_path / "kb.chunk_refs.sqlite").exists()
+
+def test_storing_a_reference_again_is_idempotent():
+    """Test that replaying a batch does not add references twice."""
+    store = InMemoryStore()
+    chunk_store = ChunkStore(store)
+    references = [chunk_reference("shared", "doc-1"), chunk_reference("shared", "doc-1")]
+    chunks = [{"content": "S", "metadata": {"source": "a.md"}}] * 2
+
+    chunk_store.store(references, chunks)
+    chunk_store.store(references, chunks)
+
+    assert store.records["shared"]["metadata"][CHUNK_REFS_KEY] == 1
+    assert chunk_store.release([chunk_reference("shared", "doc-1")]) == 1
+    assert store.records == {}
+
+def test_release_deletes_only_unreferenced_chunks():
+    """Test that a shared chunk survives until its last reference is released."""
+    store = InMemoryStore()
+    chunk_store = ChunkStore(store)
+    chunk_store.store(
+        [chunk_reference("shared", "a"), chunk_reference("shared", "b"), chunk_reference("own", "a")],
+        [{"content": "S", "metadata": {}}] * 2 + [{"content": "O", "metadata": {}}]
+    )
+
+    assert chunk_store.release([chunk_reference("shared", "a"), chunk_reference("own", "a")]) == 1
+    assert store.records["shared"]["metadata"][CHUNK_REFS_KEY] == 1
+    assert "own" not in store.records
+
+    assert chunk_store.release([chunk_reference("shared", "b"), chunk_reference("unknown", "b")]) == 1
+    assert store.records == {}
@@ -0,0 +1,71 @@
+from shared.knowledge_base.snippets import SNIPPET_LENGTH_KEY, render_snippet
+from shared.knowledge_base.compression import (
+    ContextCompressor,
+    split_sentences,
+    encode_offsets,
+    decode_offsets,
+    SENTENCE_OFFSETS_KEY
+)
+
+ARTICLE = (
+    "Welcome to the help center. We are glad you are here.\n"
+    "To reset your password, open Settings and choose Security. "
+    "Our offices are closed on public holidays. "
+    "Password resets expire after 24 hours!"
+)
+
+def test_split_sentences_offsets():
+    """Test that sentence spans slice back to trimmed sentences."""
+    spans = split_sentences(ARTICLE)
+    sentences = [ARTICLE[start:end] for start, end in spans]
+    
+    assert sentences[0] == "Welcome to the help center."
+    assert sentences[2] == "To reset your password, open Settings and choose Security."
+    assert sentences[-1] == "Password resets expire after 24 hours!"
+
+def test_offsets_round_trip():
+    """Test encoding and decoding of stored sentence offsets."""
+    spans = split_sentences(ARTICLE)
+    assert decode_offsets(encode_offsets(spans)) == spans
+    assert decode_offsets("") == []
+
+def test_compress_keeps_relevant_sentences():
+    """Test that only query-relevant sentences survive compression."""
+    compressor = ContextCompressor(min_overlap=0.3)
+    document = {
+        "content": ARTICLE,
+        "metadata": {SENTENCE_OFFSETS_KEY: encode_offsets(split_sentences(ARTICLE))}
+    }
+    
+    result = compressor.compress("How do I reset my password?", [document])[0]
+    
+    assert "reset your password" in result["content"]
+    assert "public holidays" not in result["content"]
+    assert result["original_length"] == len(ARTICLE)
+    assert document["content"] == ARTICLE
+
+def test_compressed_document_drops_stale_snippet_length():
+    """Test that a snippet length computed for the original text is not applied to the compressed one."""
+    compressor = ContextCompressor(min_overlap=0.3)
+    document = {
+        "content": ARTICLE,
+        "metadata": {
+            SENTENCE_OFFSETS_KEY: encode_offsets(split_sentences(ARTICLE)),
+            SNIPPET_LENGTH_KEY: 20,
+            "source": "faq.md"
+        }
+    }
+    
+    result = compressor.compress("How do I reset my password?", [document])[0]
+    
+    assert result["metadata"] == {"source": "faq.md"}
+    assert render_snippet(result["content"], result["metadata"]) == result["content"]
+
+def test_compress_keeps_best_sentence_without_overlap():
+    """Test that a document is never compressed to nothing."""
+    compressor = ContextCompressor(min_overlap=0.9)
+    document = {"content": ARTICLE, "metadata": {}}
+    
+    result = compressor.compress("holidays schedule", [document])[0]
+    
+    assert result["content"] == "Our offices are closed on public holidays."
@@ -0,0 +1,60 @@
+import pytest
+from shared.knowledge_base.dedup import (
+    NearDuplicateFilter,
+    simhash,
+    encode_simhash,
+    decode_simhash,
+    hamming_distance,
+    SIMHASH_KEY
+)
+
+ARTICLE = (
+    "To reset your password open the account settings page and choose the security tab. "
+    "Click reset password and follow the link we email to you. The link stays valid for one hour. "
+    "If the email does not arrive, check your spam folder and make sure the address on your "
+    "account is correct. Administrators can also trigger a reset for any member of their "
+    "workspace from the team management screen. For security reasons we never send passwords "
+    "in plain text and our support staff will never ask you for one."
+)
+EDITED = ARTICLE.replace("one hour", "sixty minutes")
+OTHER = (
+    "Shipping is free for orders over fifty dollars within the continental United States. "
+    "Orders usually leave our warehouse within two business days and arrive within a week. "
+    "Expedited shipping can be selected at checkout for an additional fee. International "
+    "orders may be subject to customs duties which are the responsibility of the recipient."
+)
+
+def _doc(doc_id, content):
+    return {"id": doc_id, "content": content, "metadata": {SIMHASH_KEY: encode_simhash(simhash(content))}}
+
+def test_simhash_similar_texts_are_close():
+    """Test that light edits keep signatures within a few bits."""
+    assert hamming_distance(simhash(ARTICLE), simhash(EDITED)) <= 5
+    assert hamming_distance(simhash(ARTICLE), simhash(OTHER)) > 10
+
+def test_encode_decode_round_trip():
+    """Test that signatures survive metadata encoding."""
+    signature = simhash(ARTICLE)
+    assert decode_simhash(encode_simhash(signature)) == signature
+    assert len(encode_simhash(signature)) == 16
+
+def test_filter_drops_lower_ranked_duplicates():
+    """Test that the higher-ranked copy is kept and the duplicate dropped."""
+    dedup = NearDuplicateFilter()
+    results = [_doc("a", ARTICLE), _doc("b", OTHER), _doc("c", EDITED)]
+    
+    kept = dedup.filter(results)
+    
+    assert [doc["id"] for doc in kept] == ["a", "b"]
+
+def test_filter_computes_missing_signatures():
+    """Test that documents ingested without a signature are still compared."""
+    dedup = NearDuplicateFilter()
+    results = [{"id": "a", "content": ARTICLE, "metadata": {}}, {"id": "b", "content": ARTICLE}]
+    
+    assert [doc["id"] for doc in dedup.filter(results)] == ["a"]
+
+def test_filter_requires_more_bands_than_distance():
+    """Test that an inexact band configuration is rejected."""
+    with pytest.raises(ValueError):
+        NearDuplicateFilter(max_distance=4, bands=4)
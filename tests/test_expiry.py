@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime, timezone
+from shared.knowledge_base.expiry import ExpirySchedule, parse_expiry, is_expired, EXPIRES_AT_KEY
+
+def test_parse_expiry_accepts_epoch_and_iso_timestamps():
+    """Test that numbers and ISO 8601 values become epoch seconds."""
+    expected = datetime(2026, 1, 31, 12, 0, tzinfo=timezone.utc).timestamp()
+
+    assert parse_expiry(expected) == expected
+    assert parse_expiry("2026-01-31T12:00:00Z") == expected
+    assert parse_expiry("2026-01-31T14:00:00+02:00") == expected
+    assert parse_expiry("2026-01-31T12:00:00") == expected
+
+def test_parse_expiry_rejects_invalid_values():
+    """Test that malformed expiries raise ValueError."""
+    for value in ("next tuesday", True, ["2026-01-01"]):
+        with pytest.raises(ValueError):
+            parse_expiry(value)
+
+def test_is_expired_checks_stored_epoch():
+    """Test expiry of stored metadata relative to a reference time."""
+    assert is_expired({EXPIRES_AT_KEY: 100.0}, now=100.0)
+    assert not is_expired({EXPIRES_AT_KEY: 101.0}, now=100.0)
+    assert not is_expired({}, now=100.0)
+    assert not is_expired(None)
+
+def test_schedule_pops_due_entries_earliest_first():
+    """Test that only due entries are popped, in expiry order and up to the limit."""
+    schedule = ExpirySchedule()
+    schedule.schedule("late", 300.0)
+    schedule.schedule("first", 100.0)
+    schedule.schedule("second", 200.0)
+
+    assert schedule.pop_due(now=250.0, limit=1) == [(100.0, "first")]
+    assert schedule.pop_due(now=250.0) == [(200.0, "second")]
+    assert schedule.next_expiry() == 300.0
+    assert len(schedule) == 1
+
+def test_restore_puts_entries_back():
+    """Test that entries of a failed purge can be rescheduled."""
+    schedule = ExpirySchedule()
+    schedule.schedule("doc", 100.0)
+    due = schedule.pop_due(now=100.0)
+
+    schedule.restore(due)
+
+    assert schedule.pop_due(now=100.0) == [(100.0, "doc")]
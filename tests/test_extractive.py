@@ -0,0 +1,72 @@
+from shared.knowledge_base.extractive import ExtractiveAnswerer
+
+CONTEXT = [
+    {
+        "id": "hours",
+        "content": (
+            "Our support team is available around the clock. "
+            "Business hours are Monday to Friday, 9am to 5pm Eastern. "
+            "Weekend requests are answered on Monday."
+        ),
+        "metadata": {"source": "hours.md"}
+    },
+    {
+        "id": "billing",
+        "content": "Invoices are emailed on the first business day of each month.",
+        "metadata": {"source": "billing.md"}
+    }
+]
+
+def test_extract_returns_best_sentence():
+    """Test that the highest scoring sentence is returned with its source."""
+    answerer = ExtractiveAnswerer(max_span_sentences=1)
+    
+    answer = answerer.extract("What are your business hours?", CONTEXT)
+    
+    assert answer["text"] == "Business hours are Monday to Friday, 9am to 5pm Eastern."
+    assert answer["source"] == "hours.md"
+    assert answer["document_id"] == "hours"
+    assert answer["confidence"] == 1.0
+    assert answerer.is_confident(answer)
+
+def test_extract_low_confidence_for_partial_match():
+    """Test that partially covered queries fall below the confidence bar."""
+    answerer = ExtractiveAnswerer(min_confidence=0.75)
+    
+    answer = answerer.extract("Can I pay invoices with bitcoin cryptocurrency?", CONTEXT)
+    
+    assert answer is not None
+    assert answer["confidence"] < 0.75
+    assert not answerer.is_confident(answer)
+
+def test_extract_nothing_to_score():
+    """Test that queries without overlap or context yield no answer."""
+    answerer = ExtractiveAnswerer()
+    
+    assert answerer.extract("zebra", CONTEXT) is None
+    assert answerer.extract("business hours", []) is None
+    assert not answerer.is_confident(None)
+
+def test_extract_skips_the_question_line_of_faq_articles():
+    """Test that an article's question or title is not returned as its own answer."""
+    answerer = ExtractiveAnswerer()
+    faq = [
+        {"id": "refunds", "content": "What is your refund policy?\nYou can get your money back within 30 days."},
+        {"id": "email", "content": "Q: How do I change my email address?\nA: Go to Settings and edit your profile."},
+        {"id": "titled", "content": "Shipping Times\nOrders ship within two business days."}
+    ]
+    
+    refund = answerer.extract("What is your refund policy?", faq)
+    email = answerer.extract("How do I change my email address?", faq)
+    shipping = answerer.extract("shipping times", faq)
+    
+    assert refund["text"] == "You can get your money back within 30 days."
+    assert email["text"] == "Go to Settings and edit your profile."
+    assert shipping["text"] == "Orders ship within two business days."
+    assert answerer.is_confident(refund) and answerer.is_confident(email)
+
+def test_extract_ignores_a_question_without_answer():
+    """Test that a context holding only the query itself yields no answer."""
+    answerer = ExtractiveAnswerer()
+    
+    assert answerer.extract("What is your refund policy?", [{"content": "What is your refund policy?"}]) is None
@@ -0,0 +1,107 @@
+import threading
+import time
+import pytest
+from shared.knowledge_base.jobs import IngestionJobQueue, JobQueueFullError, IngestionJobError
+
+def _wait_for(job_queue, job_id, statuses=("completed", "failed", "cancelled"), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = job_queue.get(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def _ingest(batch, validate):
+    return {"successful": len(batch), "failed": 0, "document_ids": [doc["content"] for doc in batch]}
+
+def test_job_processes_documents_in_batches():
+    """Test that a job reports progress and IDs for every batch."""
+    calls = []
+    def ingest(batch, validate):
+        calls.append(len(batch))
+        return _ingest(batch, validate)
+    job_queue = IngestionJobQueue(ingest, batch_size=2)
+    
+    job_id = job_queue.submit([{"content": str(i)} for i in range(5)])
+    job = _wait_for(job_queue, job_id)
+    
+    assert job["status"] == "completed"
+    assert job["progress"] == 1.0
+    assert job["document_ids"] == ["0", "1", "2", "3", "4"]
+    assert calls == [2, 2, 1]
+    job_queue.shutdown()
+
+def test_failed_batch_is_recorded_and_others_continue():
+    """Test that one failing batch does not abort the rest of the job."""
+    def ingest(batch, validate):
+        if batch[0]["content"] == "bad":
+            raise Exception("store offline")
+        return _ingest(batch, validate)
+    job_queue = IngestionJobQueue(ingest, batch_size=1)
+    
+    job = _wait_for(job_queue, job_queue.submit([{"content": "bad"}, {"content": "ok"}]))
+    
+    assert job["status"] == "completed"
+    assert job["successful"] == 1
+    assert job["failed"] == 1
+    assert job["errors"] == [{"offset": 0, "count": 1, "error": "store offline"}]
+    job_queue.shutdown()
+
+def test_full_queue_rejects_submission():
+    """Test backpressure: a full queue rejects, or blocks until the timeout."""
+    release = threading.Event()
+    started = threading.Event()
+    def ingest(batch, validate):
+        started.set()
+        release.wait(5)
+        return _ingest(batch, validate)
+    job_queue = IngestionJobQueue(ingest, max_queued=1, workers=1)
+    
+    running = job_queue.submit([{"content": "a"}])
+    started.wait(5)
+    queued = job_queue.submit([{"content": "b"}])
+    with pytest.raises(JobQueueFullError):
+        job_queue.submit([{"content": "c"}])
+    with pytest.raises(JobQueueFullError):
+        job_queue.submit([{"content": "c"}], block=True, timeout=0.05)
+    assert job_queue.cancel(queued) is True
+    
+    release.set()
+    assert _wait_for(job_queue, running)["status"] == "completed"
+    assert _wait_for(job_queue, queued)["status"] == "cancelled"
+    job_queue.shutdown()
+    with pytest.raises(IngestionJobError):
+        job_queue.submit([{"content": "d"}])
+
+def test_finished_jobs_are_bounded():
+    """Test that only the most recent finished jobs are kept."""
+    job_queue = IngestionJobQueue(_ingest, workers=1, max_finished=2)
+    
+    job_ids = [job_queue.submit([{"content": str(i)}], block=True) for i in range(4)]
+    _wait_for(job_queue, job_ids[-1])
+    
+    assert job_queue.get(job_ids[0]) is None
+    assert job_queue.get(job_ids[-1])["status"] == "completed"
+    job_queue.shutdown()
+
+def test_shutdown_without_wait_does_not_block_on_a_full_queue():
+    """Test that shutdown(wait=False) returns while jobs still fill the queue."""
+    release = threading.Event()
+    started = threading.Event()
+    def ingest(batch, validate):
+        started.set()
+        release.wait(5)
+        return _ingest(batch, validate)
+    job_queue = IngestionJobQueue(ingest, max_queued=2, workers=1)
+    running = job_queue.submit([{"content": "a"}])
+    started.wait(5)
+    queued = [job_queue.submit([{"content": "b"}]), job_queue.submit([{"content": "c"}])]
+    
+    start = time.monotonic()
+    job_queue.shutdown(wait=False)
+    
+    assert time.monotonic() - start < 0.5
+    release.set()
+    for job_id in [running] + queued:
+        assert _wait_for(job_queue, job_id)["status"] == "completed"
@@ -0,0 +1,51 @@
+import pytest
+from shared.knowledge_base.journal import IngestJournal, JournalError, document_hash
+
+def test_journal_replays_committed_and_pending_batches(tmp_path):
+    """Test that a reopened journal knows which batches are committed."""
+    path = tmp_path / "ingest.journal"
+    journal = IngestJournal(str(path))
+    run_id = journal.begin(batch_size=2)
+    journal.record_intent(0, ["a", "b"])
+    journal.record_commit(0, ["a", "b"])
+    journal.record_intent(2, ["c", "d"])
+    journal.close()
+    
+    reopened = IngestJournal(str(path))
+    
+    assert reopened.resumed is True
+    assert reopened.begin(batch_size=10) == run_id
+    assert reopened.batch_size == 2
+    assert reopened.check_batch(0, ["a", "b"]) is True
+    assert reopened.check_batch(2, ["c", "d"]) is False
+
+def test_journal_ignores_torn_final_line(tmp_path):
+    """Test that a partially written last record is ignored and repaired."""
+    path = tmp_path / "ingest.journal"
+    journal = IngestJournal(str(path))
+    journal.begin(batch_size=1)
+    journal.record_commit(0, ["a"])
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "commit", "off')
+    
+    reopened = IngestJournal(str(path))
+    reopened.record_commit(1, ["b"])
+    reopened.close()
+    
+    assert IngestJournal(str(path)).check_batch(1, ["b"]) is True
+
+def test_journal_detects_changed_input(tmp_path):
+    """Test that resuming with different documents is refused."""
+    journal = IngestJournal(str(tmp_path / "ingest.journal"))
+    journal.begin(batch_size=1)
+    journal.record_commit(0, ["a"])
+    
+    with pytest.raises(JournalError):
+        journal.check_batch(0, ["z"])
+    journal.close()
+
+def test_document_hash_is_stable():
+    """Test that hashing ignores key order."""
+    assert document_hash({"content": "x", "metadata": {"a": 1, "b": 2}}) == \
+        document_hash({"metadata": {"b": 2, "a": 1}, "content": "x"})
@@ -0,0 +1,131 @@
+import json
+import logging
+import sys
+import pytest
+from unittest.mock import MagicMock, patch
+from shared.knowledge_base.__main__ import main
+from shared.knowledge_base.kb_manager import KnowledgeBaseManager
+from shared.knowledge_base.rag_pipeline import LatencyHistogram
+
+@pytest.fixture
+def manager():
+    config = MagicMock()
+    config.env = {}
+    vector_store = MagicMock()
+    vector_store.add_documents.side_effect = lambda docs, ids=None: ids or [f"id-{i}" for i in range(len(docs))]
+    vector_store.get_collection_info.return_value = {"name": "kb", "document_count": 2}
+    rag_pipeline = MagicMock()
+    rag_pipeline.query.return_value = {"context": [], "context_count": 0}
+    rag_pipeline.get_stage_latency.return_value = {"total": LatencyHistogram().summary()}
+    kb = KnowledgeBaseManager(config, vector_store, rag_pipeline, logger=MagicMock())
+    yield kb
+    kb.close()
+
+def test_import_streams_jsonl_and_reports_throughput(manager, tmp_path, capsys):
+    """Test that import goes through ingest_jsonl and prints docs/s."""
+    source = tmp_path / "kb.jsonl"
+    source.write_text('{"content": "Reset via settings."}\nnot json\n{"content": "Refunds in 30 days."}\n')
+
+    status = main(["import", str(source), "--batch-size", "1"], manager=manager)
+
+    output = capsys.readouterr().out
+    assert status == 0
+    assert "Imported 2 documents from 3 lines (1 invalid)" in output
+    assert "docs/s" in output
+    assert manager.vector_store.add_documents.call_count == 2
+
+def test_export_writes_jsonl_without_derived_metadata(manager, tmp_path, capsys):
+    """Test that export pages through the store and drops ingest-time keys."""
+    manager.vector_store.iter_documents.return_value = iter([
+        [{"id": "a", "content": "One.", "metadata": {"source": "faq.md", "simhash": "ff"}}],
+        [{"id": "b", "content": "Two.", "metadata": {}}]
+    ])
+    target = tmp_path / "out.jsonl"
+
+    status = main(["export", str(target), "--batch-size", "1"], manager=manager)
+
+    lines = [json.loads(line) for line in target.read_text().splitlines()]
+    assert status == 0
+    assert lines == [
+        {"content": "One.", "metadata": {"source": "faq.md"}},
+        {"content": "Two.", "metadata": {}}
+    ]
+    manager.vector_store.iter_documents.assert_called_once_with(batch_size=1)
+    assert "Exported 2 documents" in capsys.readouterr().out
+
+def test_ingest_reports_failure_for_missing_directory(manager, tmp_path, capsys):
+    """Test that command errors go to stderr with a non-zero status."""
+    status = main(["ingest", str(tmp_path / "missing")], manager=manager)
+
+    assert status == 1
+    assert "Directory not found" in capsys.readouterr().err
+
+def test_query_prints_answer_and_latency(manager, capsys):
+    """Test the query command in plain and streaming mode."""
+    manager.rag_pipeline.query.return_value = {
+        "context": [{"content": "Use the reset link.", "metadata": {"source": "faq"}}],
+        "context_count": 1
+    }
+
+    assert main(["query", "reset password"], manager=manager) == 0
+    assert main(["query", "reset password", "--stream"], manager=manager) == 0
+
+    output = capsys.readouterr().out
+    assert output.count("Use the reset link.") == 2
+    assert "first fragment" in output
+
+def test_bench_reports_percentiles_without_counting_queries(manager, tmp_path, capsys):
+    """Test that bench runs every query per iteration and reports latency."""
+    queries = tmp_path / "queries.txt"
+    queries.write_text("reset password\n\nrefund policy\n")
+
+    status = main(
+        ["--json", "bench", "--queries", str(queries), "--iterations", "2", "--concurrency", "2"],
+        manager=manager
+    )
+
+    result = json.loads(capsys.readouterr().out)
+    assert status == 0
+    assert result["queries"] == 4
+    assert result["latency_ms"]["count"] == 4
+    assert result["latency_ms"]["p95_ms"] is not None
+    assert manager.rag_pipeline.query.call_count == 4
+    assert manager.stats["total_queries"] == 0
+
+def test_stats_prints_collection_summary(manager, capsys):
+    """Test the stats command."""
+    assert main(["stats"], manager=manager) == 0
+
+    assert "Collection: kb (2 documents)" in capsys.readouterr().out
+
+def test_export_to_stdout_keeps_logs_out_of_the_stream(manager, capsys):
+    """Test that `export -` writes only JSONL to stdout, with logs going to stderr."""
+    platform_logger = logging.getLogger("trivya")
+    handler = logging.StreamHandler(sys.stdout)
+    platform_logger.addHandler(handler)
+    previous_level = platform_logger.level
+    platform_logger.setLevel(logging.INFO)
+    manager.logger = logging.getLogger("trivya.KnowledgeBaseManager")
+    manager.vector_store.iter_documents.return_value = iter([
+        [{"id": "a", "content": "One.", "metadata": {"source": "faq.md"}}]
+    ])
+    try:
+        status = main(["export", "-"], manager=manager)
+    finally:
+        platform_logger.removeHandler(handler)
+        platform_logger.setLevel(previous_level)
+    
+    captured = capsys.readouterr()
+    assert status == 0
+    assert [json.loads(line) for line in captured.out.splitlines()] == [
+        {"content": "One.", "metadata": {"source": "faq.md"}}
+    ]
+    assert "JSONL export completed" in captured.err
+
+def test_configuration_error_exits_without_traceback(capsys):
+    """Test that errors building the manager map to exit status 1."""
+    with patch("shared.knowledge_base.__main__.build_manager", side_effect=ValueError("Unsupported VECTOR_DB_TYPE: x")):
+        status = main(["stats"])
+    
+    assert status == 1
+    assert "Unsupported VECTOR_DB_TYPE" in capsys.readouterr().err
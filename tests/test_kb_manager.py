@@ -1,5 +1,6 @@
+import threading
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from shared.knowledge_base.kb_manager import KnowledgeBaseManager, KnowledgeBaseError
 from shared.core_functions.config import Config
 
@@ -147,7 +148,8 @@ def test_search(kb_manager, mock_rag_pipeline):
     mock_rag_pipeline.query.assert_called_once_with(
         user_query="test query",
         top_k=3,
-        system_instruction=None
+        system_instruction=None,
+        session_id=None
     )
 
 def test_search_with_system_instruction(kb_manager, mock_rag_pipeline):
@@ -164,7 +166,8 @@ def test_search_with_system_instruction(kb_manager, mock_rag_pipeline):
     mock_rag_pipeline.query.assert_called_with(
         user_query="test",
         top_k=5,
-        system_instruction="Be helpful"
+        system_instruction="Be helpful",
+        session_id=None
     )
 
 def test_get_stats(kb_manager, mock_vector_store, mock_rag_pipeline):
@@ -194,3 +197,746 @@ def test_health_check_unhealthy(kb_manager, mock_vector_store):
     
     assert health["status"] == "unhealthy"
     assert "error" in health
+
+def test_ingest_documents_stores_sentence_offsets(kb_manager, mock_vector_store):
+    """Test that sentence offsets are precomputed into metadata at ingest."""
+    mock_vector_store.add_documents.return_value = ["id1"]
+    document = {"content": "First sentence. Second one.", "metadata": {"source": "a.txt"}}
+    
+    kb_manager.ingest_documents([document])
+    
+    stored = mock_vector_store.add_documents.call_args[0][0][0]
+    assert stored["metadata"]["sentence_offsets"] == "0:15,16:27"
+    assert stored["metadata"]["source"] == "a.txt"
+    assert "sentence_offsets" not in document["metadata"]
+
+def test_ingest_documents_stores_simhash(kb_manager, mock_vector_store):
+    """Test that a SimHash signature is stored in metadata at ingest."""
+    mock_vector_store.add_documents.return_value = ["id1"]
+    
+    kb_manager.ingest_documents([{"content": "Reset your password from settings.", "metadata": {}}])
+    
+    stored = mock_vector_store.add_documents.call_args[0][0][0]
+    assert len(stored["metadata"]["simhash"]) == 16
+
+def test_ingest_documents_normalizes_content(kb_manager, mock_vector_store):
+    """Test that content is normalized and a snippet length stored at ingest."""
+    mock_vector_store.add_documents.return_value = ["id1"]
+    
+    kb_manager.ingest_documents([{"content": "Reset  your\tpassword.\n\nBack to top", "metadata": {}}])
+    
+    stored = mock_vector_store.add_documents.call_args[0][0][0]
+    assert stored["content"] == "Reset your password."
+    assert stored["metadata"]["snippet_length"] == len("Reset your password.")
+
+def test_query_stream_matches_query(kb_manager, mock_rag_pipeline):
+    """Test that streamed fragments join into the same text as query()."""
+    import asyncio
+    mock_rag_pipeline.query.return_value = {
+        "query": "hours",
+        "prompt": "prompt",
+        "context": [
+            {"content": "Open 9-5.", "metadata": {"source": "hours.md"}},
+            {"content": "Closed Sundays.", "metadata": {"source": "holidays.md"}}
+        ],
+        "context_count": 2
+    }
+    
+    async def _collect():
+        return [fragment async for fragment in kb_manager.query_stream("hours")]
+    
+    fragments = asyncio.run(_collect())
+    
+    assert fragments[0] == "Based on the knowledge base, here's what we found:\n"
+    assert "".join(fragments) == kb_manager.query("hours")
+
+def test_ingest_directory_reports_per_file_outcomes(kb_manager, mock_vector_store, tmp_path):
+    """Test that a directory is parsed in parallel and written in batches."""
+    (tmp_path / "guides").mkdir()
+    (tmp_path / "guides" / "reset.md").write_text("# Reset\nOpen settings.", encoding="utf-8")
+    (tmp_path / "faq.csv").write_text("answer\nOpen 9-5.\nCall us.\n", encoding="utf-8")
+    (tmp_path / "broken.jsonl").write_text("not json\n", encoding="utf-8")
+    (tmp_path / "empty.txt").write_text("   ", encoding="utf-8")
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "skip.txt").write_text("Skip me", encoding="utf-8")
+    mock_vector_store.add_documents.side_effect = lambda docs: [f"id{i}" for i in range(len(docs))]
+    
+    result = kb_manager.ingest_directory(str(tmp_path), workers=2, batch_size=2)
+    
+    outcomes = {outcome["path"]: outcome for outcome in result["outcomes"]}
+    assert set(outcomes) == {"broken.jsonl", "empty.txt", "faq.csv", "guides/reset.md"}
+    assert outcomes["faq.csv"]["status"] == "ingested"
+    assert len(outcomes["faq.csv"]["document_ids"]) == 2
+    assert outcomes["guides/reset.md"]["status"] == "ingested"
+    assert outcomes["broken.jsonl"]["status"] == "failed"
+    assert outcomes["empty.txt"]["status"] == "empty"
+    assert outcomes["empty.txt"]["invalid"] == 1
+    assert result["documents"] == 3
+    assert result["success"] is False
+    assert result["throughput"]["documents_per_second"] > 0
+    assert all(len(call[0][0]) <= 2 for call in mock_vector_store.add_documents.call_args_list)
+    assert kb_manager.stats["total_documents"] == 3
+
+def test_ingest_directory_missing_path(kb_manager, tmp_path):
+    """Test that a missing directory raises KnowledgeBaseError."""
+    with pytest.raises(KnowledgeBaseError):
+        kb_manager.ingest_directory(str(tmp_path / "missing"))
+
+def test_sync_directory_only_touches_changes(kb_manager, mock_vector_store, tmp_path):
+    """Test that a re-sync re-ingests changed files and deletes removed ones."""
+    import os
+    counter = iter(range(1000))
+    mock_vector_store.add_documents.side_effect = lambda docs: [f"id{next(counter)}" for _ in docs]
+    (tmp_path / "keep.md").write_text("Keep this article.", encoding="utf-8")
+    (tmp_path / "edit.md").write_text("Old answer.", encoding="utf-8")
+    (tmp_path / "drop.md").write_text("Outdated article.", encoding="utf-8")
+    (tmp_path / "touch.md").write_text("Same content.", encoding="utf-8")
+    
+    first = kb_manager.sync_directory(str(tmp_path))
+    assert sorted(first["added"]) == ["drop.md", "edit.md", "keep.md", "touch.md"]
+    assert (tmp_path / ".kb_manifest.json").exists()
+    
+    (tmp_path / "edit.md").write_text("New, longer answer.", encoding="utf-8")
+    (tmp_path / "drop.md").unlink()
+    (tmp_path / "new.md").write_text("Brand new article.", encoding="utf-8")
+    stat = (tmp_path / "touch.md").stat()
+    os.utime(tmp_path / "touch.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    mock_vector_store.add_documents.reset_mock()
+    
+    second = kb_manager.sync_directory(str(tmp_path))
+    
+    assert second["added"] == ["new.md"]
+    assert second["updated"] == ["edit.md"]
+    assert second["removed"] == ["drop.md"]
+    assert second["unchanged"] == 2
+    assert second["documents_deleted"] == 2
+    assert mock_vector_store.add_documents.call_count == 1
+    deleted = mock_vector_store.delete_documents.call_args[0][0]
+    assert len(deleted) == 2
+    
+    third = kb_manager.sync_directory(str(tmp_path))
+    assert third["added"] == third["updated"] == third["removed"] == []
+    assert third["unchanged"] == 4
+
+def test_sync_directory_retries_failed_deletes(kb_manager, mock_vector_store, tmp_path):
+    """Test that deletes that fail are kept in the manifest for the next sync."""
+    mock_vector_store.add_documents.return_value = ["id1"]
+    (tmp_path / "a.txt").write_text("Article.", encoding="utf-8")
+    kb_manager.sync_directory(str(tmp_path))
+    (tmp_path / "a.txt").unlink()
+    mock_vector_store.delete_documents.side_effect = Exception("store offline")
+    
+    result = kb_manager.sync_directory(str(tmp_path))
+    
+    assert result["pending_deletes"] == 1
+    assert result["success"] is False
+    mock_vector_store.delete_documents.side_effect = None
+    assert kb_manager.sync_directory(str(tmp_path))["documents_deleted"] == 1
+    mock_vector_store.delete_documents.assert_called_with(["id1"])
+
+def test_ingestion_job_runs_in_background(kb_manager, mock_vector_store):
+    """Test that submitted documents are ingested by a background job."""
+    import time
+    mock_vector_store.add_documents.side_effect = lambda docs: [f"id{i}" for i in range(len(docs))]
+    
+    job_id = kb_manager.submit_ingestion_job([
+        {"content": "First article.", "metadata": {}},
+        {"content": "", "metadata": {}}
+    ])
+    deadline = time.monotonic() + 5
+    while kb_manager.get_ingestion_job(job_id)["status"] != "completed" and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    job = kb_manager.get_ingestion_job(job_id)
+    assert job["status"] == "completed"
+    assert job["successful"] == 1
+    assert job["failed"] == 1
+    assert kb_manager.get_stats()["ingestion_jobs"]["jobs"] == {"completed": 1}
+    kb_manager.jobs.shutdown()
+
+def test_ingestion_job_rejection_raises(mock_config, mock_vector_store, mock_rag_pipeline):
+    """Test that a rejected job surfaces as KnowledgeBaseError."""
+    manager = KnowledgeBaseManager(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        rag_pipeline=mock_rag_pipeline,
+        job_queue_size=1
+    )
+    manager.jobs.shutdown()
+    
+    with pytest.raises(KnowledgeBaseError):
+        manager.submit_ingestion_job([{"content": "Doc"}])
+
+def test_bulk_ingest_resumes_after_crash(kb_manager, mock_vector_store, tmp_path):
+    """Test that a rerun skips committed batches and reuses IDs for the rest."""
+    journal_path = str(tmp_path / "bulk.journal")
+    documents = [{"content": f"Article {i}.", "metadata": {}} for i in range(5)]
+    writes = []
+    def add_documents(docs, ids=None):
+        if len(writes) == 1:
+            writes.append(None)
+            raise Exception("process killed")
+        writes.append(ids)
+        return ids
+    mock_vector_store.add_documents.side_effect = add_documents
+    
+    with pytest.raises(KnowledgeBaseError):
+        kb_manager.bulk_ingest(documents, journal_path, batch_size=2)
+    
+    result = kb_manager.bulk_ingest(iter(documents), journal_path, batch_size=50)
+    
+    run_id = result["run_id"]
+    assert writes[0] == [f"{run_id}-0", f"{run_id}-1"]
+    assert writes[2:] == [[f"{run_id}-2", f"{run_id}-3"], [f"{run_id}-4"]]
+    assert result["resumed"] is True
+    assert result["skipped_batches"] == 1
+    assert result["successful"] == 3
+
+def test_bulk_ingest_rejects_changed_input(kb_manager, mock_vector_store, tmp_path):
+    """Test that a journal cannot be resumed with different documents."""
+    journal_path = str(tmp_path / "bulk.journal")
+    mock_vector_store.add_documents.side_effect = lambda docs, ids=None: ids
+    kb_manager.bulk_ingest([{"content": "One."}], journal_path)
+    
+    with pytest.raises(KnowledgeBaseError, match="differs"):
+        kb_manager.bulk_ingest([{"content": "Two."}], journal_path)
+
+def test_ingest_jsonl_streams_batches_with_line_errors(kb_manager, mock_vector_store, tmp_path):
+    """Test that JSONL is ingested in batches and bad lines are reported."""
+    path = tmp_path / "export.jsonl"
+    path.write_text(
+        '{"content": "First.", "metadata": {"category": "a"}}\n'
+        'not json\n'
+        '\n'
+        '{"content": ""}\n'
+        '{"content": "Second."}\n'
+        '{"content": "Third."}\n',
+        encoding="utf-8"
+    )
+    batches = []
+    mock_vector_store.add_documents.side_effect = lambda docs: batches.append(docs) or ["id"] * len(docs)
+    
+    result = kb_manager.ingest_jsonl(str(path), batch_size=2)
+    
+    assert result["successful"] == 3
+    assert result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [2, 4]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert batches[0][0]["metadata"]["source"] == "export.jsonl"
+    assert batches[0][0]["metadata"]["category"] == "a"
+    assert batches[0][1]["metadata"]["line"] == 5
+
+def test_ingest_jsonl_reports_nested_metadata_per_line(kb_manager, mock_vector_store):
+    """Test that a line with unstorable metadata is skipped instead of failing the batch."""
+    import io
+    mock_vector_store.add_documents.side_effect = lambda docs: ["id"] * len(docs)
+    
+    result = kb_manager.ingest_jsonl(io.StringIO(
+        '{"content": "One.", "metadata": {"author": {"name": "Ann"}}}\n{"content": "Two."}\n'
+    ))
+    
+    assert result["successful"] == 1
+    assert result["errors"] == [{
+        "line": 1,
+        "error": "Metadata 'author' must be a string, number, boolean or non-empty list of those"
+    }]
+
+def test_validate_document_rejects_nested_metadata(kb_manager):
+    """Test that documents with metadata the store cannot hold fail validation."""
+    assert not kb_manager.validate_document({"content": "Hi", "metadata": {"author": {"name": "Ann"}}})
+    assert kb_manager.validate_document({"content": "Hi", "metadata": {"tags": ["a"]}})
+
+def test_ingest_jsonl_accepts_binary_stream(kb_manager, mock_vector_store):
+    """Test that an open binary stream can be ingested."""
+    import io
+    mock_vector_store.add_documents.side_effect = lambda docs: ["id"] * len(docs)
+    
+    result = kb_manager.ingest_jsonl(io.BytesIO(b'{"content": "One."}\n{"content": "Two."}'))
+    
+    assert result["successful"] == 2
+    assert result["lines"] == 2
+
+def test_warm_up_runs_queries_and_flips_ready(kb_manager, mock_rag_pipeline):
+    """Test that warm-up exercises the search path and then marks readiness."""
+    assert kb_manager.ready is False
+    mock_rag_pipeline.query.side_effect = [{"context_count": 1}, Exception("timeout")]
+    
+    report = kb_manager.warm_up(queries=["hours?", "refunds?"])
+    
+    assert report["ready"] is True
+    assert report["failed"] == 1
+    assert report["document_count"] == 5
+    assert len(report["query_latency_ms"]) == 2
+    assert report["duration_ms"] >= 0
+    assert kb_manager.ready is True
+    assert kb_manager.health_check()["ready"] is True
+    assert kb_manager.stats["total_queries"] == 0
+    mock_rag_pipeline.query.assert_any_call(user_query="hours?", top_k=5)
+
+def test_warm_up_not_ready_when_collection_fails(kb_manager, mock_vector_store):
+    """Test that readiness stays off if the collection cannot be loaded."""
+    mock_vector_store.get_collection_info.side_effect = Exception("store offline")
+    
+    report = kb_manager.warm_up(queries=[])
+    
+    assert report["ready"] is False
+    assert kb_manager.ready is False
+
+def test_query_analytics_in_stats(kb_manager, mock_rag_pipeline):
+    """Test that searches and escalations feed the analytics in get_stats."""
+    mock_rag_pipeline.query.return_value = {"query": "q", "prompt": "p", "context": [], "context_count": 0}
+    
+    kb_manager.search("What are your hours?")
+    kb_manager.search("what are your hours")
+    kb_manager.record_escalation("Can I pay in gold?")
+    
+    analytics = kb_manager.get_stats()["query_analytics"]
+    assert analytics["top_queries"] == [{"query": "what are your hours", "count": 2}]
+    assert analytics["top_unanswered"] == [{"query": "can i pay in gold", "count": 1}]
+
+def test_streamed_llm_queries_feed_analytics(kb_manager, mock_rag_pipeline):
+    """Test that queries answered through an LLM stream are counted like searches."""
+    import asyncio
+    
+    async def _stream(*args, **kwargs):
+        yield "Open 9-5."
+    mock_rag_pipeline.query_stream.side_effect = _stream
+    
+    async def _collect():
+        return [fragment async for fragment in kb_manager.query_stream("What are your hours?", llm_client=MagicMock())]
+    
+    assert asyncio.run(_collect()) == ["Open 9-5."]
+    assert kb_manager.get_stats()["query_analytics"]["top_queries"] == [
+        {"query": "what are your hours", "count": 1}
+    ]
+
+def _shadow_store(count, search_results):
+    shadow = MagicMock()
+    shadow.collection_name = "test_collection__new"
+    shadow.get_collection_info.return_value = {"document_count": count}
+    shadow.similarity_search.return_value = search_results
+    return shadow
+
+def test_rebuild_swaps_to_validated_collection(kb_manager, mock_vector_store, mock_rag_pipeline):
+    """Test that a validated rebuild switches every reference and drops the old collection."""
+    mock_vector_store.base_collection_name = "test_collection"
+    shadow = _shadow_store(2, [{"content": "Hit"}])
+    mock_vector_store.for_collection.return_value = shadow
+    
+    status = kb_manager.rebuild(
+        [{"content": "One."}, {"content": "Two."}, {"content": ""}],
+        validation_queries=["hours?"],
+        drop_delay=0
+    )
+    
+    assert status["status"] == "completed"
+    assert status["documents"] == 2
+    assert status["invalid"] == 1
+    assert mock_vector_store.for_collection.call_args[0][0].startswith("test_collection__")
+    assert kb_manager.vector_store is shadow
+    assert mock_rag_pipeline.vector_store is shadow
+    shadow.activate.assert_called_once()
+    mock_vector_store.drop_collection.assert_called_once()
+    assert kb_manager.stats["total_documents"] == 2
+
+def test_rebuild_rebinds_sources_and_replicas(kb_manager, mock_vector_store, mock_rag_pipeline):
+    """Test that federated sources and replicas on the old collection follow the swap."""
+    from shared.knowledge_base.rag_pipeline import RetrievalSource
+    mock_vector_store.collection_name = "test_collection"
+    mock_vector_store.db_path = "./kb_db"
+    shadow = _shadow_store(1, [{"content": "Hit"}])
+    mock_vector_store.for_collection.return_value = shadow
+    replica = MagicMock(collection_name="test_collection", db_path="./kb_db")
+    other = MagicMock(collection_name="faq", db_path="./kb_db")
+    # Same default collection name, but on another database
+    remote = MagicMock(collection_name="test_collection", db_path="./remote_db")
+    live_source = RetrievalSource("kb", mock_vector_store)
+    other_source = RetrievalSource("faq", other)
+    remote_source = RetrievalSource("remote", remote)
+    mock_rag_pipeline.sources = [live_source, other_source, remote_source]
+    mock_rag_pipeline.replicas = [replica, other]
+    
+    kb_manager.rebuild([{"content": "One."}], validation_queries=["hours?"], drop_delay=0)
+    
+    assert live_source.vector_store is shadow
+    assert other_source.vector_store is other
+    assert remote_source.vector_store is remote
+    remote.for_collection.assert_not_called()
+    replica.for_collection.assert_called_once_with("test_collection__new", create=False)
+    assert mock_rag_pipeline.replicas == [replica.for_collection.return_value, other]
+
+def test_rebuild_failed_validation_keeps_live_collection(kb_manager, mock_vector_store):
+    """Test that a collection failing validation is discarded and never served."""
+    shadow = _shadow_store(1, [])
+    mock_vector_store.for_collection.return_value = shadow
+    
+    with pytest.raises(KnowledgeBaseError, match="no results"):
+        kb_manager.rebuild([{"content": "One."}], validation_queries=["hours?"], drop_delay=0)
+    
+    assert kb_manager.vector_store is mock_vector_store
+    shadow.activate.assert_not_called()
+    shadow.drop_collection.assert_called_once()
+    mock_vector_store.drop_collection.assert_not_called()
+    assert kb_manager.get_rebuild_status()["status"] == "failed"
+
+def test_rebuild_in_background(kb_manager, mock_vector_store):
+    """Test that a background rebuild returns immediately and can be polled."""
+    import time
+    mock_vector_store.for_collection.return_value = _shadow_store(1, [{"content": "Hit"}])
+    
+    status = kb_manager.rebuild([{"content": "One."}], validation_queries=[], background=True, drop_delay=0)
+    deadline = time.monotonic() + 5
+    while kb_manager.get_rebuild_status()["status"] not in ("completed", "failed") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert status["status"] == "building"
+    assert kb_manager.get_rebuild_status()["status"] == "completed"
+
+def test_health_check_is_cached(kb_manager, mock_vector_store):
+    """Test that deep checks are reused within the cache interval."""
+    first = kb_manager.health_check()
+    second = kb_manager.health_check()
+    
+    assert first["cached"] is False
+    assert first["checks"]["test_query"] is True
+    assert second["cached"] is True
+    assert second["age_seconds"] >= 0
+    assert mock_vector_store.get_collection_info.call_count == 1
+    assert mock_vector_store.similarity_search.call_count == 1
+    assert kb_manager.health_check(force=True)["cached"] is False
+
+def test_health_check_test_query_timeout(mock_config, mock_vector_store, mock_rag_pipeline):
+    """Test that a hanging test query degrades health instead of blocking."""
+    import threading
+    release = threading.Event()
+    mock_vector_store.similarity_search.side_effect = lambda *args, **kwargs: release.wait(5)
+    manager = KnowledgeBaseManager(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        rag_pipeline=mock_rag_pipeline,
+        health_timeout=0.05
+    )
+    
+    health = manager.health_check()
+    retry = manager.health_check(force=True)
+    release.set()
+    
+    assert health["status"] == "degraded"
+    assert "timed out" in health["error"]
+    assert "still running" in retry["error"]
+    assert mock_vector_store.similarity_search.call_count == 1
+
+def test_liveness_does_not_touch_store(kb_manager, mock_vector_store):
+    """Test that liveness is served from cached state only."""
+    assert kb_manager.liveness()["last_check"] is None
+    kb_manager.health_check()
+    mock_vector_store.reset_mock()
+    
+    live = kb_manager.liveness()
+    
+    assert live["status"] == "alive"
+    assert live["last_check"]["status"] == "healthy"
+    assert live["last_check"]["age_seconds"] >= 0
+    assert mock_vector_store.method_calls == []
+
+def test_health_check_reports_readiness_separately(kb_manager):
+    """Test that deep and cached health agree with liveness on readiness without changing status."""
+    health = kb_manager.health_check()
+    assert (health["status"], health["ready"]) == ("healthy", False)
+    assert health["not_ready_reasons"] == ["warm_up_pending"]
+    
+    kb_manager.ready = True
+    assert kb_manager.health_check()["ready"] is True
+    
+    kb_manager.rebuild_status = {"status": "building"}
+    cached = kb_manager.health_check()
+    assert cached["cached"] is True
+    assert (cached["status"], cached["not_ready_reasons"]) == ("healthy", ["rebuilding"])
+    assert kb_manager.liveness()["not_ready_reasons"] == ["rebuilding"]
+    
+    kb_manager.rebuild_status = None
+    kb_manager.close()
+    cached = kb_manager.health_check()
+    assert cached["ready"] is False
+    assert kb_manager.liveness()["ready"] is False
+    assert kb_manager.liveness()["not_ready_reasons"] == ["closed"]
+
+def test_close_releases_background_threads(kb_manager, mock_rag_pipeline):
+    """Test that close stops ingestion workers and the pipeline pool."""
+    kb_manager.health_check(force=True)
+
+    kb_manager.close()
+
+    mock_rag_pipeline.close.assert_called_once()
+    assert kb_manager._health_executor is None
+    with pytest.raises(Exception):
+        kb_manager.submit_ingestion_job([{"content": "late"}])
+
+def test_ingest_normalizes_and_schedules_expiry(kb_manager, mock_vector_store):
+    """Test that expires_at is stored as epoch seconds and scheduled for purge."""
+    mock_vector_store.add_documents.return_value = ["promo", "policy"]
+    
+    kb_manager.ingest_documents([
+        {"content": "Spring sale.", "metadata": {"expires_at": "2020-01-01T00:00:00Z"}},
+        {"content": "Refund policy.", "metadata": {}}
+    ])
+    
+    stored = mock_vector_store.add_documents.call_args[0][0]
+    assert stored[0]["metadata"]["expires_at"] == 1577836800.0
+    assert "expires_at" not in stored[1]["metadata"]
+    assert len(kb_manager.expiry) == 1
+
+def test_invalid_expiry_fails_validation(kb_manager):
+    """Test that an unparseable expires_at rejects the document."""
+    assert not kb_manager.validate_document({"content": "Sale", "metadata": {"expires_at": "soon"}})
+
+def _stored_expiries(mock_vector_store, expiries):
+    """Make get_documents report the given {id: expires_at} as stored."""
+    mock_vector_store.get_documents.side_effect = lambda ids: [
+        {"id": doc_id, "metadata": {"expires_at": expiries[doc_id]}} for doc_id in ids if doc_id in expiries
+    ]
+    mock_vector_store.delete_documents.side_effect = lambda ids: len(ids)
+
+def test_purge_expired_deletes_due_documents_in_batches(kb_manager, mock_vector_store):
+    """Test that the purge visits only due entries, batch by batch."""
+    _stored_expiries(mock_vector_store, {"old-0": 100.0, "old-1": 101.0, "old-2": 102.0, "future": 500.0})
+    kb_manager.expiry_batch_size = 2
+    for index in range(3):
+        kb_manager.expiry.schedule(f"old-{index}", 100.0 + index)
+    kb_manager.expiry.schedule("future", 500.0)
+    
+    result = kb_manager.purge_expired(now=200.0)
+    
+    assert result["deleted"] == 3
+    assert result["scheduled"] == 1
+    assert [call.args[0] for call in mock_vector_store.delete_documents.call_args_list] == [
+        ["old-0", "old-1"], ["old-2"]
+    ]
+    assert kb_manager.stats["expired_documents"] == 3
+
+def test_failed_purge_reschedules_batch(kb_manager, mock_vector_store):
+    """Test that documents whose delete failed are purged on a later run."""
+    _stored_expiries(mock_vector_store, {"old": 100.0})
+    kb_manager.expiry.schedule("old", 100.0)
+    mock_vector_store.delete_documents.side_effect = [Exception("store offline"), 1]
+    
+    assert kb_manager.purge_expired(now=200.0)["success"] is False
+    assert kb_manager.purge_expired(now=200.0)["deleted"] == 1
+
+def test_purge_skips_deleted_and_rescheduled_documents(kb_manager, mock_vector_store):
+    """Test that only records still stored with the due expiry are deleted and counted."""
+    _stored_expiries(mock_vector_store, {"due": 100.0, "extended": 900.0})
+    kb_manager.expiry.schedule("due", 100.0)
+    kb_manager.expiry.schedule("gone", 100.0)
+    kb_manager.expiry.schedule("extended", 100.0)
+    
+    result = kb_manager.purge_expired(now=200.0)
+    
+    assert result["deleted"] == 1
+    mock_vector_store.delete_documents.assert_called_once_with(["due"])
+    assert kb_manager.stats["expired_documents"] == 1
+
+def test_background_purge_loads_existing_expirations(kb_manager, mock_vector_store):
+    """Test that the purge thread schedules stored documents and deletes expired ones."""
+    mock_vector_store.iter_documents.return_value = iter([
+        [{"id": "stale", "content": "Old", "metadata": {"expires_at": 1.0}}]
+    ])
+    _stored_expiries(mock_vector_store, {"stale": 1.0})
+    deleted = threading.Event()
+    mock_vector_store.delete_documents.side_effect = lambda ids: deleted.set() or len(ids)
+    
+    kb_manager.start_expiry_purge()
+    
+    assert deleted.wait(5)
+    mock_vector_store.iter_documents.assert_called_once_with(
+        batch_size=500, where={"expires_at": {"$gt": 0}}
+    )
+    mock_vector_store.delete_documents.assert_called_with(["stale"])
+    kb_manager.stop_expiry_purge()
+    assert kb_manager.get_stats()["expiry"]["purge_running"] is False
+
+class _ChunkRecordingStore:
+    """In-memory stand-in for VectorStore with the calls used by chunk dedup."""
+    def __init__(self):
+        self.records = {}
+        self.embedded = []
+
+    def get_documents(self, ids):
+        return [{"id": i, "metadata": dict(self.records[i]["metadata"])} for i in ids if i in self.records]
+
+    def add_documents(self, documents, ids=None):
+        for doc_id, doc in zip(ids, documents):
+            self.records[doc_id] = dict(doc)
+        self.embedded.extend(doc["content"] for doc in documents)
+        return list(ids)
+
+    def update_metadata(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            self.records[doc_id]["metadata"] = metadata
+
+    def delete_documents(self, ids):
+        for doc_id in ids:
+            self.records.pop(doc_id, None)
+        return len(ids)
+
+    def get_collection_info(self):
+        return {"name": "test_collection", "document_count": len(self.records)}
+
+    def iter_documents(self, batch_size=500, where=None):
+        yield [{"id": doc_id, **record} for doc_id, record in self.records.items()]
+
+def _chunk_ids(references):
+    return {reference.partition("@")[0] for reference in references}
+
+def _chunked_manager(mock_config, mock_rag_pipeline, store):
+    from shared.knowledge_base.chunking import ContentDefinedChunker
+    return KnowledgeBaseManager(
+        config=mock_config,
+        vector_store=store,
+        rag_pipeline=mock_rag_pipeline,
+        chunker=ContentDefinedChunker(min_chars=20, avg_chars=40, max_chars=120)
+    )
+
+def test_chunked_ingest_embeds_shared_boilerplate_once(mock_config, mock_rag_pipeline):
+    """Test that a footer shared by documents is stored once and referenced."""
+    store = _ChunkRecordingStore()
+    manager = _chunked_manager(mock_config, mock_rag_pipeline, store)
+    footer = "\n".join(f"Clause {i}: all sales are subject to the standard terms." for i in range(6))
+    
+    first = manager.ingest_documents([{"content": f"Router guide.\n{footer}", "metadata": {"source": "a"}}])
+    second = manager.ingest_documents([{"content": f"Billing guide.\n{footer}", "metadata": {"source": "b"}}])
+    
+    assert first["successful"] == second["successful"] == 1
+    shared = _chunk_ids(first["document_ids"]) & _chunk_ids(second["document_ids"])
+    assert shared
+    assert all(store.records[chunk_id]["metadata"]["chunk_refs"] == 2 for chunk_id in shared)
+    assert len(store.embedded) == len(set(store.embedded))
+    assert manager.get_stats()["chunks"]["chunks_referenced"] >= len(shared)
+
+def test_shared_chunks_keep_a_display_source(mock_config, mock_rag_pipeline):
+    """Test that a shared chunk keeps its first document's source and a reference count."""
+    store = _ChunkRecordingStore()
+    manager = _chunked_manager(mock_config, mock_rag_pipeline, store)
+    footer = "\n".join(f"Clause {i}: all sales are subject to the standard terms." for i in range(6))
+    
+    first = manager.ingest_documents([{"content": f"Router guide.\n{footer}", "metadata": {"source": "a"}}])
+    second = manager.ingest_documents([{"content": f"Billing guide.\n{footer}", "metadata": {"source": "b"}}])
+    
+    for chunk_id in _chunk_ids(first["document_ids"]) & _chunk_ids(second["document_ids"]):
+        metadata = store.records[chunk_id]["metadata"]
+        assert metadata["source"] == "a"
+        assert metadata["chunk_refs"] == 2
+        assert len(manager.chunk_store.references.owners(chunk_id)) == 2
+
+def test_export_strips_chunk_bookkeeping(mock_config, mock_rag_pipeline):
+    """Test that exported chunk records carry document metadata only."""
+    import io
+    import json
+    store = _ChunkRecordingStore()
+    manager = _chunked_manager(mock_config, mock_rag_pipeline, store)
+    footer = "\n".join(f"Clause {i}: all sales are subject to the standard terms." for i in range(6))
+    manager.ingest_documents([
+        {"content": f"Router guide.\n{footer}", "metadata": {"source": "a"}},
+        {"content": f"Billing guide.\n{footer}", "metadata": {"source": "b"}}
+    ])
+    stream = io.StringIO()
+    
+    manager.export_jsonl(stream)
+    
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(records) == len(store.records)
+    assert all(set(record["metadata"]) == {"source"} for record in records)
+
+def test_resumed_bulk_ingest_does_not_reference_chunks_twice(mock_config, mock_rag_pipeline, tmp_path):
+    """Test that rewriting a batch the crashed run already stored keeps reference counts."""
+    store = _ChunkRecordingStore()
+    manager = _chunked_manager(mock_config, mock_rag_pipeline, store)
+    journal_path = str(tmp_path / "bulk.journal")
+    documents = [
+        {"content": "\n".join(f"Step {i}: unplug the router and wait thirty seconds." for i in range(4))},
+        {"content": "\n".join(f"Step {i}: the refund arrives within ten business days." for i in range(4))}
+    ]
+    
+    with patch("shared.knowledge_base.kb_manager.IngestJournal.record_commit", side_effect=OSError("killed")):
+        with pytest.raises(KnowledgeBaseError):
+            manager.bulk_ingest(documents, journal_path)
+    manager.bulk_ingest(documents, journal_path)
+    
+    assert store.records
+    assert all(record["metadata"]["chunk_refs"] == 1 for record in store.records.values())
+
+def test_sync_removal_keeps_chunks_other_files_reference(mock_config, mock_rag_pipeline, tmp_path):
+    """Test that deleting a file only drops chunks no other file references."""
+    store = _ChunkRecordingStore()
+    manager = _chunked_manager(mock_config, mock_rag_pipeline, store)
+    footer = "\n".join(f"Clause {i}: all sales are subject to the standard terms." for i in range(6))
+    (tmp_path / "a.md").write_text(f"Router guide.\n{footer}")
+    (tmp_path / "b.md").write_text(f"Billing guide.\n{footer}")
+    manager.sync_directory(str(tmp_path))
+    
+    (tmp_path / "a.md").unlink()
+    manager.sync_directory(str(tmp_path))
+    
+    contents = " ".join(record["content"] for record in store.records.values())
+    assert "Router guide." not in contents
+    assert "Billing guide." in contents and "Clause 5" in contents
+    assert all(record["metadata"]["chunk_refs"] == 1 for record in store.records.values())
+
+def test_expiring_documents_do_not_share_chunks(mock_config, mock_rag_pipeline):
+    """Test that purging an expiring document leaves shared content intact."""
+    store = _ChunkRecordingStore()
+    manager = _chunked_manager(mock_config, mock_rag_pipeline, store)
+    text = "\n".join(f"Step {i}: unplug the router and wait thirty seconds." for i in range(4))
+    
+    manager.ingest_documents([{"content": text, "metadata": {}}])
+    manager.ingest_documents([{"content": text, "metadata": {"expires_at": 1.0}}])
+    manager.purge_expired()
+    
+    assert len(store.records) == len(manager.chunker.split(text))
+    assert all("expires_at" not in record["metadata"] for record in store.records.values())
+
+def _routed_manager(mock_config, mock_vector_store, mock_rag_pipeline):
+    from shared.knowledge_base.language import LanguageRouter
+    mock_vector_store.collection_name = "kb"
+    mock_vector_store.base_collection_name = "kb"
+    mock_vector_store.add_documents.side_effect = lambda docs, ids=None: [f"en-{i}" for i in range(len(docs))]
+    spanish = MagicMock(collection_name="kb__lang_es")
+    spanish.add_documents.side_effect = lambda docs, ids=None: [f"es-{i}" for i in range(len(docs))]
+    mock_vector_store.for_collection.return_value = spanish
+    router = LanguageRouter(mock_vector_store, ["es"], fallback_language="en")
+    manager = KnowledgeBaseManager(mock_config, mock_vector_store, mock_rag_pipeline, language_router=router)
+    return manager, spanish
+
+def test_ingest_routes_documents_by_language(mock_config, mock_vector_store, mock_rag_pipeline):
+    """Test that documents go to the collection of their language in input order."""
+    manager, spanish = _routed_manager(mock_config, mock_vector_store, mock_rag_pipeline)
+    
+    result = manager.ingest_documents([
+        {"content": "¿Cómo puedo cambiar la contraseña de mi cuenta?", "metadata": {}},
+        {"content": "How do I reset the password of my account?", "metadata": {}},
+        {"content": "Reembolsos en 30 días para los pedidos.", "metadata": {}}
+    ])
+    
+    assert result["document_ids"] == ["es-0", "en-0", "es-1"]
+    stored = spanish.add_documents.call_args[0][0]
+    assert [doc["metadata"]["language"] for doc in stored] == ["es", "es"]
+    assert mock_vector_store.add_documents.call_args[0][0][0]["metadata"]["language"] == "en"
+
+def test_search_uses_cached_customer_language(mock_config, mock_vector_store, mock_rag_pipeline):
+    """Test that queries search the customer's language collection."""
+    manager, spanish = _routed_manager(mock_config, mock_vector_store, mock_rag_pipeline)
+    mock_rag_pipeline.query.return_value = {"context": [], "context_count": 0}
+    
+    manager.search("¿Dónde está mi pedido?", customer_id="c1")
+    result = manager.search("ok", customer_id="c1")
+    
+    assert result["language"] == "es"
+    assert mock_rag_pipeline.query.call_args.kwargs["vector_store"] is spanish
+    assert manager.get_stats()["language_routing"]["cache_hits"] == 1
+
+def test_rebuild_rejected_with_language_routing(mock_config, mock_vector_store, mock_rag_pipeline):
+    """Test that blue/green rebuild refuses routed collections."""
+    manager, _ = _routed_manager(mock_config, mock_vector_store, mock_rag_pipeline)
+    
+    with pytest.raises(KnowledgeBaseError):
+        manager.rebuild([{"content": "Doc", "metadata": {}}])
@@ -0,0 +1,80 @@
+import pytest
+from unittest.mock import MagicMock
+from shared.knowledge_base.language import LanguageRouter, detect_language
+
+@pytest.fixture
+def vector_store():
+    store = MagicMock()
+    store.collection_name = "kb"
+    store.base_collection_name = "kb"
+    store.for_collection.side_effect = lambda name, base_collection_name=None: MagicMock(collection_name=name)
+    return store
+
+@pytest.mark.parametrize("text, language", [
+    ("How do I reset my password for the account?", "en"),
+    ("¿Cómo puedo cambiar la contraseña de mi cuenta?", "es"),
+    ("Comment est-ce que je peux changer mon mot de passe ?", "fr"),
+    ("Wie kann ich mein Passwort für das Konto ändern?", "de"),
+    ("Как изменить пароль?", "ru"),
+    ("パスワードを変更する方法", "ja"),
+    ("如何更改密码", "zh"),
+])
+def test_detect_language(text, language):
+    """Test script and stopword based detection."""
+    assert detect_language(text) == language
+
+def test_detect_language_without_signal():
+    """Test that text without a clear signal is not guessed."""
+    assert detect_language("Router X200") is None
+    assert detect_language("12345 !!") is None
+    assert detect_language("Как изменить пароль?", languages=["en", "es"]) is None
+
+def test_query_routing_is_cached_per_customer(vector_store):
+    """Test that a customer's detected language is reused without detection."""
+    router = LanguageRouter(vector_store, ["es", "fr"], fallback_language="en")
+    
+    assert router.route_query("¿Cómo puedo cambiar la contraseña?", customer_id="c1") == "es"
+    assert router.route_query("ok", customer_id="c1") == "es"
+    assert router.route_query("ok", customer_id="c2") == "en"
+    
+    stats = router.get_stats()
+    assert stats["cache_hits"] == 1
+    assert stats["detections"] == 2
+    assert stats["fallbacks"] == 1
+    assert stats["cached_customers"] == 1
+
+def test_fallback_and_expired_decisions_are_not_reused(vector_store):
+    """Test that fallbacks are never cached and expired decisions are re-detected."""
+    router = LanguageRouter(vector_store, ["es"], cache_ttl=0.0)
+    
+    assert router.route_query("ok", customer_id="c1") == "en"
+    assert router.route_query("¿Dónde está mi pedido?", customer_id="c1") == "es"
+    assert router.route_query("Where is my order?", customer_id="c1") == "en"
+
+def test_cache_evicts_least_recently_used_customer(vector_store):
+    """Test the cache size bound."""
+    router = LanguageRouter(vector_store, ["es"], cache_size=1)
+    router.route_query("¿Dónde está mi pedido?", customer_id="c1")
+    router.route_query("¿Dónde está mi factura?", customer_id="c2")
+    
+    assert router.get_stats()["cached_customers"] == 1
+    router.forget_customer("c2")
+    assert router.get_stats()["cached_customers"] == 0
+
+def test_stores_per_language(vector_store):
+    """Test that the fallback uses the base store and others open siblings once."""
+    router = LanguageRouter(vector_store, ["es"])
+    
+    assert router.store_for("en") is vector_store
+    assert router.store_for("de") is vector_store
+    spanish = router.store_for("es")
+    assert spanish.collection_name == "kb__lang_es"
+    assert router.store_for("es") is spanish
+    vector_store.for_collection.assert_called_once_with("kb__lang_es", base_collection_name="kb__lang_es")
+
+def test_document_language_prefers_metadata(vector_store):
+    """Test that supported language metadata overrides detection."""
+    router = LanguageRouter(vector_store, ["es"])
+    
+    assert router.language_of({"content": "Where is my order?", "metadata": {"language": "es"}}) == "es"
+    assert router.language_of({"content": "Where is my order?", "metadata": {"language": "xx"}}) == "en"
@@ -0,0 +1,95 @@
+import pytest
+from unittest.mock import MagicMock
+from shared.integrations.llm_client import LLMClient, LLMClientError
+from shared.integrations.llm_stub_server import StubLLMServer
+from shared.core_functions.config import Config
+
+@pytest.fixture
+def mock_config():
+    config = MagicMock(spec=Config)
+    config.env = {}
+    config.get_feature_flags.return_value = {"model": "gpt-3.5-turbo", "max_tokens": 100}
+    return config
+
+@pytest.fixture
+def stub_server():
+    server = StubLLMServer()
+    server.start()
+    yield server
+    server.stop()
+
+def _client(mock_config, stub_server, **kwargs):
+    return LLMClient(config=mock_config, base_url=stub_server.base_url, **kwargs)
+
+def test_settings_from_feature_flags(mock_config):
+    """Test that model settings are read from the variant's feature flags."""
+    client = LLMClient(config=mock_config)
+    
+    assert client.model == "gpt-3.5-turbo"
+    assert client.max_tokens == 100
+    mock_config.get_feature_flags.assert_called_with("mini_trivya")
+
+def test_complete_against_stub_server(mock_config, stub_server):
+    """Test a completion round trip with token accounting."""
+    client = _client(mock_config, stub_server)
+    
+    result = client.complete("Context\nUser Query: hours?", tenant_id="acme")
+    
+    assert result["text"] == "Stub answer to: User Query: hours?"
+    assert result["cached"] is False
+    usage = client.get_usage("acme")
+    assert usage["requests"] == 1
+    assert usage["prompt_tokens"] == 4
+    assert usage["total_tokens"] == usage["prompt_tokens"] + usage["completion_tokens"]
+
+def test_response_cache_on_disk(mock_config, stub_server, tmp_path):
+    """Test that repeated prompts are served from the disk cache."""
+    client = _client(mock_config, stub_server, cache_dir=str(tmp_path))
+    client.complete("same prompt", tenant_id="acme")
+    
+    fresh_client = _client(mock_config, stub_server, cache_dir=str(tmp_path))
+    result = fresh_client.complete("same prompt", tenant_id="acme")
+    
+    assert result["cached"] is True
+    assert stub_server.request_count == 1
+    assert fresh_client.get_usage("acme")["cache_hits"] == 1
+    assert fresh_client.get_usage("acme")["total_tokens"] == 0
+
+def test_retries_then_succeeds(mock_config):
+    """Test that transient failures are retried."""
+    with StubLLMServer(fail_first=2) as server:
+        client = _client(mock_config, server, max_retries=2, retry_backoff=0.01)
+        result = client.complete("retry me")
+    
+    assert result["text"].startswith("Stub answer")
+    assert server.request_count == 3
+
+def test_timeout_raises_after_retries(mock_config):
+    """Test that a slow endpoint surfaces LLMClientError."""
+    with StubLLMServer(latency=0.5) as server:
+        client = _client(mock_config, server, timeout=0.05, max_retries=1, retry_backoff=0.01)
+        with pytest.raises(LLMClientError, match="after 2 attempts"):
+            client.complete("slow")
+
+def test_complete_batch_dedupes_prompts(mock_config, stub_server):
+    """Test that identical prompts in a batch are sent once."""
+    client = _client(mock_config, stub_server, max_concurrency=2)
+    
+    results = client.complete_batch(["a", "b", "a"], tenant_id="acme")
+    
+    assert [r["text"] for r in results] == ["Stub answer to: a", "Stub answer to: b", "Stub answer to: a"]
+    assert stub_server.request_count == 2
+
+def test_stream_yields_fragments_and_caches(mock_config, stub_server, tmp_path):
+    """Test that streamed fragments join into the full answer and get cached."""
+    client = LLMClient(config=mock_config, base_url=stub_server.base_url, cache_dir=str(tmp_path))
+    
+    fragments = list(client.stream("User Query: what are your hours?", tenant_id="acme"))
+    
+    assert len(fragments) > 1
+    assert "".join(fragments) == StubLLMServer.answer_for("User Query: what are your hours?")
+    assert client.get_usage("acme")["completion_tokens"] == len(fragments)
+    
+    cached = list(client.stream("User Query: what are your hours?", tenant_id="acme"))
+    assert cached == ["".join(fragments)]
+    assert stub_server.request_count == 1
@@ -0,0 +1,89 @@
+import pytest
+from shared.knowledge_base.loaders import (
+    parse_file,
+    parse_jsonl_line,
+    read_text,
+    DocumentParseError
+)
+
+def test_read_text_uses_mmap_for_large_files(tmp_path):
+    """Test that mmap and buffered reads return the same text."""
+    path = tmp_path / "big.txt"
+    path.write_text("﻿café " * 100, encoding="utf-8")
+    
+    assert read_text(path, mmap_threshold=1) == read_text(path, mmap_threshold=10**9)
+    assert read_text(path, mmap_threshold=1).startswith("café")
+
+def test_read_text_decodes_mapped_file_in_slices(tmp_path, monkeypatch):
+    """Test that characters split across mmap decode slices are kept intact."""
+    monkeypatch.setattr("shared.knowledge_base.loaders.MMAP_DECODE_CHUNK", 4)
+    path = tmp_path / "big.txt"
+    text = "café naïve 東京 " * 50
+    path.write_text("\ufeff" + text, encoding="utf-8")
+    
+    assert read_text(path, mmap_threshold=1) == text
+
+def test_parse_markdown_title(tmp_path):
+    """Test that a Markdown heading becomes the title."""
+    path = tmp_path / "reset.md"
+    path.write_text("# Reset password\n\nOpen settings.", encoding="utf-8")
+    
+    documents = parse_file(path, source="help/reset.md")
+    
+    assert documents[0]["metadata"] == {"source": "help/reset.md", "title": "Reset password"}
+
+def test_parse_html_drops_markup_and_scripts(tmp_path):
+    """Test that HTML parsing keeps visible text only."""
+    path = tmp_path / "page.html"
+    path.write_text(
+        "<html><head><title>Refunds</title><script>track()</script></head>"
+        "<body><h1>Refunds</h1><p>Refunds take &amp; five days.</p></body></html>",
+        encoding="utf-8"
+    )
+    
+    document = parse_file(path)[0]
+    
+    assert document["metadata"]["title"] == "Refunds"
+    assert "track()" not in document["content"]
+    assert "Refunds take & five days." in document["content"]
+
+def test_parse_csv_rows(tmp_path):
+    """Test that each CSV row becomes a document with column metadata."""
+    path = tmp_path / "faq.csv"
+    path.write_text("question,answer\nHours?,Open 9-5.\nPhone?,Call us.\n", encoding="utf-8")
+    
+    documents = parse_file(path)
+    
+    assert [doc["content"] for doc in documents] == ["Open 9-5.", "Call us."]
+    assert documents[1]["metadata"] == {"source": "faq.csv", "row": 2, "question": "Phone?"}
+
+def test_parse_jsonl_reports_bad_line(tmp_path):
+    """Test that malformed JSONL names the offending line."""
+    path = tmp_path / "export.jsonl"
+    path.write_text('{"content": "ok"}\n\nnot json\n', encoding="utf-8")
+    
+    with pytest.raises(DocumentParseError, match="line 3"):
+        parse_file(path)
+
+def test_parse_jsonl_line_folds_scalar_fields():
+    """Test that extra scalar fields become metadata."""
+    document = parse_jsonl_line('{"content": "Hi", "metadata": {"a": 1}, "lang": "en", "tags": ["x"]}')
+    
+    assert document == {"content": "Hi", "metadata": {"a": 1, "lang": "en"}}
+
+def test_parse_jsonl_line_rejects_unstorable_metadata():
+    """Test that nested objects and nulls in metadata are rejected per line."""
+    with pytest.raises(DocumentParseError, match="'author'"):
+        parse_jsonl_line('{"content": "Hi", "metadata": {"author": {"name": "Ann"}}}')
+    with pytest.raises(DocumentParseError, match="'updated'"):
+        parse_jsonl_line('{"content": "Hi", "metadata": {"updated": null}}')
+    
+    assert parse_jsonl_line('{"content": "Hi", "metadata": {"tags": ["a", "b"]}}')["metadata"] == {"tags": ["a", "b"]}
+
+def test_parse_file_rejects_unknown_extension(tmp_path):
+    """Test that unsupported formats raise DocumentParseError."""
+    path = tmp_path / "image.png"
+    path.write_bytes(b"\x89PNG")
+    
+    with pytest.raises(DocumentParseError):
+        parse_file(path)
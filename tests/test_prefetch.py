@@ -0,0 +1,67 @@
+from unittest.mock import patch
+from shared.knowledge_base.prefetch import SessionContextCache, ContextPrefetcher, SESSION_MATCH_KEY
+
+def _doc(doc_id, content):
+    return {"id": doc_id, "content": content, "metadata": {}, "distance": 0.2}
+
+def test_cache_evicts_least_recent_documents():
+    """Test that a session keeps only its most recent documents."""
+    cache = SessionContextCache(max_docs_per_session=2)
+    cache.add("s1", [_doc("a", "A"), _doc("b", "B")])
+    cache.add("s1", [_doc("c", "C")])
+    
+    assert [doc["id"] for doc in cache.get("s1")] == ["b", "c"]
+
+def test_cache_evicts_least_recent_sessions():
+    """Test that the cache is bounded by session count."""
+    cache = SessionContextCache(max_sessions=2)
+    cache.add("s1", [_doc("a", "A")])
+    cache.add("s2", [_doc("b", "B")])
+    cache.get("s1")
+    cache.add("s3", [_doc("c", "C")])
+    
+    assert len(cache) == 2
+    assert cache.get("s2") == []
+    assert cache.get("s1")
+
+def test_cache_expires_idle_sessions():
+    """Test that sessions idle longer than the TTL are dropped."""
+    cache = SessionContextCache(ttl=10.0)
+    with patch("shared.knowledge_base.prefetch.time.monotonic", return_value=100.0):
+        cache.add("s1", [_doc("a", "A")])
+    with patch("shared.knowledge_base.prefetch.time.monotonic", return_value=111.0):
+        assert cache.get("s1") == []
+
+def test_lookup_hits_on_matching_warm_documents():
+    """Test that a follow-up covered by warm documents is a hit."""
+    prefetcher = ContextPrefetcher(match_threshold=0.6)
+    prefetcher.cache.add("s1", [
+        _doc("refunds", "Refunds are issued to the original card within five business days."),
+        _doc("shipping", "Shipping is free for orders over fifty dollars.")
+    ])
+    
+    hits = prefetcher.lookup("s1", "How many business days do refunds to my card take?", top_k=5)
+    
+    assert [doc["id"] for doc in hits] == ["refunds"]
+    assert hits[0]["from_session_cache"] is True
+    assert hits[0]["distance"] == 0.2
+    assert hits[0][SESSION_MATCH_KEY] >= 0.6
+    assert "similarity_score" not in hits[0]
+    assert prefetcher.get_stats()["hits"] == 1
+
+def test_lookup_misses_unrelated_query():
+    """Test that an unrelated follow-up falls through to retrieval."""
+    prefetcher = ContextPrefetcher()
+    prefetcher.cache.add("s1", [_doc("shipping", "Shipping is free for orders over fifty dollars.")])
+    
+    assert prefetcher.lookup("s1", "How do I reset my password?", top_k=5) is None
+    assert prefetcher.lookup("unknown", "shipping", top_k=5) is None
+    assert prefetcher.get_stats()["lookups"] == 2
+
+def test_seed_queries_use_top_documents():
+    """Test that neighbours are seeded from the top documents only."""
+    prefetcher = ContextPrefetcher(seed_docs=1)
+    
+    seeds = prefetcher.seed_queries([_doc("a", "First"), _doc("b", "Second")])
+    
+    assert seeds == ["First"]
@@ -181,3 +181,482 @@ def test_get_pipeline_stats(rag_pipeline, mock_vector_store):
     assert "vector_store" in stats
     assert stats["top_k"] == 5
     assert stats["similarity_threshold"] == 0.7
+
+def test_query_reports_stage_timings(rag_pipeline, mock_vector_store):
+    """Test that query() attaches per-stage timings to its result."""
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Timed", "metadata": {}, "distance": 0.1, "id": "id1"}
+    ]
+    
+    result = rag_pipeline.query("test query")
+    
+    for stage in ("vector_search", "threshold_filter", "prompt_assembly", "total"):
+        assert stage in result["timings"]
+        assert result["timings"][stage] >= 0
+    assert result["timings"]["total"] >= result["timings"]["vector_search"]
+
+def test_get_pipeline_stats_stage_latency(rag_pipeline, mock_vector_store):
+    """Test that stage latency percentiles are exposed through stats."""
+    mock_vector_store.similarity_search.return_value = []
+    for _ in range(3):
+        rag_pipeline.query("test query")
+    
+    latency = rag_pipeline.get_pipeline_stats()["stage_latency"]
+    
+    assert latency["total"]["count"] == 3
+    assert latency["total"]["p50_ms"] is not None
+    assert latency["total"]["p99_ms"] >= latency["total"]["p50_ms"]
+
+def test_latency_histogram_percentiles():
+    """Test nearest-rank percentiles over the rolling window."""
+    from shared.knowledge_base.rag_pipeline import LatencyHistogram
+    histogram = LatencyHistogram(window_size=100)
+    for value in range(1, 201):
+        histogram.record(float(value))
+    
+    summary = histogram.summary()
+    
+    assert summary["count"] == 200
+    assert summary["window"] == 100
+    assert summary["p50_ms"] == 150.0
+    assert summary["p99_ms"] == 199.0
+
+def test_query_with_context_compression(mock_config, mock_vector_store):
+    """Test that the compression stage shrinks context before prompt assembly."""
+    from shared.knowledge_base.compression import ContextCompressor
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        compressor=ContextCompressor(min_overlap=0.5)
+    )
+    mock_vector_store.similarity_search.return_value = [
+        {
+            "content": "Refunds take five days. Shipping is free over $50. Refunds go to the original card.",
+            "metadata": {"source": "billing.md"},
+            "id": "id1"
+        }
+    ]
+    
+    result = pipeline.query("How long do refunds take?")
+    
+    assert "Refunds take five days." in result["prompt"]
+    assert "Shipping is free" not in result["prompt"]
+    assert "compression" in result["timings"]
+
+def test_adaptive_top_k_truncates_at_score_gap(mock_config, mock_vector_store):
+    """Test that adaptive mode stops at the first large score drop."""
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        adaptive_top_k=True,
+        adaptive_max_k=10,
+        score_gap=0.2
+    )
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Exact FAQ", "metadata": {}, "distance": 0.05, "id": "id1"},
+        {"content": "Close", "metadata": {}, "distance": 0.15, "id": "id2"},
+        {"content": "Unrelated", "metadata": {}, "distance": 0.6, "id": "id3"},
+        {"content": "Unrelated 2", "metadata": {}, "distance": 0.65, "id": "id4"}
+    ]
+    
+    result = pipeline.query("test query")
+    
+    mock_vector_store.similarity_search.assert_called_once_with("test query", n_results=10)
+    assert result["chosen_k"] == 2
+    assert [doc["id"] for doc in result["context"]] == ["id1", "id2"]
+
+def test_adaptive_top_k_cumulative_relevance(mock_config, mock_vector_store):
+    """Test that adaptive mode stops once cumulative relevance is reached."""
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        adaptive_top_k=True,
+        score_gap=1.0,
+        cumulative_relevance=1.5
+    )
+    mock_vector_store.similarity_search.return_value = [
+        {"content": f"Doc {i}", "metadata": {}, "distance": 0.2, "id": f"id{i}"}
+        for i in range(5)
+    ]
+    
+    result = pipeline.query("test query")
+    
+    assert result["chosen_k"] == 2
+
+def test_retrieve_context_suppresses_near_duplicates(mock_config, mock_vector_store):
+    """Test that duplicate copies of a higher-ranked document are dropped."""
+    from shared.knowledge_base.dedup import NearDuplicateFilter
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        dedup_filter=NearDuplicateFilter()
+    )
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Refunds are issued within five business days.", "metadata": {"simhash": "00000000000000ff"}, "distance": 0.1, "id": "id1"},
+        {"content": "Refunds are issued within 5 business days.", "metadata": {"simhash": "00000000000000fe"}, "distance": 0.12, "id": "id2"},
+        {"content": "Shipping is free over $50.", "metadata": {"simhash": "ffffffff00000000"}, "distance": 0.3, "id": "id3"}
+    ]
+    
+    timings = {}
+    results = pipeline.retrieve_context("refund time", timings=timings)
+    
+    assert [doc["id"] for doc in results] == ["id1", "id3"]
+    assert "dedup" in timings
+
+def _source_store(results, delay=0.0):
+    import time as _time
+    store = MagicMock()
+    store.get_collection_info.return_value = {"name": "source", "document_count": len(results)}
+    def _search(query, n_results=5):
+        _time.sleep(delay)
+        return [dict(result) for result in results]
+    store.similarity_search.side_effect = _search
+    return store
+
+def test_federated_retrieval_merges_weighted_results(mock_config, mock_vector_store):
+    """Test that results from several sources are merged by weighted score."""
+    from shared.knowledge_base.rag_pipeline import RetrievalSource
+    docs = _source_store([{"content": "Docs", "metadata": {}, "distance": 0.3, "id": "d1"}])
+    policies = _source_store([{"content": "Policy", "metadata": {}, "distance": 0.2, "id": "p1"}])
+    notes = _source_store([{"content": "Note", "metadata": {}, "distance": 0.25, "id": "n1"}])
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        sources=[
+            RetrievalSource("docs", docs, weight=1.5),
+            RetrievalSource("policies", policies),
+            RetrievalSource("notes", notes, weight=0.5)
+        ]
+    )
+    
+    results = pipeline.retrieve_context("refunds", top_k=2)
+    
+    assert [doc["id"] for doc in results] == ["d1", "p1"]
+    assert results[0]["source_collection"] == "docs"
+    mock_vector_store.similarity_search.assert_not_called()
+    pipeline.close()
+
+def test_federated_retrieval_skips_slow_source(mock_config, mock_vector_store):
+    """Test that a source missing its timeout does not stall the query."""
+    from shared.knowledge_base.rag_pipeline import RetrievalSource
+    fast = _source_store([{"content": "Fast", "metadata": {}, "distance": 0.2, "id": "f1"}])
+    slow = _source_store([{"content": "Slow", "metadata": {}, "distance": 0.1, "id": "s1"}], delay=0.5)
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        sources=[RetrievalSource("fast", fast), RetrievalSource("slow", slow, timeout=0.05)]
+    )
+    
+    info = {}
+    results = pipeline.retrieve_context("test", retrieval_info=info)
+    
+    assert [doc["id"] for doc in results] == ["f1"]
+    assert info["timed_out_sources"] == ["slow"]
+    pipeline.close()
+
+def _stalled_store(release):
+    store = MagicMock()
+    store.similarity_search.side_effect = lambda query, n_results=5: release.wait(5) and []
+    return store
+
+def test_stalled_source_does_not_starve_healthy_sources(mock_config, mock_vector_store):
+    """Test that searches stuck on one source neither queue nor fail queries to others."""
+    import threading
+    import time
+    from shared.knowledge_base.rag_pipeline import RetrievalSource
+    release = threading.Event()
+    fast = _source_store([{"content": "Fast", "metadata": {}, "distance": 0.2, "id": "f1"}])
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        sources=[RetrievalSource("fast", fast), RetrievalSource("slow", _stalled_store(release), timeout=0.05)],
+        max_in_flight=2
+    )
+    
+    try:
+        for _ in range(12):
+            info = {}
+            start = time.perf_counter()
+            results = pipeline.retrieve_context("test", retrieval_info=info)
+            assert [doc["id"] for doc in results] == ["f1"]
+            assert time.perf_counter() - start < 0.5
+        assert info["saturated_sources"] == ["slow"]
+        assert pipeline.get_pipeline_stats()["sources"][1]["in_flight"] == 2
+    finally:
+        release.set()
+        pipeline.close()
+
+def test_generate_prompt_uses_stored_snippet(rag_pipeline):
+    """Test that prompt assembly uses the snippet length stored at ingest."""
+    context = [{
+        "content": "Short answer. A very long tail that should not reach the prompt.",
+        "metadata": {"source": "faq.md", "snippet_length": 13}
+    }]
+    
+    prompt = rag_pipeline.generate_prompt("question", context)
+    
+    assert "Content: Short answer.\n" in prompt
+    assert "long tail" not in prompt
+
+def test_query_stream_yields_llm_fragments(rag_pipeline, mock_vector_store):
+    """Test that query_stream streams the LLM answer after retrieval."""
+    import asyncio
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Open 9-5.", "metadata": {}, "distance": 0.1, "id": "id1"}
+    ]
+    llm_client = MagicMock()
+    llm_client.stream.return_value = iter(["We are ", "open ", "9-5."])
+    
+    async def _collect():
+        return [fragment async for fragment in rag_pipeline.query_stream("hours?", llm_client)]
+    
+    assert asyncio.run(_collect()) == ["We are ", "open ", "9-5."]
+    prompt = llm_client.stream.call_args[0][0]
+    assert "Open 9-5." in prompt
+
+def test_query_stream_wraps_llm_errors(rag_pipeline, mock_vector_store):
+    """Test that generation failures surface as RAGPipelineError."""
+    import asyncio
+    mock_vector_store.similarity_search.return_value = []
+    llm_client = MagicMock()
+    llm_client.stream.side_effect = Exception("LLM down")
+    
+    async def _collect():
+        return [fragment async for fragment in rag_pipeline.query_stream("hours?", llm_client)]
+    
+    with pytest.raises(RAGPipelineError, match="LLM down"):
+        asyncio.run(_collect())
+
+def test_query_extractive_fast_path(mock_config, mock_vector_store):
+    """Test that confident extractive answers skip prompt generation."""
+    from shared.knowledge_base.extractive import ExtractiveAnswerer
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=mock_vector_store,
+        extractive=ExtractiveAnswerer(min_confidence=0.75)
+    )
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Refunds take five business days. Shipping is free.", "metadata": {"source": "billing.md"}, "distance": 0.1, "id": "id1"}
+    ]
+    
+    confident = pipeline.query("How many days do refunds take?")
+    uncertain = pipeline.query("Do you ship internationally to Canada?")
+    
+    assert confident["answer_type"] == "extractive"
+    assert confident["prompt"] is None
+    assert confident["answer"]["text"] == "Refunds take five business days."
+    assert uncertain["answer_type"] == "generative"
+    assert uncertain["answer"] is None
+    assert "User Query: Do you ship internationally to Canada?" in uncertain["prompt"]
+
+def test_hedged_retrieval_uses_faster_replica(mock_config):
+    """Test that a stalled primary is hedged and the replica answer wins."""
+    primary = _source_store([{"content": "Primary", "metadata": {}, "distance": 0.1, "id": "p1"}], delay=0.5)
+    replica = _source_store([{"content": "Replica", "metadata": {}, "distance": 0.1, "id": "r1"}])
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=primary,
+        replicas=[replica],
+        hedge_default_delay=0.02
+    )
+    
+    info = {}
+    results = pipeline.retrieve_context("test", retrieval_info=info)
+    
+    assert [doc["id"] for doc in results] == ["r1"]
+    assert info == {"hedged": True, "hedge_winner": "replica", "requested_k": 5, "chosen_k": 1}
+    assert pipeline.get_pipeline_stats()["hedging"]["replica_wins"] == 1
+    pipeline.close()
+
+def test_hedging_keeps_working_while_primary_stalls(mock_config):
+    """Test that stalled primary searches never delay the hedge to a replica."""
+    import threading
+    import time
+    release = threading.Event()
+    replica = _source_store([{"content": "Replica", "metadata": {}, "distance": 0.1, "id": "r1"}])
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=_stalled_store(release),
+        replicas=[replica],
+        hedge_default_delay=0.02,
+        max_in_flight=2
+    )
+    
+    try:
+        for _ in range(8):
+            start = time.perf_counter()
+            results = pipeline.retrieve_context("test")
+            assert [doc["id"] for doc in results] == ["r1"]
+            assert time.perf_counter() - start < 0.5
+        # Primaries that lost the race are recorded without waiting for them
+        assert pipeline.primary_latency.summary()["count"] == 2
+        assert pipeline.get_pipeline_stats()["hedging"]["primary_in_flight"] == 2
+    finally:
+        release.set()
+        pipeline.close()
+
+def test_hedged_retrieval_fast_primary_not_hedged(mock_config):
+    """Test that a primary answering within the hedge delay is used directly."""
+    primary = _source_store([{"content": "Primary", "metadata": {}, "distance": 0.1, "id": "p1"}])
+    replica = _source_store([])
+    pipeline = RAGPipeline(
+        config=mock_config,
+        vector_store=primary,
+        replicas=[replica],
+        hedge_default_delay=1.0
+    )
+    
+    results = pipeline.retrieve_context("test")
+    
+    assert [doc["id"] for doc in results] == ["p1"]
+    replica.similarity_search.assert_not_called()
+    assert pipeline.primary_latency.summary()["count"] == 1
+    pipeline.close()
+
+def test_hedged_retrieval_falls_back_on_primary_error(mock_config):
+    """Test that a failing primary is covered by a replica."""
+    primary = MagicMock()
+    primary.similarity_search.side_effect = Exception("database is locked")
+    replica = _source_store([{"content": "Replica", "metadata": {}, "distance": 0.1, "id": "r1"}])
+    pipeline = RAGPipeline(config=mock_config, vector_store=primary, replicas=[replica])
+    
+    results = pipeline.retrieve_context("test")
+    
+    assert [doc["id"] for doc in results] == ["r1"]
+    pipeline.close()
+
+def test_session_follow_up_served_from_prefetched_context(mock_config):
+    """Test that a follow-up in a session is answered from warm context."""
+    from shared.knowledge_base.prefetch import ContextPrefetcher
+    refunds = {
+        "content": "Refunds are issued to the original card within five business days.",
+        "metadata": {}, "distance": 0.1, "id": "refunds"
+    }
+    store = _source_store([refunds])
+    prefetcher = ContextPrefetcher()
+    pipeline = RAGPipeline(config=mock_config, vector_store=store, prefetcher=prefetcher)
+    
+    first = pipeline.query("Where is my refund?", session_id="s1")
+    pipeline.close(wait=True)
+    calls = store.similarity_search.call_count
+    second = pipeline.query("How many business days do refunds to my card take?", session_id="s1")
+    
+    assert first["from_session_cache"] is False
+    assert second["from_session_cache"] is True
+    assert second["context"][0]["id"] == "refunds"
+    assert store.similarity_search.call_count == calls
+    stats = pipeline.get_pipeline_stats()["prefetch"]
+    assert stats["hits"] == 1
+    assert stats["prefetches"] == 1
+
+def test_session_cache_hits_go_through_retrieval_filters(mock_config):
+    """Test that warm documents face the similarity threshold and keep coverage apart from similarity."""
+    from shared.knowledge_base.prefetch import ContextPrefetcher, SESSION_MATCH_KEY
+    prefetcher = ContextPrefetcher()
+    prefetcher.cache.add("s1", [
+        {"content": "Refunds are issued to the original card within five business days.",
+         "metadata": {}, "distance": 0.1, "id": "refunds"},
+        {"content": "Refunds for business card orders take five days.",
+         "metadata": {}, "distance": 0.6, "id": "weak"}
+    ])
+    store = _source_store([])
+    pipeline = RAGPipeline(config=mock_config, vector_store=store, prefetcher=prefetcher, similarity_threshold=0.7)
+    
+    result = pipeline.query("How many business days do refunds to my card take?", session_id="s1")
+    
+    assert result["from_session_cache"] is True
+    assert [doc["id"] for doc in result["context"]] == ["refunds"]
+    assert result["context"][0]["similarity_score"] == pytest.approx(0.9)
+    assert result["context"][0][SESSION_MATCH_KEY] >= prefetcher.match_threshold
+    store.similarity_search.assert_not_called()
+    
+    prefetcher.cache.add("s2", [
+        {"content": "Refunds are issued to the original card within five business days.",
+         "metadata": {"expires_at": 1.0}, "distance": 0.1, "id": "expired"}
+    ])
+    result = pipeline.query("How many business days do refunds to my card take?", session_id="s2")
+    
+    assert result["from_session_cache"] is False
+    store.similarity_search.assert_called_once()
+    pipeline.close()
+
+def test_query_without_session_skips_prefetch(mock_config, mock_vector_store):
+    """Test that queries without a session never touch the session cache."""
+    from shared.knowledge_base.prefetch import ContextPrefetcher
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Doc", "metadata": {}, "distance": 0.1, "id": "1"}
+    ]
+    prefetcher = ContextPrefetcher()
+    pipeline = RAGPipeline(config=mock_config, vector_store=mock_vector_store, prefetcher=prefetcher)
+    
+    pipeline.query("test")
+    
+    assert prefetcher.get_stats()["lookups"] == 0
+    assert len(prefetcher.cache) == 0
+
+def test_retrieve_context_drops_expired_documents(rag_pipeline, mock_vector_store):
+    """Test that documents past expires_at are not served before the purge runs."""
+    mock_vector_store.similarity_search.return_value = [
+        {"content": "Old promo", "metadata": {"expires_at": 1.0}, "distance": 0.1},
+        {"content": "Evergreen", "metadata": {"expires_at": 4102444800.0}, "distance": 0.2},
+        {"content": "No expiry", "metadata": {}, "distance": 0.2}
+    ]
+    
+    results = rag_pipeline.retrieve_context("promo")
+    
+    assert [result["content"] for result in results] == ["Evergreen", "No expiry"]
+
+def test_retrieve_context_from_override_store(rag_pipeline, mock_vector_store):
+    """Test that a per-call vector store is searched instead of the pipeline's own."""
+    language_store = MagicMock()
+    language_store.similarity_search.return_value = [
+        {"content": "Contenido", "metadata": {}, "distance": 0.1, "id": "es-1"}
+    ]
+    
+    results = rag_pipeline.retrieve_context("consulta", top_k=1, vector_store=language_store)
+    
+    assert [doc["id"] for doc in results] == ["es-1"]
+    language_store.similarity_search.assert_called_once_with("consulta", n_results=1)
+    mock_vector_store.similarity_search.assert_not_called()
+
+class _BagOfWordsEmbedding:
+    """Deterministic embedding so real Chroma distances need no model download."""
+    def __call__(self, input):
+        vectors = []
+        for text in input:
+            vector = [0.0] * 32
+            for word in text.lower().split():
+                vector[sum(map(ord, word)) % 32] += 5.0
+            vectors.append(vector)
+        return vectors
+
+    def embed_query(self, input):
+        return self(input)
+
+def test_similarity_scores_from_real_chroma_distances(mock_config, tmp_path):
+    """Test that threshold and adaptive top-k scores come from cosine distances in [0, 2]."""
+    pytest.importorskip("chromadb")
+    from shared.knowledge_base.vector_store import VectorStore
+    mock_config.vector_db_config = MagicMock(
+        VECTOR_DB_TYPE="chromadb",
+        VECTOR_DB_PATH=str(tmp_path),
+        COLLECTION_NAME="kb_distances"
+    )
+    store = VectorStore(mock_config, logger=MagicMock())
+    store.collection._embedding_function = _BagOfWordsEmbedding()
+    store.add_documents(
+        [
+            {"content": "reset your password in settings", "metadata": {"source": "account.md"}},
+            {"content": "refund policy thirty days", "metadata": {"source": "billing.md"}},
+        ],
+        ids=["reset", "refund"]
+    )
+    pipeline = RAGPipeline(config=mock_config, vector_store=store, top_k=2, similarity_threshold=0.5)
+    
+    raw = store.similarity_search("reset your password in settings", n_results=2)
+    results = pipeline.retrieve_context("reset your password in settings", top_k=2)
+    
+    assert store.collection.metadata["hnsw:space"] == "cosine"
+    assert all(0.0 <= result["distance"] <= 2.0 for result in raw)
+    assert [result["id"] for result in results] == ["reset"]
+    assert results[0]["similarity_score"] == pytest.approx(1.0, abs=1e-4)
@@ -0,0 +1,53 @@
+from shared.knowledge_base.snippets import (
+    normalize_content,
+    snippet_length,
+    render_snippet,
+    SNIPPET_LENGTH_KEY
+)
+
+def test_normalize_collapses_whitespace_and_boilerplate():
+    """Test that whitespace runs and boilerplate lines are removed."""
+    raw = (
+        "Skip to main content\n\n"
+        "How   to reset\tyour password\n"
+        "\n\n   Open Settings  and choose Security.  \n"
+        "Was this article helpful? Yes No\n"
+        "3 out of 4 found this helpful\n"
+        "Back to top"
+    )
+    
+    assert normalize_content(raw) == "How to reset your password\nOpen Settings and choose Security."
+
+def test_normalize_keeps_faq_answer_lines():
+    """Test that one-word answers and prose about updates are not boilerplate."""
+    raw = (
+        "Can I cancel at any time?\n"
+        "Yes\n"
+        "Updated plans take effect immediately.\n"
+        "Last updated: 2024-03-01\n"
+        "Was this article helpful?\n"
+        "Yes\n"
+        "No"
+    )
+    
+    assert normalize_content(raw) == (
+        "Can I cancel at any time?\nYes\nUpdated plans take effect immediately."
+    )
+
+def test_normalize_keeps_content_that_is_all_boilerplate():
+    """Test that a document is never normalized to nothing."""
+    assert normalize_content("  Back to top  ") == "Back to top"
+
+def test_snippet_length_cuts_at_sentence_boundary():
+    """Test that long content is capped at a sentence end."""
+    text = "First sentence here. " * 10 + "Tail without end"
+    length = snippet_length(text, max_chars=100)
+    
+    assert length <= 100
+    assert text[:length].endswith(".")
+    assert snippet_length("short", max_chars=100) == 5
+
+def test_render_snippet_slices_stored_length():
+    """Test that rendering uses the stored snippet length."""
+    assert render_snippet("abcdef", {SNIPPET_LENGTH_KEY: 3}) == "abc"
+    assert render_snippet("abcdef", {}) == "abcdef"
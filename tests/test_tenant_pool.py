@@ -0,0 +1,196 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from shared.knowledge_base.tenant_pool import (
+    TenantPool,
+    TenantPoolError,
+    tenant_collection_name,
+    estimate_manager_memory,
+    make_tenant_factory,
+    DEFAULT_TENANT_OVERHEAD_BYTES,
+    DEFAULT_BYTES_PER_DOCUMENT
+)
+
+def _factory(created):
+    def create(tenant_id):
+        manager = MagicMock()
+        manager.tenant_id = tenant_id
+        created.append(manager)
+        return manager
+    return create
+
+def test_managers_are_created_lazily_and_reused():
+    """Test that a tenant's manager is created on first use and then cached."""
+    created = []
+    pool = TenantPool(_factory(created), estimator=lambda manager: 1)
+
+    assert created == []
+    first = pool.get("acme")
+    assert pool.get("acme") is first
+
+    stats = pool.get_stats()
+    assert len(created) == 1
+    assert stats["tenants"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_least_recently_used_tenant_is_evicted_and_closed():
+    """Test the count bound: the LRU tenant is closed when a new one arrives."""
+    created = []
+    pool = TenantPool(_factory(created), max_tenants=2, estimator=lambda manager: 1)
+    a, b = pool.get("a"), pool.get("b")
+    pool.get("a")  # b is now least recently used
+
+    pool.get("c")
+
+    b.close.assert_called_once()
+    a.close.assert_not_called()
+    assert pool.get_stats()["tenants"] == 2
+    assert pool.get_stats()["evictions"] == 1
+
+def test_memory_bound_evicts_until_under_budget():
+    """Test that summed memory estimates bound the pool."""
+    created = []
+    sizes = {"small": 10, "medium": 30, "large": 80}
+    pool = TenantPool(
+        _factory(created),
+        max_tenants=10,
+        max_memory_bytes=100,
+        estimator=lambda manager: sizes[manager.tenant_id]
+    )
+    small, medium = pool.get("small"), pool.get("medium")
+
+    pool.get("large")
+
+    small.close.assert_called_once()
+    medium.close.assert_called_once()
+    assert pool.get_stats()["memory_bytes"] == 80
+
+def test_leased_tenants_are_not_evicted():
+    """Test that a tenant in use survives capacity pressure."""
+    created = []
+    pool = TenantPool(_factory(created), max_tenants=1, estimator=lambda manager: 1)
+
+    with pool.lease("busy") as busy:
+        pool.get("other")
+        busy.close.assert_not_called()
+        assert pool.get_stats()["tenants"] == 2
+        assert pool.evict("busy") is False
+
+    assert pool.evict("busy") is True
+    busy.close.assert_called_once()
+
+def test_idle_tenants_are_evicted():
+    """Test that evict_idle closes tenants unused beyond the TTL."""
+    created = []
+    pool = TenantPool(_factory(created), idle_ttl=0.05, estimator=lambda manager: 1)
+    stale = pool.get("stale")
+    time.sleep(0.1)
+    fresh = pool.get("fresh")
+
+    assert pool.evict_idle() == 1
+
+    stale.close.assert_called_once()
+    fresh.close.assert_not_called()
+    assert pool.get_stats()["idle_evictions"] == 1
+
+def test_released_lease_does_not_block_idle_eviction():
+    """Test that a tenant used through a long lease moves behind idle tenants."""
+    created = []
+    pool = TenantPool(_factory(created), idle_ttl=0.05, estimator=lambda manager: 1)
+    with pool.lease("busy"):
+        pool.get("idle-a")
+        pool.get("idle-b")
+        time.sleep(0.1)
+
+    assert pool.evict_idle() == 2
+    assert [manager.tenant_id for manager in created if manager.close.called] == ["idle-a", "idle-b"]
+    assert pool.get_stats()["tenants"] == 1
+
+def test_concurrent_first_requests_share_one_creation():
+    """Test that simultaneous misses for a tenant create it only once."""
+    created = []
+    started = threading.Event()
+    release = threading.Event()
+    def slow_factory(tenant_id):
+        started.set()
+        release.wait(5)
+        return _factory(created)(tenant_id)
+    pool = TenantPool(slow_factory, estimator=lambda manager: 1)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.get("acme"))) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+    started.wait(5)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(created) == 1
+    assert len(results) == 4
+    assert all(manager is created[0] for manager in results)
+
+def test_factory_failure_is_not_cached():
+    """Test that a failed creation raises and is retried on the next request."""
+    calls = []
+    def flaky_factory(tenant_id):
+        calls.append(tenant_id)
+        if len(calls) == 1:
+            raise Exception("store offline")
+        return MagicMock()
+    pool = TenantPool(flaky_factory, estimator=lambda manager: 1)
+
+    with pytest.raises(TenantPoolError, match="store offline"):
+        pool.get("acme")
+
+    assert pool.get("acme") is not None
+    assert len(calls) == 2
+
+def test_close_releases_all_tenants():
+    """Test that closing the pool closes every manager and rejects new requests."""
+    created = []
+    pool = TenantPool(_factory(created), estimator=lambda manager: 1)
+    pool.get("a")
+    pool.get("b")
+    pool.start_sweeper(interval=0.01)
+
+    pool.close()
+
+    assert all(manager.close.called for manager in created)
+    with pytest.raises(TenantPoolError):
+        pool.get("a")
+
+def test_tenant_collection_names_are_safe_and_distinct():
+    """Test sanitizing of tenant IDs into collection names."""
+    assert tenant_collection_name("kb", "acme") == "kb__tenant_acme"
+
+    unsafe = tenant_collection_name("kb", "acme corp/eu")
+    assert " " not in unsafe and "/" not in unsafe
+    assert unsafe != tenant_collection_name("kb", "acme corp/us")
+    assert len(tenant_collection_name("kb", "x" * 200)) <= len("kb__tenant_") + 24
+
+def test_default_memory_estimate_scales_with_documents():
+    """Test the default estimator from the collection's document count."""
+    manager = MagicMock()
+    manager.vector_store.get_collection_info.return_value = {"document_count": 10}
+
+    assert estimate_manager_memory(manager) == DEFAULT_TENANT_OVERHEAD_BYTES + 10 * DEFAULT_BYTES_PER_DOCUMENT
+
+def test_tenant_factory_opens_tenant_collection_on_shared_client():
+    """Test that the factory builds a manager over a per-tenant collection."""
+    config = MagicMock()
+    config.env = {}
+    root_store = MagicMock()
+    root_store.base_collection_name = "kb"
+    factory = make_tenant_factory(config, root_store, logger=MagicMock())
+
+    manager = factory("acme")
+
+    root_store.for_collection.assert_called_once_with(
+        "kb__tenant_acme", base_collection_name="kb__tenant_acme"
+    )
+    assert manager.vector_store is root_store.for_collection.return_value
+    assert manager.rag_pipeline.vector_store is manager.vector_store
+    manager.close()
@@ -22,7 +22,9 @@ def test_initialization(mock_client, mock_config):
     vs = VectorStore(mock_config)
     
     mock_client.assert_called_with(path="./test_db")
-    mock_client.return_value.get_or_create_collection.assert_called_with(name="test_collection")
+    mock_client.return_value.get_or_create_collection.assert_called_with(
+        name="test_collection", metadata={"hnsw:space": "cosine"}
+    )
     assert vs.collection == mock_collection
 
 @patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
@@ -87,3 +89,153 @@ def test_error_handling(mock_client, mock_config):
     
     with pytest.raises(Exception, match="ChromaDB Error"):
         vs.add_documents([{"content": "test", "metadata": {}}])
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_similarity_search_includes_distances(mock_client, mock_config):
+    """Test that query distances are passed through to results."""
+    mock_collection = MagicMock()
+    mock_client.return_value.get_or_create_collection.return_value = mock_collection
+    mock_collection.query.return_value = {
+        'ids': [['id1', 'id2']],
+        'documents': [['doc1', 'doc2']],
+        'metadatas': [[{}, {}]],
+        'distances': [[0.1, 0.4]]
+    }
+    
+    vs = VectorStore(mock_config)
+    results = vs.similarity_search("query", n_results=2)
+    
+    assert [r['distance'] for r in results] == [0.1, 0.4]
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_delete_documents(mock_client, mock_config):
+    """Test deleting documents by ID."""
+    mock_collection = MagicMock()
+    mock_client.return_value.get_or_create_collection.return_value = mock_collection
+    
+    vs = VectorStore(mock_config)
+    
+    assert vs.delete_documents(["id1", "id2"]) == 2
+    mock_collection.delete.assert_called_once_with(ids=["id1", "id2"])
+    assert vs.delete_documents([]) == 0
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_add_documents_with_ids_upserts(mock_client, mock_config):
+    """Test that caller-chosen IDs are upserted rather than added."""
+    mock_collection = MagicMock()
+    mock_client.return_value.get_or_create_collection.return_value = mock_collection
+    
+    vs = VectorStore(mock_config)
+    ids = vs.add_documents([{"content": "Doc", "metadata": {}}], ids=["run:0"])
+    
+    assert ids == ["run:0"]
+    mock_collection.upsert.assert_called_once_with(documents=["Doc"], metadatas=[{}], ids=["run:0"])
+    mock_collection.add.assert_not_called()
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_activated_collection_survives_restart(mock_client, mock_config, tmp_path):
+    """Test that a collection activated by a rebuild is opened by new instances."""
+    mock_config.vector_db_config.VECTOR_DB_PATH = str(tmp_path)
+    
+    vs = VectorStore(mock_config)
+    rebuilt = vs.for_collection("test_collection__v2")
+    rebuilt.activate()
+    reopened = VectorStore(mock_config)
+    
+    assert rebuilt.collection_name == "test_collection__v2"
+    assert vs.collection_name == "test_collection"
+    assert reopened.collection_name == "test_collection__v2"
+    mock_client.return_value.get_or_create_collection.assert_called_with(
+        name="test_collection__v2", metadata={"hnsw:space": "cosine"}
+    )
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_interrupted_activate_keeps_previous_pointer(mock_client, mock_config, tmp_path):
+    """Test that a crash while writing the pointer leaves the active collection readable."""
+    mock_config.vector_db_config.VECTOR_DB_PATH = str(tmp_path)
+    vs = VectorStore(mock_config)
+    vs.for_collection("test_collection__v2").activate()
+    
+    with patch("shared.knowledge_base.vector_store.json.dump", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            vs.for_collection("test_collection__v3").activate()
+    
+    assert VectorStore(mock_config).collection_name == "test_collection__v2"
+
+def test_warns_about_collection_created_with_default_distance(mock_config, tmp_path):
+    """Test that a pre-existing L2 collection is detected from its configuration."""
+    import chromadb
+    mock_config.vector_db_config.VECTOR_DB_PATH = str(tmp_path)
+    chromadb.PersistentClient(path=str(tmp_path)).get_or_create_collection("test_collection")
+    logger = MagicMock()
+    
+    VectorStore(mock_config, logger=logger)
+    
+    warning = logger.get_logger.return_value.warning
+    warning.assert_called_once()
+    assert "'l2' distance" in warning.call_args[0][0]
+
+def test_cosine_collection_opens_without_warning(mock_config, tmp_path):
+    """Test that collections created by VectorStore are not flagged."""
+    mock_config.vector_db_config.VECTOR_DB_PATH = str(tmp_path)
+    VectorStore(mock_config, logger=MagicMock())
+    logger = MagicMock()
+    
+    VectorStore(mock_config, logger=logger)
+    
+    logger.get_logger.return_value.warning.assert_not_called()
+
+def test_for_collection_without_create_does_not_create(mock_config, tmp_path):
+    """Test that opening a missing collection with create=False raises instead of creating it."""
+    import chromadb
+    mock_config.vector_db_config.VECTOR_DB_PATH = str(tmp_path)
+    vs = VectorStore(mock_config, logger=MagicMock())
+    vs.for_collection("test_collection__v2")
+    
+    assert vs.for_collection("test_collection__v2", create=False).collection_name == "test_collection__v2"
+    with pytest.raises(Exception):
+        vs.for_collection("test_collection__v3", create=False)
+    names = {collection.name for collection in chromadb.PersistentClient(path=str(tmp_path)).list_collections()}
+    assert "test_collection__v3" not in names
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_drop_collection_does_not_recreate(mock_client, mock_config):
+    """Test that dropping a retired collection only deletes it."""
+    vs = VectorStore(mock_config)
+    mock_client.return_value.get_or_create_collection.reset_mock()
+    
+    vs.drop_collection()
+    
+    mock_client.return_value.delete_collection.assert_called_once_with(name="test_collection")
+    mock_client.return_value.get_or_create_collection.assert_not_called()
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_for_collection_with_base_name_resolves_its_own_pointer(mock_client, mock_config, tmp_path):
+    """Test that a tenant store activates and reopens under its own base name."""
+    mock_config.vector_db_config.VECTOR_DB_PATH = str(tmp_path)
+    
+    vs = VectorStore(mock_config)
+    tenant = vs.for_collection("kb__tenant_a", base_collection_name="kb__tenant_a")
+    tenant.for_collection("kb__tenant_a__v2").activate()
+    reopened = vs.for_collection("kb__tenant_a", base_collection_name="kb__tenant_a")
+    
+    assert reopened.collection_name == "kb__tenant_a__v2"
+    assert reopened.base_collection_name == "kb__tenant_a"
+    assert VectorStore(mock_config).collection_name == "test_collection"
+
+@patch("shared.knowledge_base.vector_store.chromadb.PersistentClient")
+def test_iter_documents_pages_through_collection(mock_client, mock_config):
+    """Test that iter_documents fetches fixed-size pages until a short one."""
+    mock_collection = MagicMock()
+    mock_client.return_value.get_or_create_collection.return_value = mock_collection
+    mock_collection.get.side_effect = [
+        {"ids": ["a", "b"], "documents": ["A", "B"], "metadatas": [{"k": 1}, None]},
+        {"ids": ["c"], "documents": ["C"], "metadatas": [{}]}
+    ]
+    vs = VectorStore(mock_config)
+    
+    pages = list(vs.iter_documents(batch_size=2))
+    
+    assert [[doc["id"] for doc in page] for page in pages] == [["a", "b"], ["c"]]
+    assert pages[0][1]["metadata"] == {}
+    assert mock_collection.get.call_args_list[1].kwargs["offset"] == 2
@@ -84,7 +84,7 @@ class FAQAgent:
             )
 
             # Search Knowledge Base
-            search_results = self._search_knowledge_base(question)
+            search_results = self._search_knowledge_base(question, customer_id)
             
             # Evaluate results
             # The search_results from kb_manager.search() returns a dict with 'context' list.
@@ -151,19 +151,20 @@ class FAQAgent:
                 "escalated": True
             }
 
-    def _search_knowledge_base(self, question: str) -> Dict[str, Any]:
+    def _search_knowledge_base(self, question: str, customer_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Search the knowledge base for the given question.
 
         Args:
             question: The question to search for
+            customer_id: Customer asking, so their language routing is reused
 
         Returns:
             Search results dictionary or empty dict on failure
         """
         try:
             # We use search() which returns the RAG result
-            return self.kb_manager.search(question)
+            return self.kb_manager.search(question, customer_id=customer_id)
         except Exception as e:
             self.logger.error(f"Knowledge base search failed: {str(e)}")
             return {}
@@ -178,6 +179,12 @@ class FAQAgent:
         Returns:
             Formatted response string
         """
+        # Prefer the span the RAG pipeline already extracted, if any
+        answer = search_results.get("answer")
+        if answer:
+            source = answer.get("source") or "Knowledge Base"
+            return f"{answer['text']}\n\n(Source: {source})"
+
         context = search_results.get("context", [])
         if not context:
             return "I couldn't find any information to answer your question."
@@ -204,6 +211,12 @@ class FAQAgent:
         """
         ticket_id = f"SUP-{uuid.uuid4().hex[:8].upper()}"
         
+        # Feed knowledge-base gap analytics; never block the escalation
+        try:
+            self.kb_manager.record_escalation(question)
+        except Exception as e:
+            self.logger.warning(f"Failed to record escalation: {str(e)}")
+        
         self.logger.info(
             "Escalating to human agent",
             extra={
@@ -59,7 +59,7 @@ def test_process_question_answered(faq_agent, mock_kb_manager, mock_logger):
     assert "Refunds are allowed within 30 days." in result["response"]
     assert result["escalated"] is False
     
-    mock_kb_manager.search.assert_called_once_with(question)
+    mock_kb_manager.search.assert_called_once_with(question, customer_id=customer_id)
     mock_logger.info.assert_called()
 
 
@@ -86,7 +86,7 @@ def test_process_question_escalated_low_score(faq_agent, mock_kb_manager, mock_l
     assert "created a support ticket" in result["response"]
     assert result["escalated"] is True
     
-    mock_kb_manager.search.assert_called_once_with(question)
+    mock_kb_manager.search.assert_called_once_with(question, customer_id=customer_id)
 
 
 def test_process_question_escalated_no_results(faq_agent, mock_kb_manager, mock_logger):
@@ -105,6 +105,7 @@ def test_process_question_escalated_no_results(faq_agent, mock_kb_manager, mock_
     assert result["status"] == "escalated"
     assert "created a support ticket" in result["response"]
     assert result["escalated"] is True
+    mock_kb_manager.record_escalation.assert_called_once_with(question)
 
 
 def test_escalate_to_human_generates_unique_id(faq_agent):